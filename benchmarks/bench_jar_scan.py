@@ -0,0 +1,70 @@
+"""
+JAR走査のスループットを並列方式・ワーカー数ごとに計測するベンチマーク
+
+    python benchmarks/bench_jar_scan.py --jars 300 --strings 200
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from mod import scan_jars  # noqa: E402
+import provider  # noqa: E402
+
+
+def generate_jars(directory, jar_count, string_count, filler_entries):
+    rng = random.Random(0)
+    words = ["Iron", "Gold", "Energy", "Block", "Ingot", "Machine", "Enabled", "Disabled", "Speed", "Tier"]
+    jar_paths = []
+    for i in range(jar_count):
+        jar_path = os.path.join(directory, f"mod{i:04d}.jar")
+        lang = {
+            f"item.mod{i}.entry{j}": ' '.join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+            for j in range(string_count)
+        }
+        with zipfile.ZipFile(jar_path, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr(f"assets/mod{i}/lang/en_us.json", json.dumps(lang, indent=2))
+            for k in range(filler_entries):
+                z.writestr(f"assets/mod{i}/textures/block/texture{k}.png", os.urandom(256))
+            for k in range(filler_entries):
+                z.writestr(f"com/example/mod{i}/Class{k}.class", os.urandom(512))
+        jar_paths.append(jar_path)
+    return jar_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jars', type=int, default=300)
+    parser.add_argument('--strings', type=int, default=200)
+    parser.add_argument('--filler', type=int, default=50, help="number of texture/class entries per jar")
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--modes', nargs='+', default=['thread', 'process'])
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        jar_paths = generate_jars(directory, args.jars, args.strings, args.filler)
+        print(f"{args.jars} jars x {args.strings} strings ({args.filler * 2} filler entries each)")
+        print(f"{'mode':<8} {'workers':>7} {'seconds':>8} {'jars/s':>8}")
+        for mode in args.modes:
+            for workers in args.workers:
+                provider.set_scan_mode(mode)
+                provider.set_scan_workers(workers)
+                start = time.perf_counter()
+                records = [record for record in scan_jars(jar_paths) if record]
+                elapsed = time.perf_counter() - start
+                assert len(records) == args.jars
+                print(f"{mode:<8} {workers:>7} {elapsed:>8.2f} {args.jars / elapsed:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Patchouliのページの抽出・書き戻しにかかる時間を計測するベンチマーク
+
+正規表現で抽出して str.replace を文字列ごとに繰り返す旧方式と、
+字句解析で位置を記録して一度に組み立て直す現在の方式を、複数ページの大きなブックで比較する。
+
+    python benchmarks/bench_patchouli_rewrite.py --entries 200 --pages 50
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from patchouli import extract_page_strings, apply_page_translations  # noqa: E402
+
+
+def generate_entry(entry_index, page_count):
+    pages = []
+    for page in range(page_count):
+        pages.append({
+            "type": "patchouli:text",
+            "title": f"Section {page}",
+            "text": f"Entry {entry_index}, page {page}: $(item)Iron Ingot$() can be smelted from $(l:ores)ore$(). "
+                    f"This paragraph is long enough to look like real book text for page {page}."
+        })
+    return json.dumps({
+        "name": f"Entry {entry_index}",
+        "icon": "minecraft:iron_ingot",
+        "category": "patchouli:basics",
+        "pages": pages
+    }, indent=2)
+
+
+def legacy_extract_and_replace(content):
+    """以前の extract_page_strings / apply_page_translations と同じ抽出・置換"""
+    strings = [match[1] for match in re.findall(r'"(name|description|title|text)":\s*"(.*?)(?<!\\)"', content)]
+    for original in dict.fromkeys(strings):
+        content = content.replace(f'"{original}"', f'"JA {original}"')
+    return content
+
+
+def span_extract_and_replace(content):
+    strings = extract_page_strings(content)
+    return apply_page_translations(content, strings, {string.value: f"JA {string.value}" for string in strings})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=200, help="ブックのエントリ(ファイル)数")
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 50, 200], help="エントリあたりのページ数")
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'bytes':>12} {'legacy s':>9} {'span s':>9}")
+    for page_count in args.pages:
+        entries = [generate_entry(i, page_count) for i in range(args.entries)]
+
+        start = time.perf_counter()
+        for content in entries:
+            legacy_extract_and_replace(content)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for content in entries:
+            span_extract_and_replace(content)
+        span_time = time.perf_counter() - start
+
+        print(f"{page_count:>6} {sum(map(len, entries)):>12} {legacy_time:>9.3f} {span_time:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+PatchouliのJAR分類(ブックと言語の判定)にかかる時間を計測するベンチマーク
+
+エントリ数の多い合成JARに対して、エントリごとに infolist() を走査していた旧方式と
+一度の走査で索引を作る現在の方式を比較する。
+
+    python benchmarks/bench_patchouli_scan.py --entries 10000 --pages 300
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from mod import find_mod_name  # noqa: E402
+from patchouli import find_books_to_translate  # noqa: E402
+
+
+def generate_jar(jar_path, entries, pages):
+    with zipfile.ZipFile(jar_path, 'w') as z:
+        z.writestr("assets/bigmod/lang/en_us.json", '{"item.bigmod.thing": "Thing"}')
+        for i in range(pages):
+            z.writestr(f"assets/bigmod/patchouli_books/guide/en_us/entries/page{i}.json", '{"name": "Page", "text": "Text"}')
+        for i in range(entries - pages - 1):
+            z.writestr(f"assets/bigmod/textures/block/texture{i}.png", b"")
+
+
+def legacy_classify(jar):
+    """以前の process_jar_file と同じ判定(エントリごとに infolist() を2回走査する)"""
+    mod_name = find_mod_name(jar.namelist())
+    base_path_in_jar = f'assets/{mod_name}/patchouli_books/'
+    dirs_in_patchouli = {item.filename.split('/')[3] for item in jar.infolist()
+                         if item.filename.startswith(base_path_in_jar)}
+    books = set()
+    for item in jar.infolist():
+        if item.filename.startswith(base_path_in_jar) and not item.is_dir():
+            for subdir in dirs_in_patchouli:
+                en_us_exists = any(f'{base_path_in_jar}{subdir}/en_us/' in other.filename for other in jar.infolist())
+                ja_jp_exists = any(f'{base_path_in_jar}{subdir}/ja_jp/' in other.filename for other in jar.infolist())
+                if en_us_exists and not ja_jp_exists:
+                    books.add(subdir)
+    return sorted(books)
+
+
+def indexed_classify(jar):
+    names = jar.namelist()
+    return find_books_to_translate(names, find_mod_name(names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--skip-legacy', action='store_true', help="skip the quadratic legacy classification")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        jar_path = os.path.join(directory, 'bigmod.jar')
+        generate_jar(jar_path, args.entries, args.pages)
+        print(f"{args.entries} entries, {args.pages} Patchouli pages")
+
+        with zipfile.ZipFile(jar_path) as jar:
+            start = time.perf_counter()
+            books = indexed_classify(jar)
+            print(f"indexed: {time.perf_counter() - start:.4f}s -> {books}")
+
+            if not args.skip_legacy:
+                start = time.perf_counter()
+                legacy_books = legacy_classify(jar)
+                print(f"legacy:  {time.perf_counter() - start:.4f}s -> {legacy_books}")
+                assert legacy_books == books
+
+
+if __name__ == '__main__':
+    main()
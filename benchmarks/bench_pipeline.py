@@ -0,0 +1,155 @@
+"""
+合成ModPackとローカルのOpenAI互換サーバーを使い、翻訳処理全体のスループットを計測するベンチマーク
+
+翻訳対象ごとに、経過時間、APIリクエスト数、ピークメモリ(tracemalloc)と run_metrics の計測結果を記録する。
+性能に関わる変更の前後でこの結果を比較する。
+--error-rate / --rate-limit-rate を指定すると、レート制御が送信間隔を広げるため実行時間が大きく伸びる。
+
+    python benchmarks/bench_pipeline.py --jars 100 --strings 200 --latency 0.2 --concurrency 8
+    python benchmarks/bench_pipeline.py mod --mismatch-rate 0.1 --streaming --json result.json
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cli import TARGETS, load_target  # noqa: E402
+from metrics import run_metrics  # noqa: E402
+from mock_openai_server import MockOpenAIServer  # noqa: E402
+from synthetic_modpack import add_generator_arguments, generate_modpack, generator_options  # noqa: E402
+import provider  # noqa: E402
+
+
+def configure(args, server, log_directory):
+    provider.set_api_key('benchmark')
+    provider.set_api_base(server.base_url)
+    provider.set_log_directory(log_directory)
+    provider.set_chunk_size(args.chunk_size)
+    provider.set_concurrency(args.concurrency)
+    provider.set_request_interval(0)
+    provider.set_streaming(args.streaming)
+    provider.set_deduplicate(args.deduplicate)
+    provider.set_translation_memory(args.translation_memory)
+    provider.set_incremental(False)
+
+
+def run_target(target, server, trace_memory):
+    server.reset_stats()
+    run_metrics.reset()
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    try:
+        load_target(target)()
+        status = "success"
+    except Exception as e:
+        logging.exception(f"Failed to translate {target}")
+        status = f"failure: {type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+
+    peak_mb = None
+    if trace_memory:
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    report = run_metrics.snapshot()
+    return {
+        "target": target,
+        "status": status,
+        "seconds": round(elapsed, 3),
+        "requests": server.stats["requests"],
+        "server": dict(server.stats),
+        "peak_traced_mb": peak_mb,
+        "peak_memory_mb": report["peak_memory_mb"],
+        "stages": report["stages"],
+        "counters": report["counters"],
+        "throughput": report["throughput"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('targets', nargs='*', help=f"計測する翻訳対象({', '.join(TARGETS)})。省略時はすべて")
+    add_generator_arguments(parser)
+
+    server_options = parser.add_argument_group('mock server')
+    server_options.add_argument('--latency', type=float, default=0.05, help="1リクエストあたりの応答遅延(秒)")
+    server_options.add_argument('--latency-per-line', type=float, default=0.0)
+    server_options.add_argument('--error-rate', type=float, default=0.0)
+    server_options.add_argument('--rate-limit-rate', type=float, default=0.0)
+    server_options.add_argument('--mismatch-rate', type=float, default=0.0)
+
+    translation = parser.add_argument_group('translation')
+    translation.add_argument('--chunk-size', type=int, default=100)
+    translation.add_argument('--concurrency', type=int, default=4)
+    translation.add_argument('--streaming', action='store_true')
+    translation.add_argument('--deduplicate', action='store_true', help="MODをまたいで同じ原文を一度だけ翻訳する")
+    translation.add_argument('--translation-memory', action='store_true', help="翻訳メモリを有効にする(既定では無効)")
+
+    parser.add_argument('--no-tracemalloc', action='store_true', help="tracemallocによるピークメモリの計測を行わない(計測のオーバーヘッドを除く)")
+    parser.add_argument('--keep', action='store_true', help="生成したModPackとログを削除しない")
+    parser.add_argument('--json', type=Path, help="結果をJSONで保存する")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    unknown_targets = [target for target in args.targets if target not in TARGETS]
+    if unknown_targets:
+        parser.error(f"unknown targets: {', '.join(unknown_targets)}")
+    targets = args.targets or ['mod', 'patchouli', 'ftbquests', 'betterquesting']
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(levelname)s %(message)s')
+
+    work_directory = Path(tempfile.mkdtemp(prefix='localizer-bench-'))
+    instance_directory = work_directory / 'instance'
+    generated = generate_modpack(instance_directory, **generator_options(args))
+    print(f"Generated modpack: {json.dumps(generated)}")
+
+    results = []
+    cwd = os.getcwd()
+    server = MockOpenAIServer(
+        latency=args.latency, latency_per_line=args.latency_per_line, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, mismatch_rate=args.mismatch_rate, seed=args.seed
+    )
+    with server:
+        # init.py のパスはすべてカレントディレクトリからの相対パス
+        os.chdir(instance_directory)
+        try:
+            configure(args, server, work_directory / 'logs')
+            for target in dict.fromkeys(targets):
+                results.append(run_target(target, server, not args.no_tracemalloc))
+        finally:
+            os.chdir(cwd)
+
+    print(f"{'target':<16}{'status':<10}{'seconds':>10}{'requests':>10}{'strings':>10}{'peak MB':>10}{'rss MB':>10}")
+    for result in results:
+        print(
+            f"{result['target']:<16}{result['status'][:9]:<10}{result['seconds']:>10.2f}{result['requests']:>10}"
+            f"{int(result['counters'].get('strings_unique', 0)):>10}"
+            f"{result['peak_traced_mb'] if result['peak_traced_mb'] is not None else '-':>10}"
+            f"{result['peak_memory_mb'] if result['peak_memory_mb'] is not None else '-':>10}"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "modpack": generated,
+            "options": vars(args),
+            "results": results
+        }, ensure_ascii=False, indent=2, default=str), encoding='utf-8')
+
+    if args.keep:
+        print(f"Kept {work_directory}")
+    else:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
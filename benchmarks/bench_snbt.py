@@ -0,0 +1,84 @@
+"""
+FTB Questsのsnbtの抽出・書き戻しにかかる時間を計測するベンチマーク
+
+正規表現で抽出して str.replace を文字列ごとに繰り返す旧方式と、
+字句解析で位置を記録して一度に組み立て直す現在の方式を比較する。
+
+    python benchmarks/bench_snbt.py --quests 2000
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from snbt import find_translatable_strings  # noqa: E402
+from spans import replace_spans  # noqa: E402
+
+
+def generate_chapter(quest_count):
+    quests = []
+    for i in range(quest_count):
+        quests.append(f'''		{{
+			id: "{i:016X}"
+			title: "Quest {i}"
+			subtitle: "Subtitle for quest {i}"
+			description: [
+				"First line of the description for quest {i}."
+				""
+				"Second line, mentioning &aIron Ingot&r and %s."
+			]
+			tasks: [{{ id: "{i:016X}", type: "item", item: "minecraft:iron_ingot" }}]
+			x: {i % 40}.0d
+			y: {i // 40}.0d
+		}}''')
+    return '{\n\ttitle: "Big Chapter"\n\tquests: [\n' + '\n'.join(quests) + '\n\t]\n}\n'
+
+
+def legacy_extract_and_replace(content):
+    """以前の translate_ftbquests_from_snbt と同じ抽出・置換"""
+    extracted_strings = []
+    for match in re.findall(r'description: \[\s*([\s\S]*?)\s*\]', content):
+        for inner_match in re.findall(r'(?<!\\)"(.*?)(?<!\\)"', match):
+            if inner_match:
+                extracted_strings.append(inner_match)
+    for _, inner_match in re.findall(r'(title|subtitle): "(.*?)"', content):
+        if inner_match:
+            extracted_strings.append(inner_match)
+
+    translated_map = {text: f"JA {text}" for text in extracted_strings}
+    for original, translated in translated_map.items():
+        content = content.replace(f'"{original}"', f'"{translated}"', 1)
+    return content
+
+
+def span_extract_and_replace(content):
+    strings = find_translatable_strings(content)
+    translated_map = {string.value: f"JA {string.value}" for string in strings}
+    return replace_spans(content, [(string.start, string.end, translated_map[string.value]) for string in strings])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quests', type=int, nargs='+', default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    print(f"{'quests':>7} {'bytes':>10} {'legacy s':>9} {'span s':>9}")
+    for quest_count in args.quests:
+        content = generate_chapter(quest_count)
+
+        start = time.perf_counter()
+        legacy_extract_and_replace(content)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        span_extract_and_replace(content)
+        span_time = time.perf_counter() - start
+
+        print(f"{quest_count:>7} {len(content):>10} {legacy_time:>9.3f} {span_time:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
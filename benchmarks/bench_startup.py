@@ -0,0 +1,106 @@
+"""
+起動時のimportにかかる時間を計測するベンチマーク
+
+エントリポイントごとに新しいPythonプロセスで `python -X importtime -c "import <module>"` を実行し、
+合計時間と時間のかかったモジュールを表示する。起動時に読み込まないはずのモジュール
+(OpenAI SDK、tqdm、翻訳対象のモジュール)が読み込まれていた場合は終了コード1で終わる。
+
+    python benchmarks/bench_startup.py --repeat 5 --top 10
+
+main はTkEasyGUIを読み込むため、ディスプレイの無い環境では途中で失敗する。その場合も
+失敗するまでに読み込んだモジュールは計測・検査する。
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+
+# 翻訳開始まで読み込みを遅らせるモジュール
+DEFERRED_EVERYWHERE = ('openai', 'httpx', 'tqdm')
+DEFERRED_AT_STARTUP = DEFERRED_EVERYWHERE + ('mod', 'quests', 'patchouli', 'prepare', 'chatgpt')
+
+# エントリポイントと、そのimport時に読み込まれてはいけないモジュール
+ENTRY_POINTS = {
+    'main': DEFERRED_AT_STARTUP,
+    'cli': DEFERRED_AT_STARTUP,
+    'mod': DEFERRED_EVERYWHERE,
+    'quests': DEFERRED_EVERYWHERE,
+    'patchouli': DEFERRED_EVERYWHERE,
+}
+
+
+def parse_importtime(stderr):
+    """
+    -X importtime の出力を (深さ, モジュール名, 累積時間(us)) の一覧に変換する(出力順のまま)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # モジュール名の前の空白は 1 + 2 * 深さ
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(cumulative_us)))
+    return rows
+
+
+def measure_imports(module):
+    """
+    新しいプロセスで module をimportし、({モジュール名: 累積時間(us)}, 合計時間(us), 成功したか) を返す
+
+    importtime は子モジュールを親より先に出力するため、module の行から遡って
+    直前のトップレベルの行(site など起動時のimport)までを module が読み込んだものとみなす。
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC_DIR, capture_output=True, text=True
+    )
+    rows = parse_importtime(process.stderr)
+    succeeded = process.returncode == 0
+
+    end = next((i for i in range(len(rows) - 1, -1, -1) if rows[i][0] == 0 and rows[i][1] == module), None)
+    if end is None:
+        # importに失敗した場合は、最後のトップレベルの行より後をすべて数える
+        start = next((i + 1 for i in range(len(rows) - 1, -1, -1) if rows[i][0] == 0), 0)
+        subtree = rows[start:]
+        total = sum(us for depth, _, us in subtree if depth == 1)
+    else:
+        start = next((i + 1 for i in range(end - 1, -1, -1) if rows[i][0] == 0), 0)
+        subtree = rows[start:end]
+        total = rows[end][2]
+
+    return {name: us for _, name, us in subtree}, total, succeeded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help="各エントリポイントを計測する回数(中央値を表示)")
+    parser.add_argument('--top', type=int, default=5, help="表示する時間のかかったモジュールの数")
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    violations = []
+    for module in args.modules:
+        runs = [measure_imports(module) for _ in range(args.repeat)]
+        cumulative, _, succeeded = runs[-1]
+        total_ms = statistics.median(total for _, total, _ in runs) / 1000
+
+        status = "" if succeeded else " (import failed)"
+        print(f"{module}: {total_ms:.1f} ms{status}")
+        for name, us in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+
+        loaded = [name for name in ENTRY_POINTS.get(module, DEFERRED_EVERYWHERE) if name in cumulative]
+        if loaded:
+            violations.append((module, loaded))
+
+    for module, loaded in violations:
+        print(f"NG: importing {module} loads {', '.join(loaded)}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
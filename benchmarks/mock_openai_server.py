@@ -0,0 +1,224 @@
+"""
+ベンチマーク用のOpenAI互換サーバー(POST /v1/chat/completions のみ)
+
+ユーザーメッセージの各行の先頭に "JA:" を付けて返す。応答の遅延、エラー、行数のずれを設定できる。
+ストリーミング(stream=true)のリクエストにはSSEで応答する。tests/conftest.py のテスト用サーバーとしても使う。
+
+    python benchmarks/mock_openai_server.py --port 8000 --latency 0.5 --error-rate 0.05
+
+単体で起動した場合は、API Base URL に http://127.0.0.1:<port>/v1 を指定して使う。
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIServer:
+    """
+    responder(リクエストのbody) が返す (ステータス, ヘッダー, 応答のJSON) をそのまま返す。
+    既定の default_responder は各行の先頭に "JA:" を付け、以下の設定に従って遅延、エラー、行数のずれを加える。
+    stream=true で成功する場合は、本文を stream_chunk_size 文字ずつのSSEイベントに分けて返し、
+    stream_options.include_usage が指定されていれば最後にusageのイベントを送る。
+
+    テストでは responder を差し替えるほか、次の機能を使う。
+    - stream_cutoffs に文字数を積んでおくと、ストリーミングの応答をその文字数で切断する(1リクエストにつき1つ消費)
+    - record_requests=True の場合、受け取ったbodyを requests に、接続元のポートを client_ports に記録する
+
+    Args:
+        latency: 1リクエストあたりの基本の応答遅延(秒)
+        latency_per_line: 1行あたりに加える応答遅延(秒)
+        error_rate: 500を返す確率
+        rate_limit_rate: 429(retry-after付き)を返す確率
+        mismatch_rate: 2行を1行に結合して行数をずらす確率
+        seed: 乱数のシード(同じ設定で同じ応答列を再現する)
+        stream_chunk_size: ストリーミングの1イベントあたりの文字数
+        record_requests: 受け取ったリクエストを記録するか(ベンチマークではメモリ計測に影響するため記録しない)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, latency_per_line=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, mismatch_rate=0.0, seed=0,
+                 stream_chunk_size=16, record_requests=False):
+        self.latency = latency
+        self.latency_per_line = latency_per_line
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.mismatch_rate = mismatch_rate
+        self.random = random.Random(seed)
+        self.stream_chunk_size = stream_chunk_size
+        self.record_requests = record_requests
+        self.responder = self.default_responder
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "mismatches": 0, "lines": 0}
+        self.requests = []
+        self.client_ports = set()
+        self.stream_cutoffs = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                with server.lock:
+                    server.stats["requests"] += 1
+                    if server.record_requests:
+                        server.requests.append(body)
+                        server.client_ports.add(self.client_address[1])
+                status, headers, payload = server.responder(body)
+
+                cutoff = None
+                if status == 200 and body.get('stream'):
+                    with server.lock:
+                        cutoff = server.stream_cutoffs.pop(0) if server.stream_cutoffs else None
+                    include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+                    data = server.stream_payload(
+                        payload["choices"][0]["message"]["content"], cutoff, payload.get("usage") if include_usage else None
+                    )
+                    content_type = 'text/event-stream'
+                else:
+                    data = json.dumps(payload).encode('utf-8')
+                    content_type = 'application/json'
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                # 切断する場合は実際より長いContent-Lengthを返し、途中で接続を閉じる
+                self.send_header('Content-Length', str(len(data) + (0 if cutoff is None else 1000)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+                self.wfile.flush()
+                if cutoff is not None:
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        with self.lock:
+            for name in self.stats:
+                self.stats[name] = 0
+
+    @staticmethod
+    def user_text(body):
+        return body["messages"][-1]["content"][0]["text"]
+
+    def default_responder(self, body):
+        """
+        (ステータス, ヘッダー, 応答のJSON) を返す
+        """
+        lines = self.user_text(body).split('\n')
+        with self.lock:
+            roll = self.random.random()
+            mismatch = self.random.random() < self.mismatch_rate and len(lines) > 2
+
+        time.sleep(self.latency + self.latency_per_line * len(lines))
+
+        if roll < self.error_rate:
+            with self.lock:
+                self.stats["errors"] += 1
+            return 500, {}, {"error": {"message": "mock server error", "type": "server_error"}}
+        if roll < self.error_rate + self.rate_limit_rate:
+            with self.lock:
+                self.stats["rate_limited"] += 1
+            return 429, {"retry-after-ms": "200"}, {"error": {"message": "mock rate limit", "type": "requests"}}
+
+        translated = [f"JA:{line}" for line in lines]
+        if mismatch:
+            position = self.random.randrange(1, len(translated))
+            translated[position - 1:position + 1] = [translated[position - 1] + translated[position]]
+        with self.lock:
+            self.stats["lines"] += len(lines)
+            self.stats["mismatches"] += int(mismatch)
+        return 200, {}, self.completion('\n'.join(translated))
+
+    @staticmethod
+    def completion(content, usage=None):
+        prompt_tokens = len(content) // 4
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "mock-model",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage or {"prompt_tokens": prompt_tokens, "completion_tokens": len(content), "total_tokens": prompt_tokens + len(content)}
+        }
+
+    @staticmethod
+    def stream_chunk(delta, finish_reason=None):
+        return {
+            "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": "mock-model",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+
+    def stream_payload(self, content, cutoff=None, usage=None):
+        """
+        本文をSSEのイベント列にする。cutoff が指定された場合はその文字数までで終わり、終了のイベントを送らない
+        """
+        sent = content if cutoff is None else content[:cutoff]
+        events = [
+            self.stream_chunk({"content": sent[i:i + self.stream_chunk_size]})
+            for i in range(0, len(sent), self.stream_chunk_size)
+        ]
+        if cutoff is None:
+            events.append(self.stream_chunk({}, finish_reason="stop"))
+            if usage:
+                events.append({**self.stream_chunk({}), "choices": [], "usage": usage})
+        data = ''.join(f"data: {json.dumps(event)}\n\n" for event in events)
+        if cutoff is None:
+            data += "data: [DONE]\n\n"
+        return data.encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--latency-per-line', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--mismatch-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        args.host, args.port, args.latency, args.latency_per_line,
+        args.error_rate, args.rate_limit_rate, args.mismatch_rate, args.seed
+    )
+    print(f"Serving on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
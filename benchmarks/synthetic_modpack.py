@@ -0,0 +1,146 @@
+"""
+ベンチマーク用の合成ModPack(Minecraftのディレクトリ)を生成する
+
+    python benchmarks/synthetic_modpack.py /tmp/pack --jars 200 --strings 300 --books 10 --chapters 20
+
+生成するもの:
+- mods/*.jar: assets/<mod>/lang/en_us.json(一部の文字列はMOD間で共通)、一部のJARにはPatchouliのブック
+- config/ftbquests/quests/chapters/*.snbt: FTB Questsのチャプター
+- resources/betterquesting/lang/en_us.lang: BetterQuestingのlangファイル
+"""
+import argparse
+import json
+import random
+import zipfile
+from pathlib import Path
+
+WORDS = (
+    "iron gold copper ingot block machine energy power pipe tank fluid item storage crystal ore dust plate gear "
+    "wire circuit furnace generator reactor portal altar ritual essence mana rune spell armor sword pickaxe "
+    "backpack chest drawer conveyor crusher smelter press mixer turbine battery cable solar panel"
+).split()
+
+# MOD間で共通して現れる文字列(重複除去の効果を測るため)
+COMMON_TEXTS = [f"{word.capitalize()} Settings" for word in WORDS] + [
+    "Redstone Mode", "Always Active", "Never Active", "Shift-click for details", "Energy: %s / %s FE",
+]
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def write_mod_jar(path, mod_name, strings, rng, shared_ratio, book_pages):
+    lang = {}
+    for i in range(strings):
+        if rng.random() < shared_ratio:
+            text = rng.choice(COMMON_TEXTS)
+        else:
+            text = sentence(rng, rng.randint(2, 12))
+        lang[f"item.{mod_name}.entry_{i}"] = text
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as jar:
+        jar.writestr('META-INF/MANIFEST.MF', 'Manifest-Version: 1.0\n')
+        jar.writestr(f'{mod_name}/{mod_name.capitalize()}Mod.class', b'\xca\xfe\xba\xbe' + bytes(256))
+        jar.writestr(f'assets/{mod_name}/lang/en_us.json', json.dumps(lang, indent=2))
+        for i in range(8):
+            jar.writestr(f'assets/{mod_name}/textures/item/item_{i}.png', bytes(rng.getrandbits(8) for _ in range(64)))
+
+        if book_pages:
+            base = f'assets/{mod_name}/patchouli_books/guide/en_us'
+            jar.writestr(f'assets/{mod_name}/patchouli_books/guide/book.json', json.dumps({"name": f"{mod_name} Guide"}))
+            jar.writestr(f'{base}/categories/basics.json', json.dumps({"name": "Basics", "description": sentence(rng, 8)}))
+            for page in range(book_pages):
+                entry = {
+                    "name": f"Entry {page}",
+                    "category": f"{mod_name}:basics",
+                    "icon": "minecraft:book",
+                    "pages": [
+                        {"type": "patchouli:text", "title": sentence(rng, 3), "text": sentence(rng, 30)},
+                        {"type": "patchouli:spotlight", "item": "minecraft:iron_ingot", "text": sentence(rng, 15)},
+                    ]
+                }
+                jar.writestr(f'{base}/entries/entry_{page}.json', json.dumps(entry, indent=2))
+
+
+def write_chapter(path, chapter, quests, rng):
+    lines = ['{', f'\tfilename: "chapter_{chapter}"', f'\ttitle: "{sentence(rng, 3)}"', '\tquests: [']
+    for quest in range(quests):
+        lines += [
+            '\t\t{',
+            f'\t\t\tid: "{chapter:08X}{quest:08X}"',
+            f'\t\t\ttitle: "{sentence(rng, 4)}"',
+            f'\t\t\tsubtitle: "{sentence(rng, 6)}"',
+            '\t\t\tdescription: [',
+            f'\t\t\t\t"{sentence(rng, 20)}"',
+            '\t\t\t\t""',
+            f'\t\t\t\t"{sentence(rng, 12)}"',
+            '\t\t\t]',
+            f'\t\t\ttasks: [{{ id: "{quest:016X}", type: "item", item: "minecraft:iron_ingot" }}]',
+            f'\t\t\tx: {quest % 10}.0d',
+            f'\t\t\ty: {quest // 10}.0d',
+            '\t\t}',
+        ]
+    lines += ['\t]', '}', '']
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+
+def generate_modpack(root, jars=50, strings=200, books=5, pages=20, chapters=5, quests=30,
+                     betterquesting_strings=200, shared_ratio=0.2, seed=0):
+    """
+    root に合成ModPackを生成し、生成した件数を返す
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    mods_dir = root / 'mods'
+    chapters_dir = root / 'config' / 'ftbquests' / 'quests' / 'chapters'
+    betterquesting_dir = root / 'resources' / 'betterquesting' / 'lang'
+    for directory in (mods_dir, chapters_dir, betterquesting_dir):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    for i in range(jars):
+        write_mod_jar(mods_dir / f'mod{i:04d}-1.0.0.jar', f'mod{i:04d}', strings, rng, shared_ratio, pages if i < books else 0)
+
+    for chapter in range(chapters):
+        write_chapter(chapters_dir / f'chapter_{chapter}.snbt', chapter, quests, rng)
+
+    with open(betterquesting_dir / 'en_us.lang', 'w', encoding='utf-8') as f:
+        for i in range(betterquesting_strings):
+            f.write(f'betterquesting.quest.{i}={sentence(rng, rng.randint(3, 15))}\n')
+
+    return {
+        "jars": jars, "lang_strings": jars * strings, "patchouli_pages": min(books, jars) * pages,
+        "quest_chapters": chapters, "quests": chapters * quests, "betterquesting_strings": betterquesting_strings
+    }
+
+
+def add_generator_arguments(parser):
+    parser.add_argument('--jars', type=int, default=50)
+    parser.add_argument('--strings', type=int, default=200, help="JARあたりのlangの文字列数")
+    parser.add_argument('--books', type=int, default=5, help="Patchouliのブックを含むJARの数")
+    parser.add_argument('--pages', type=int, default=20, help="ブックあたりのエントリ数")
+    parser.add_argument('--chapters', type=int, default=5)
+    parser.add_argument('--quests', type=int, default=30, help="チャプターあたりのクエスト数")
+    parser.add_argument('--betterquesting-strings', type=int, default=200)
+    parser.add_argument('--shared-ratio', type=float, default=0.2, help="MOD間で共通の文字列の割合")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generator_options(args):
+    return {
+        "jars": args.jars, "strings": args.strings, "books": args.books, "pages": args.pages,
+        "chapters": args.chapters, "quests": args.quests, "betterquesting_strings": args.betterquesting_strings,
+        "shared_ratio": args.shared_ratio, "seed": args.seed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root', type=Path)
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(generate_modpack(args.root, **generator_options(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
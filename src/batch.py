@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from chatgpt import get_client
+
+# OpenAI Batch APIのジョブが取りうる状態のうち、これ以上変化しないもの
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class OpenAIBatchBackend:
+    """
+    OpenAI Batch API(/v1/batches)にJSONLのリクエストファイルを投入するバックエンド
+
+    バックエンドは submit / status / results の3つのメソッドを持つ。
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, input_path) -> str:
+        with open(input_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        return batch.id
+
+    def status(self, batch_id) -> str:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.request_counts:
+            logging.info(f"Batch {batch_id} is {batch.status} ({batch.request_counts.completed}/{batch.request_counts.total} requests done)")
+        return batch.status
+
+    def results(self, batch_id) -> List[str]:
+        """
+        結果ファイルとエラーファイルの各行を返す。期限切れのジョブでも完了済みの分は返る
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(self.client.files.content(file_id).text.splitlines())
+        return lines
+
+
+class LocalBatchBackend:
+    """
+    Batch APIと同じ形式のファイルをローカルで読み書きする代替バックエンド(テスト・ベンチマーク用)
+
+    submit したリクエストファイルを respond(リクエストのbody) で処理し、Batch APIと同じ形式の結果ファイルを
+    directory に書き出す。respond は訳文の本文を返すか、失敗を表す例外を送出する。
+    polls_until_complete 回 status を呼ぶまでは処理中として振る舞う。
+    """
+
+    def __init__(self, directory, respond: Callable[[Dict[str, Any]], str], polls_until_complete: int = 0):
+        self.directory = directory
+        self.respond = respond
+        self.polls_until_complete = polls_until_complete
+        self.polls = {}
+
+    def output_path(self, batch_id):
+        return os.path.join(self.directory, f"{batch_id}_output.jsonl")
+
+    def submit(self, input_path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        os.makedirs(self.directory, exist_ok=True)
+
+        with open(input_path, 'r', encoding='utf-8') as f, \
+                open(self.output_path(batch_id), 'w', encoding='utf-8') as output:
+            for line in f:
+                request = json.loads(line)
+                try:
+                    content = self.respond(request["body"])
+                    record = {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        "response": {
+                            "status_code": 200,
+                            "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                        },
+                        "error": None
+                    }
+                except Exception as e:
+                    record = {
+                        "id": f"batch_req_{uuid.uuid4().hex}",
+                        "custom_id": request["custom_id"],
+                        "response": None,
+                        "error": {"code": "local_error", "message": str(e)}
+                    }
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        self.polls[batch_id] = 0
+        return batch_id
+
+    def status(self, batch_id) -> str:
+        # 別のインスタンスで投入したジョブ(再開時)も、結果ファイルがあれば扱える
+        self.polls[batch_id] = self.polls.get(batch_id, 0) + 1
+        return 'completed' if self.polls[batch_id] > self.polls_until_complete else 'in_progress'
+
+    def results(self, batch_id) -> List[str]:
+        with open(self.output_path(batch_id), 'r', encoding='utf-8') as f:
+            return f.read().splitlines()
+
+
+def create_batch_backend():
+    return OpenAIBatchBackend(get_client())
+
+
+def parse_batch_results(lines: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    結果ファイルの各行から {custom_id: 応答の本文} を作る。失敗したリクエストの本文はNone
+    """
+    contents: Dict[str, Optional[str]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        choices = body.get("choices") or []
+        if record.get("error") or response.get("status_code") != 200 or not choices:
+            logging.error(f"Batch request {record.get('custom_id')} failed: {record.get('error') or response.get('status_code')}")
+            contents[record["custom_id"]] = None
+            continue
+        contents[record["custom_id"]] = choices[0]["message"]["content"]
+    return contents
+
+
+def batch_state_path(directory, key) -> Path:
+    return Path(directory) / f"batch_{key}.json"
+
+
+def write_batch_state(path, state: Dict[str, Any]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def find_batch_state(directory, key, search_previous_runs: bool) -> Optional[Dict[str, Any]]:
+    """
+    同じリクエストを投入したジョブの状態ファイル(batch_<key>.json)を探し、最後に更新されたものを返す
+
+    search_previous_runs の場合は、以前の実行のログディレクトリ(<ログディレクトリ>/../*/batch)も探す。
+    """
+    directory = Path(directory)
+    candidates = [batch_state_path(directory, key)]
+    log_root = directory.parent.parent
+    if search_previous_runs and log_root.is_dir():
+        candidates.extend(batch_state_path(run / directory.name, key) for run in log_root.iterdir() if run.is_dir())
+
+    paths = [path for path in set(candidates) if path.is_file()]
+    if not paths:
+        return None
+
+    path = max(paths, key=lambda path: path.stat().st_mtime_ns)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Failed to load batch state {path}: {str(e)}")
+        return None
+    return state if state.get("batch_id") else None
+
+
+def run_batch(requests: List[Dict[str, Any]], backend, directory, poll_interval: float,
+              sleep: Callable[[float], None] = time.sleep, resume: bool = False) -> Dict[str, Optional[str]]:
+    """
+    Batch API形式のリクエスト({"custom_id", "body"})をJSONLに書き出して投入し、完了まで待って結果を返す
+
+    ファイル名にはリクエストの内容から求めたキーを使う(batch_<key>_input.jsonl)。投入したジョブのIDは
+    直後に状態ファイル batch_<key>.json に記録し、同じリクエストの状態ファイルが見つかった場合は
+    再投入せずにそのジョブの完了を待つ(二重に課金されないようにする)。
+    resume の場合は以前の実行のログディレクトリの状態ファイルも探す。
+
+    Returns:
+        {custom_id: 応答の本文}。結果の得られなかったリクエストは含まれないかNone
+    """
+    os.makedirs(directory, exist_ok=True)
+    request_lines = [
+        json.dumps({
+            "custom_id": request["custom_id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": request["body"]
+        }, ensure_ascii=False) + '\n'
+        for request in requests
+    ]
+    digest = hashlib.sha256()
+    for line in request_lines:
+        digest.update(line.encode('utf-8'))
+    key = digest.hexdigest()[:16]
+    input_path = os.path.join(directory, f'batch_{key}_input.jsonl')
+    state_path = batch_state_path(directory, key)
+
+    state = find_batch_state(directory, key, resume)
+    if state:
+        batch_id = state["batch_id"]
+        logging.info(f"Resuming batch {batch_id} previously submitted with the same {len(requests)} requests")
+    else:
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.writelines(request_lines)
+        batch_id = backend.submit(input_path)
+        state = {"batch_id": batch_id, "input_file": os.path.basename(input_path), "requests": len(requests)}
+        logging.info(f"Submitted batch {batch_id} with {len(requests)} requests ({input_path})")
+    del request_lines
+
+    state["status"] = 'submitted'
+    write_batch_state(state_path, state)
+
+    while True:
+        status = backend.status(batch_id)
+        if status in TERMINAL_STATUSES:
+            break
+        sleep(poll_interval)
+
+    if status != 'completed':
+        logging.error(f"Batch {batch_id} ended with status {status}, collecting partial results")
+
+    lines = backend.results(batch_id)
+    with open(os.path.join(directory, f'batch_{key}_output.jsonl'), 'w', encoding='utf-8') as f:
+        f.writelines(line + '\n' for line in lines)
+    state["status"] = status
+    write_batch_state(state_path, state)
+
+    contents = parse_batch_results(lines)
+    logging.info(f"Batch {batch_id} returned {sum(1 for content in contents.values() if content is not None)}/{len(requests)} results")
+    return contents
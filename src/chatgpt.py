@@ -1,64 +1,338 @@
 import logging
 import re
+import threading
 import time
-from openai import OpenAI
 
-from provider import provide_api_key, provide_model, provide_prompt, provide_api_base, provide_temperature, provide_request_interval
+from provider import provide_api_key, provide_model, provide_prompt, provide_api_base, provide_temperature, provide_request_interval, provide_api_pool_size, provide_api_timeout, provide_concurrency, provide_requests_per_minute, provide_tokens_per_minute
+from metrics import run_metrics
+from ratelimit import RateLimiter, retry_after_from_headers
+
+# 訳文中のエスケープされていないダブルクォート
+_UNESCAPED_QUOTE_PATTERN = re.compile(r'(?<!\\)"')
+
+# 訳文(日本語)のトークン数は原文(英語)のおおよそ何倍になるか。出力トークンの見積もりに使う
+OUTPUT_TOKEN_RATIO = 1.5
+
+# (api_key, api_base) ごとのクライアントとレート制御。keep-alive接続を使い回すためプロセス内で共有する
+_clients = {}
+_rate_limiters = {}
+_clients_lock = threading.Lock()
+
+
+def get_client():
+    """
+    現在のAPIキーとベースURLに対応するOpenAIクライアントを返す
+
+    クライアントは (api_key, api_base) ごとに一度だけ作成し、以降は同じ接続プールを再利用する。
+    接続プールのサイズとタイムアウトは作成時の設定(provide_api_pool_size, provide_concurrency, provide_api_timeout)に従う。
+    """
+    # OpenAI SDKの読み込みは重いため、起動時ではなく最初の翻訳時に行う
+    import httpx
+    from openai import OpenAI, DefaultHttpxClient
+
+    api_key = provide_api_key()
+    api_base = provide_api_base()
+    client_key = (api_key, api_base)
+
+    with _clients_lock:
+        client = _clients.get(client_key)
+        if client is None:
+            # 同時リクエスト数より接続数が少ないと待ちが発生するため、大きい方を使う
+            pool_size = max(provide_api_pool_size(), provide_concurrency())
+            api_params = {
+                "api_key": api_key,
+                "timeout": provide_api_timeout(),
+                # 429/5xxや接続エラーの再送はレート制御とMAX_ATTEMPTSで行うため、SDK側では再送しない
+                "max_retries": 0,
+                "http_client": DefaultHttpxClient(
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+                )
+            }
+
+            # APIベースURLが設定されている場合は追加
+            if api_base:
+                api_params["base_url"] = api_base
+
+            client = OpenAI(**api_params)
+            _clients[client_key] = client
+            logging.info(f"Created API client for {api_base or 'default endpoint'} (pool size: {pool_size})")
+
+    return client
+
+
+def close_clients():
+    """
+    作成済みのクライアントをすべて閉じ、レート制御の状態も破棄する
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _rate_limiters.clear()
+
+
+def get_rate_limiter():
+    """
+    現在のAPIキーとベースURLに対応するレート制御を返す。クライアントと同じ単位で共有する
+
+    REQUEST_INTERVAL、RPM、TPMの設定が変わっていれば、共有しているレート制御に反映する
+    """
+    limiter_key = (provide_api_key(), provide_api_base())
+    min_interval = provide_request_interval()
+    requests_per_minute = provide_requests_per_minute()
+    tokens_per_minute = provide_tokens_per_minute()
+
+    with _clients_lock:
+        rate_limiter = _rate_limiters.get(limiter_key)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(
+                min_interval=min_interval,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute
+            )
+            _rate_limiters[limiter_key] = rate_limiter
+        else:
+            rate_limiter.configure(min_interval, requests_per_minute, tokens_per_minute)
+
+    return rate_limiter
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する
+
+    英数字などのASCII文字は約4文字で1トークン、日本語などの非ASCII文字は1文字で約1トークンとして数え、
+    行区切りの分として1トークンを加える
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    non_ascii_chars = len(text) - ascii_chars
+    return (ascii_chars + 3) // 4 + non_ascii_chars + 1
+
+
+def build_messages(system_prompt, split_target):
+    return [
+        {
+            "role": "system",
+            "content": [
+                {"type": "text", "text": system_prompt}]
+        },
+        {
+            "role": "user",
+            "content": [{"type": "text", "text": '\n'.join(split_target)}]
+        }
+    ]
+
+
+def escape_translated_line(line):
+    return _UNESCAPED_QUOTE_PATTERN.sub(r'\\"', line)
+
+
+def parse_translated_text(translated_text, multi_line):
+    """
+    応答の本文を訳文の行リストに変換する。入力が1行の場合は改行を取り除いて1行にまとめる
+    """
+    result = translated_text.splitlines() if multi_line else [translated_text.replace('\n', '')]
+    return [escape_translated_line(line) for line in result]
+
+
+def split_completed_lines(buffer):
+    """
+    ストリーミングで受け取った本文を、parse_translated_text と同じ splitlines の規則で行に分ける
+
+    Returns:
+        (改行まで届いた行, 残りのバッファ)
+        末尾がCRの行は続けてLFが届くかもしれないため、その行は残りのバッファに含める
+    """
+    parts = buffer.splitlines(keepends=True)
+    if parts and (parts[-1].endswith('\r') or parts[-1].splitlines()[0] == parts[-1]):
+        buffer = parts.pop()
+    else:
+        buffer = ''
+    return [part.splitlines()[0] for part in parts], buffer
+
+
+def prepare_request(split_target):
+    """
+    改行を取り除いた入力行、システムプロンプト、見積もりトークン数を返す
+    """
+    # 改行を削除(翻訳時扱いがめんどくさいため)
+    split_target = [line.replace('\\n', '').replace('\n', '') for line in split_target] if len(split_target) > 1 else split_target
+    system_prompt = provide_prompt().replace('{line_count}', str(len(split_target)))
+    estimated_tokens = estimate_tokens(system_prompt) + int(sum(estimate_tokens(line) for line in split_target) * (1 + OUTPUT_TOKEN_RATIO))
+    return split_target, system_prompt, estimated_tokens
+
+
+def acquire_rate_limit(rate_limiter, estimated_tokens):
+    reservation = rate_limiter.acquire(estimated_tokens)
+    if reservation.waited > 0:
+        run_metrics.count("rate_limit_wait_seconds", reservation.waited)
+        logging.info(f"Waited {reservation.waited:.1f} seconds for rate limit before sending API request")
+    return reservation
+
+
+def record_usage(rate_limiter, reservation, usage):
+    """
+    応答のusageをレート制御(acquire_rate_limitで確保した枠)と計測結果に反映する
+    """
+    rate_limiter.record_usage(reservation, usage.total_tokens)
+    run_metrics.count("prompt_tokens", usage.prompt_tokens or 0)
+    run_metrics.count("completion_tokens", usage.completion_tokens or 0)
+
+
+def handle_api_status_error(rate_limiter, e):
+    run_metrics.count("request_errors")
+    if e.status_code == 429:
+        run_metrics.count("rate_limited_responses")
+    # 429と5xxはレート制御で間隔を広げる(再送は呼び出し側のMAX_ATTEMPTSに任せる)
+    if e.status_code == 429 or e.status_code >= 500:
+        rate_limiter.on_rate_limited(retry_after_from_headers(e.response.headers))
+    logging.error(f"Error during translation: {str(e)}")
+
+
+def handle_api_connection_error(rate_limiter, e):
+    """
+    接続エラーやタイムアウト(SDK側では再送しない)もレート制御で間隔を広げ、一時的な通信障害の間に再試行を使い切らないようにする
+    """
+    run_metrics.count("request_errors")
+    run_metrics.count("connection_errors")
+    rate_limiter.on_rate_limited()
+    logging.error(f"Connection error during translation: {str(e)}")
 
 
 def translate_with_chatgpt(split_target, timeout):
     start_time = time.time()
     result = []
 
-    # 改行を削除(翻訳時扱いがめんどくさいため)
-    split_target = [line.replace('\\n', '').replace('\n', '') for line in split_target] if len(split_target) > 1 else split_target
+    split_target, system_prompt, estimated_tokens = prepare_request(split_target)
 
-    # APIキーとクライアントの初期化
-    api_params = {"api_key": provide_api_key()}
-    
-    # APIベースURLが設定されている場合は追加
-    api_base = provide_api_base()
-    if api_base:
-        api_params["base_url"] = api_base
-    
-    client = OpenAI(**api_params)
+    # 接続プールを保持したクライアントを再利用する
+    client = get_client()
+    from openai import APIConnectionError, APIStatusError
+
+    # 送信間隔はレート制御が応答に合わせて調整する
+    rate_limiter = get_rate_limiter()
 
     try:
-        # リクエスト間隔の適用（APIリクエスト前の待機）
-        request_interval = provide_request_interval()
-        if request_interval > 0:
-            logging.info(f"Waiting for {request_interval} seconds before sending API request...")
-            time.sleep(request_interval)
-        
+        reservation = acquire_rate_limit(rate_limiter, estimated_tokens)
+        request_start = time.time()
+
         # ChatGPTを用いて翻訳を行う
-        response = client.chat.completions.create(
+        raw_response = client.chat.completions.with_raw_response.create(
             model=provide_model(),
             temperature=provide_temperature(),
-            messages=[
-                {
-                    "role": "system",
-                    "content": [
-                        {"type": "text", "text": provide_prompt().replace('{line_count}', str(len(split_target)))}]
-                },
-                {
-                    "role": "user",
-                    "content": [{"type": "text", "text": '\n'.join(split_target)}]
-                }
-            ],
+            messages=build_messages(system_prompt, split_target),
         )
+        response = raw_response.parse()
+        rate_limiter.on_success(raw_response.headers)
+        run_metrics.count("requests")
+        run_metrics.observe("request_seconds", time.time() - request_start)
+        if response.usage:
+            record_usage(rate_limiter, reservation, response.usage)
 
         # 翻訳結果を取得
         if response.choices and response.choices[0].message:
-            translated_text = response.choices[0].message.content
-            result = translated_text.splitlines() if len(split_target) > 1 else [translated_text.replace('\n', '')]
-            result = [re.sub(r'(?<!\\)"', r'\\"', line) for line in result]
+            result = parse_translated_text(response.choices[0].message.content, len(split_target) > 1)
         else:
             logging.error("Failed to get a valid response from the ChatGPT model.")
 
+    except APIStatusError as e:
+        handle_api_status_error(rate_limiter, e)
+
+    except APIConnectionError as e:
+        # APITimeoutError も APIConnectionError のサブクラス
+        handle_api_connection_error(rate_limiter, e)
+
     except Exception as e:
+        run_metrics.count("request_errors")
         elapsed_time = time.time() - start_time
         if elapsed_time > timeout:
             logging.error("Timeout reached while waiting for translation.")
         logging.error(f"Error during translation: {str(e)}")
 
     return result
+
+
+def translate_with_chatgpt_stream(split_target, timeout):
+    """
+    応答をストリーミングで受け取り、改行が届いた行から順に訳文として確定させる
+
+    Returns:
+        (確定した訳文の行, 応答を最後まで受け取れたか)
+        途中で接続が切れた場合も、それまでに確定した行を返す(最後の未完成の行は含めない)
+    """
+    start_time = time.time()
+    lines = []
+    complete = False
+    first_line_at = None
+
+    split_target, system_prompt, estimated_tokens = prepare_request(split_target)
+    multi_line = len(split_target) > 1
+
+    client = get_client()
+    from openai import APIConnectionError, APIStatusError
+
+    rate_limiter = get_rate_limiter()
+
+    try:
+        reservation = acquire_rate_limit(rate_limiter, estimated_tokens)
+        request_start = time.time()
+
+        raw_response = client.chat.completions.with_raw_response.create(
+            model=provide_model(),
+            temperature=provide_temperature(),
+            messages=build_messages(system_prompt, split_target),
+            stream=True,
+            # 最後のイベントでusageを受け取り、レート制御と計測結果に反映する
+            stream_options={"include_usage": True},
+        )
+        stream = raw_response.parse()
+        rate_limiter.on_success(raw_response.headers)
+
+        buffer = ''
+        with stream:
+            for event in stream:
+                if event.usage:
+                    record_usage(rate_limiter, reservation, event.usage)
+                if not event.choices or not event.choices[0].delta or not event.choices[0].delta.content:
+                    continue
+
+                buffer += event.choices[0].delta.content
+                if not multi_line:
+                    continue
+                # 改行まで届いた行を確定させる
+                completed, buffer = split_completed_lines(buffer)
+                for line in completed:
+                    if first_line_at is None:
+                        first_line_at = time.time()
+                    lines.append(escape_translated_line(line))
+
+        if multi_line:
+            lines.extend(parse_translated_text(buffer, multi_line))
+        else:
+            lines = parse_translated_text(buffer, multi_line)
+        first_line_at = first_line_at or time.time()
+        complete = True
+        run_metrics.count("requests")
+        run_metrics.observe("request_seconds", time.time() - request_start)
+        run_metrics.observe("time_to_first_line_seconds", first_line_at - request_start)
+
+        logging.info(
+            f"Streamed {len(lines)} lines: first line after {first_line_at - request_start:.2f}s, "
+            f"total {time.time() - request_start:.2f}s"
+        )
+
+    except APIStatusError as e:
+        handle_api_status_error(rate_limiter, e)
+
+    except APIConnectionError as e:
+        # APITimeoutError も APIConnectionError のサブクラス
+        handle_api_connection_error(rate_limiter, e)
+
+    except Exception as e:
+        run_metrics.count("request_errors")
+        elapsed_time = time.time() - start_time
+        if elapsed_time > timeout:
+            logging.error("Timeout reached while waiting for translation.")
+        logging.error(f"Error during streaming translation after {len(lines)} lines: {str(e)}")
+
+    return lines, complete
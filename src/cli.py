@@ -0,0 +1,221 @@
+"""
+GUIを使わずに翻訳を実行するコマンドラインのエントリポイント
+
+ビルドサーバーや定期実行のジョブから使うことを想定している。TkEasyGUIは読み込まない。
+
+    python src/cli.py mod ftbquests --instance-dir /path/to/minecraft --concurrency 8
+
+結果の概要はJSONで標準出力に、ログは標準エラー出力とログディレクトリの translate.log に、
+段階ごとの所要時間やリクエスト数などの計測結果はログディレクトリの run_report.json に出力する。
+終了コード: 0 = すべて成功、1 = 失敗した翻訳対象がある、2 = 引数の誤り
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+from log import setup_logging, timestamped_log_directory
+from metrics import run_metrics
+from provider import (
+    set_api_key, set_api_base, set_chunk_size, set_model, set_prompt, set_log_directory, set_temperature,
+    set_request_interval, set_requests_per_minute, set_tokens_per_minute, set_concurrency, set_translation_memory,
+    set_input_token_budget, set_output_token_budget, set_incremental, set_scan_mode, set_scan_workers,
+    set_patchouli_output, set_streaming, set_translation_backend, set_batch_poll_interval, set_resume, set_deduplicate,
+    provide_api_key
+)
+
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+# 翻訳対象。実行するモジュールは load_target で実行時に読み込む
+TARGETS = ('mod', 'ftbquests', 'betterquesting', 'patchouli')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='minecraft-mods-localizer',
+        description="MinecraftのMod、クエスト、Patchouliのブックを日本語に翻訳する"
+    )
+    parser.add_argument('targets', nargs='+', choices=list(TARGETS), help="翻訳対象(複数指定した場合は順に実行)")
+    parser.add_argument('--instance-dir', type=Path, help="Minecraftのディレクトリ(mods/, config/ などがある場所)。省略時はカレントディレクトリ")
+    parser.add_argument('--log-dir', type=Path, help="ログの出力先。省略時は logs/localizer/<日時>")
+
+    api = parser.add_argument_group('API')
+    api.add_argument('--api-key', help="APIキー。省略時は環境変数 OPENAI_API_KEY")
+    api.add_argument('--api-base', help="OpenAI互換APIのベースURL")
+    api.add_argument('--model')
+    api.add_argument('--temperature', type=float)
+    api.add_argument('--prompt-file', type=Path, help="翻訳プロンプトを記述したファイル")
+
+    chunking = parser.add_argument_group('chunking')
+    chunking.add_argument('--chunk-size', type=int)
+    chunking.add_argument('--input-token-budget', type=int)
+    chunking.add_argument('--output-token-budget', type=int)
+
+    throughput = parser.add_argument_group('throughput')
+    throughput.add_argument('--concurrency', type=int, help="同時に送信するAPIリクエスト数")
+    throughput.add_argument('--request-interval', type=float, help="APIリクエストの最小間隔(秒)")
+    throughput.add_argument('--requests-per-minute', type=int)
+    throughput.add_argument('--tokens-per-minute', type=int)
+    throughput.add_argument('--streaming', action='store_true', help="応答をストリーミングで受け取り、途中で切れた場合は残りの行だけを再送する")
+    throughput.add_argument('--backend', choices=['chat', 'batch'], help="batch はOpenAI Batch APIで全チャンクを一括で送信する")
+    throughput.add_argument('--batch-poll-interval', type=float, help="Batch APIのジョブの状態を確認する間隔(秒)")
+    throughput.add_argument('--scan-mode', choices=['thread', 'process'])
+    throughput.add_argument('--scan-workers', type=int)
+
+    output = parser.add_argument_group('output')
+    output.add_argument('--patchouli-output', choices=['resourcepack', 'jar'])
+    output.add_argument('--incremental', action='store_true', help="前回から変更のないModは同じ翻訳設定の場合のみ前回の翻訳結果を再利用する")
+    output.add_argument('--resume', action='store_true', help="前回中断した翻訳のジャーナルを読み込み、翻訳済みのチャンクを飛ばす")
+    output.add_argument('--deduplicate', action='store_true', help="MODをまたいで同じ原文を一度だけ翻訳し、同じ訳文を使う(既定ではキーごとに翻訳する)")
+    output.add_argument('--translation-memory', action='store_true', help="翻訳メモリ(モデル・プロンプト・温度が同じ過去の翻訳結果)を使用する")
+    return parser
+
+
+def apply_settings(args):
+    """
+    コマンドライン引数のうち指定されたものを provider に反映する
+    """
+    set_api_key(args.api_key or os.environ.get('OPENAI_API_KEY') or provide_api_key())
+    if args.api_base:
+        set_api_base(args.api_base)
+    if args.model:
+        set_model(args.model)
+    if args.temperature is not None:
+        set_temperature(args.temperature)
+    if args.prompt_file:
+        set_prompt(args.prompt_file.read_text(encoding='utf-8'))
+
+    if args.chunk_size is not None:
+        set_chunk_size(args.chunk_size)
+    if args.input_token_budget is not None:
+        set_input_token_budget(args.input_token_budget)
+    if args.output_token_budget is not None:
+        set_output_token_budget(args.output_token_budget)
+
+    if args.concurrency is not None:
+        set_concurrency(args.concurrency)
+    if args.request_interval is not None:
+        set_request_interval(args.request_interval)
+    if args.requests_per_minute is not None:
+        set_requests_per_minute(args.requests_per_minute)
+    if args.tokens_per_minute is not None:
+        set_tokens_per_minute(args.tokens_per_minute)
+    if args.streaming:
+        set_streaming(True)
+    if args.backend:
+        set_translation_backend(args.backend)
+    if args.batch_poll_interval is not None:
+        set_batch_poll_interval(args.batch_poll_interval)
+    if args.scan_mode:
+        set_scan_mode(args.scan_mode)
+    if args.scan_workers is not None:
+        set_scan_workers(args.scan_workers)
+
+    if args.patchouli_output:
+        set_patchouli_output(args.patchouli_output)
+    if args.incremental:
+        set_incremental(True)
+    if args.deduplicate:
+        set_deduplicate(True)
+    if args.translation_memory:
+        set_translation_memory(True)
+    if args.resume:
+        set_resume(True)
+
+
+def load_target(target):
+    """
+    翻訳対象を実行する関数を返す
+
+    OpenAI SDKなどの読み込みを翻訳開始時まで遅らせるため関数内でインポートする。
+    実行ファイル化(Nuitka)で依存関係をたどれるよう、importlibではなく通常のimport文で書く。
+    """
+    if target == 'mod':
+        from mod import translate_from_jar
+        return translate_from_jar
+    if target == 'ftbquests':
+        from quests import translate_ftbquests
+        return translate_ftbquests
+    if target == 'betterquesting':
+        from quests import translate_betterquesting
+        return translate_betterquesting
+    if target == 'patchouli':
+        from patchouli import translate_patchouli
+        return translate_patchouli
+    raise ValueError(f"Unknown target: {target}")
+
+
+def run_targets(targets):
+    """
+    翻訳対象を順に実行し、対象ごとの結果を返す。失敗しても残りの対象は実行する
+    """
+    results = []
+    for target in targets:
+        start = time.perf_counter()
+        try:
+            load_target(target)()
+            result = {"target": target, "status": "success"}
+        except Exception as e:
+            logging.exception(f"Failed to translate {target}")
+            result = {"target": target, "status": "failure", "error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_SUCCESS
+
+    # 引数のパスは、カレントディレクトリを移動する前に呼び出し元からの相対パスとして解決する
+    if args.log_dir:
+        args.log_dir = args.log_dir.resolve()
+    if args.prompt_file:
+        args.prompt_file = args.prompt_file.resolve()
+
+    if args.instance_dir:
+        if not args.instance_dir.is_dir():
+            print(f"Instance directory not found: {args.instance_dir}", file=sys.stderr)
+            return EXIT_USAGE
+        # init.py のパスはすべてカレントディレクトリからの相対パス
+        os.chdir(args.instance_dir)
+
+    log_directory = args.log_dir or timestamped_log_directory()
+    setup_logging(log_directory, stream=sys.stderr)
+    set_log_directory(log_directory)
+
+    try:
+        apply_settings(args)
+    except OSError as e:
+        print(f"Failed to read settings: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    run_metrics.reset()
+    results = run_targets(list(dict.fromkeys(args.targets)))
+    succeeded = all(result["status"] == "success" for result in results)
+    report_path = run_metrics.write_report(log_directory)
+
+    summary = {
+        "status": "success" if succeeded else "failure",
+        "instance_dir": os.getcwd(),
+        "log_directory": str(Path(log_directory).resolve()),
+        "run_report": str(Path(report_path).resolve()),
+        "targets": results
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return EXIT_SUCCESS if succeeded else EXIT_FAILURE
+
+
+if __name__ == '__main__':
+    # 実行ファイル化した環境でプロセス並列のJAR走査を行うために必要
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -10,6 +10,14 @@ FTBQUESTS_DIR4 = Path('./config/ftbquests/quests/chapter_groups.snbt')
 
 MAX_ATTEMPTS = 5
 
+# RESOURCE_DIR直下に保存する、JARごとの翻訳状況の記録
+MOD_MANIFEST_FILE_NAME = 'localizer_manifest.json'
+
+TRANSLATION_MEMORY_PATH = Path('./logs/localizer/translation_memory.sqlite3')
+
+# ログディレクトリに保存する、完了したチャンクの翻訳結果の記録(中断した翻訳の再開用)
+JOURNAL_FILE_NAME = 'translation_journal.jsonl'
+
 USER = 'idunafu'
 REPO = 'MinecraftModsLocalizer'
 VERSION = 'v2.1.3-fork'
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from init import JOURNAL_FILE_NAME
+
+
+def chunk_key(texts: List[str], keys: List[str]) -> str:
+    """
+    チャンクの送信内容(ヘッダーを含む行リスト)と訳文を対応付けるキーの列からジャーナルのキーを作成する
+    """
+    return hashlib.sha256(('\n'.join(texts) + '\0' + '\n'.join(keys)).encode('utf-8')).hexdigest()
+
+
+class TranslationJournal:
+    """
+    完了したチャンクの翻訳結果を1行ずつ追記するJSONLファイル
+
+    追記のたびにディスクへ書き出すため、途中でプロセスが終了してもそれまでのチャンクは失われない。
+    複数スレッドから append を呼び出してよい。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def append(self, key: str, settings: str, translations: Dict[str, str], complete: bool) -> None:
+        self.extend([(key, settings, translations, complete)])
+
+    def extend(self, records: List[Tuple[str, str, Dict[str, str], bool]]) -> None:
+        if not records:
+            return
+        data = ''.join(
+            json.dumps({"chunk": key, "settings": settings, "complete": complete, "translations": translations}, ensure_ascii=False) + '\n'
+            for key, settings, translations, complete in records
+        )
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def load(path, settings: str) -> Dict[str, Dict[str, str]]:
+        """
+        ジャーナルから、同じ設定で最後まで翻訳できたチャンクを {キー: {langキー: 訳文}} で返す
+
+        書き込み途中で中断された最後の行など、読めない行は無視する。
+        """
+        completed: Dict[str, Dict[str, str]] = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("settings") == settings and record.get("complete"):
+                    completed[record["chunk"]] = record["translations"]
+        return completed
+
+
+def find_latest_journal(log_directory) -> Optional[Path]:
+    """
+    ログディレクトリとその兄弟(以前の実行のログディレクトリ)から、最後に更新されたジャーナルを探す
+    """
+    log_directory = Path(log_directory)
+    candidates = [log_directory / JOURNAL_FILE_NAME]
+    if log_directory.parent.is_dir():
+        candidates.extend(directory / JOURNAL_FILE_NAME for directory in log_directory.parent.iterdir() if directory.is_dir())
+    journals = [path for path in set(candidates) if path.is_file()]
+    return max(journals, key=lambda path: path.stat().st_mtime_ns) if journals else None
+
+
+def open_journal(log_directory, settings: str, resume: bool) -> Tuple[Optional[TranslationJournal], Dict[str, Dict[str, str]]]:
+    """
+    今回の実行のジャーナルを開き、再開する場合は前回までに完了したチャンクを返す
+
+    前回のジャーナルから読み込んだチャンクは今回のジャーナルにも書き写し、再開を繰り返せるようにする。
+    ログディレクトリが設定されていない場合はジャーナルを使わない。
+    """
+    if log_directory is None:
+        return None, {}
+
+    path = Path(log_directory) / JOURNAL_FILE_NAME
+    completed: Dict[str, Dict[str, str]] = {}
+    previous = find_latest_journal(log_directory) if resume else None
+    if previous:
+        completed = TranslationJournal.load(previous, settings)
+        logging.info(f"Resuming from {previous}: {len(completed)} chunks already translated")
+    elif resume:
+        logging.info("No translation journal found to resume from")
+
+    journal = TranslationJournal(path)
+    if previous and previous.resolve() != path.resolve():
+        journal.extend([(key, settings, translations, True) for key, translations in completed.items()])
+    return journal, completed
@@ -0,0 +1,84 @@
+import json
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+# 空白を読み飛ばし、次のトークン(括弧、コロン、カンマ、文字列、それ以外の値)を一つ読む
+_TOKEN_PATTERN = re.compile(r'\s*(?:([{}\[\]:,])|"((?:[^"\\]|\\.)*)"|([^\s{}\[\]:,"]+)|$)', re.DOTALL)
+
+
+class JsonString(NamedTuple):
+    """
+    JSON内の文字列の値
+
+    start/end は引用符を除いた中身の位置。content[start:end] はエスケープされたままの表記で、
+    value はエスケープを解除した文字列(json.loads と同じ値)。
+    key はこの文字列(またはこの文字列を含むリスト)が割り当てられたキー。
+    """
+    start: int
+    end: int
+    value: str
+    key: Optional[str]
+    in_list: bool
+
+
+def scan_json_strings(content: str) -> Iterator[JsonString]:
+    """
+    JSONを先頭から走査し、値として現れる文字列を位置とキーと共に返す
+
+    オブジェクトのキーとして使われた文字列は返さない。
+
+    Raises:
+        json.JSONDecodeError: JSONとして読めない場合(走査の前に検証する)
+    """
+    # 構文の検証はjsonモジュールに任せ、以降の走査では位置とキーだけを追う
+    json.loads(content, strict=False)
+
+    # スタックの要素: [コンテナの種類('{' または '['), コンテナが割り当てられたキー]
+    stack: List[list] = []
+    current_key: Optional[str] = None
+    expecting_key = False
+    index = 0
+    match_token = _TOKEN_PATTERN.match
+
+    while True:
+        match = match_token(content, index)
+        punctuation, string, _ = match.groups()
+        index = match.end()
+
+        if match.lastindex is None:
+            # 入力の終わり
+            break
+
+        if punctuation is not None:
+            if punctuation == '{':
+                stack.append(['{', current_key])
+                expecting_key = True
+            elif punctuation == '[':
+                stack.append(['[', current_key])
+                expecting_key = False
+            elif punctuation == ':':
+                expecting_key = False
+            elif punctuation == ',':
+                expecting_key = stack[-1][0] == '{'
+            else:
+                stack.pop()
+                current_key = stack[-1][1] if stack and stack[-1][0] == '[' else None
+            continue
+
+        if string is None:
+            continue
+
+        value = json.loads(f'"{string}"', strict=False)
+        in_list = bool(stack) and stack[-1][0] == '['
+        if expecting_key and not in_list:
+            current_key = value
+        else:
+            key = stack[-1][1] if in_list else current_key
+            yield JsonString(index - 1 - len(string), index - 1, value, key, in_list)
+
+
+def encode_json_string(value: str) -> str:
+    """
+    文字列をJSONの文字列の中身(引用符を除いたエスケープ済みの表記)に変換する
+    """
+    return json.dumps(value, ensure_ascii=False)[1:-1]
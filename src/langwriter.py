@@ -0,0 +1,104 @@
+import heapq
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Tuple
+
+# 一度にマージするランの数の上限(同時に開くファイル数を抑える)
+MAX_OPEN_RUNS = 64
+
+
+def read_run(run_path) -> Iterator[Tuple[str, str]]:
+    with open(run_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            key, value = json.loads(line)
+            yield key, value
+
+
+def merge_entries(iterables) -> Iterator[Tuple[str, str]]:
+    """
+    キー順に並んだ (キー, 値) の列をマージする。同じキーは後の列の値を採用する(dict.updateと同じ)
+    """
+    previous = None
+    for entry in heapq.merge(*iterables, key=lambda entry: entry[0]):
+        # heapq.merge は同じキーを渡された列の順に返す
+        if previous is not None and previous[0] != entry[0]:
+            yield previous
+        previous = entry
+    if previous is not None:
+        yield previous
+
+
+class SortedLangWriter:
+    """
+    ja_jp.json のようなキー順のJSONを、全エントリをメモリに持たずに書き出すライター
+
+    add_run でMODごとなどの (キー, 値) をソートして一時ファイルに書き出し(ラン)、
+    write でランを外部マージしながら1エントリずつ出力する。
+    出力は json.dump(dict(sorted(...)), ensure_ascii=False, indent=4) と同じ内容になる。
+    """
+
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='localizer-lang-')
+        self.runs: List[str] = []
+        self.run_count = 0
+        self.entries = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def add_run(self, entries: Iterable[Tuple[str, str]]) -> None:
+        entries = sorted(entries, key=lambda entry: entry[0])
+        if not entries:
+            return
+        self.runs.append(self.write_run(entries))
+        self.entries += len(entries)
+
+    def write_run(self, entries: Iterable[Tuple[str, str]]) -> str:
+        run_path = os.path.join(self.directory, f"run_{self.run_count:06d}.jsonl")
+        self.run_count += 1
+        with open(run_path, 'w', encoding='utf-8') as f:
+            for key, value in entries:
+                f.write(json.dumps([key, value], ensure_ascii=False) + '\n')
+        return run_path
+
+    def merged_runs(self) -> List[str]:
+        """
+        ランが MAX_OPEN_RUNS を超える場合は、先にまとめてマージしてランの数を減らす
+        """
+        runs = list(self.runs)
+        while len(runs) > MAX_OPEN_RUNS:
+            group, runs = runs[:MAX_OPEN_RUNS], runs[MAX_OPEN_RUNS:]
+            # 同じキーは後のランを優先するため、マージしたランは先頭に置く
+            runs.insert(0, self.write_run(merge_entries(read_run(run) for run in group)))
+            for run in group:
+                os.remove(run)
+        self.runs = runs
+        return runs
+
+    def write(self, output_path, indent: int = 4) -> int:
+        """
+        マージした結果を output_path に書き出し、書き出したエントリ数を返す
+
+        一時ファイルに書き出してから置き換えるため、途中で失敗しても前回の出力は残る。
+        """
+        runs = self.merged_runs()
+        padding = ' ' * indent
+        count = 0
+        temporary_path = f"{output_path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            f.write('{')
+            for key, value in merge_entries(read_run(run) for run in runs):
+                f.write(',\n' if count else '\n')
+                f.write(f"{padding}{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}")
+                count += 1
+            f.write('\n}' if count else '}')
+        os.replace(temporary_path, output_path)
+        return count
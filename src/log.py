@@ -1,9 +1,22 @@
 import logging
 import os
 import sys
+from datetime import datetime
+from pathlib import Path
 
 
-def setup_logging(directory):
+def timestamped_log_directory(root=Path('./logs/localizer')):
+    """
+    実行ごとのログディレクトリ(例: ./logs/localizer/2023-10-15_17-30-29)のパスを返す
+    """
+    # ファイル名として安全な形式に日時を整形
+    return Path(root) / datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+
+def setup_logging(directory, stream=sys.stdout):
+    """
+    directory/translate.log と stream にログを出力する。stream が None の場合はファイルのみに出力する
+    """
     log_file = "translate.log"
 
     # ディレクトリが存在しない場合は作成
@@ -13,12 +26,13 @@ def setup_logging(directory):
     # ログファイルのフルパス
     log_path = os.path.join(directory, log_file)
 
+    handlers = [logging.FileHandler(log_path)]  # ログをファイルに出力
+    if stream is not None:
+        handlers.append(logging.StreamHandler(stream))  # ログをコンソールに出力
+
     # ロガーの設定
     logging.basicConfig(
         level=logging.INFO,  # INFOレベル以上のログを取得
         format='%(asctime)s %(levelname)s %(message)s',  # ログのフォーマット
-        handlers=[
-            logging.FileHandler(log_path),  # ログをファイルに出力
-            logging.StreamHandler(sys.stdout)  # ログをコンソールに出力
-        ]
+        handlers=handlers
     )
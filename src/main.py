@@ -5,19 +5,22 @@
 #    nuitka-project: --windows-product-version="2.1.3.2"
 #    nuitka-project: --copyright="MIT"
 
-from pathlib import Path
 import logging
-from datetime import datetime
+import multiprocessing
+import os
 import TkEasyGUI as sg
 
-from provider import set_api_key, set_chunk_size, provide_chunk_size, set_model, provide_model, set_prompt, provide_prompt, set_log_directory, set_api_base, provide_api_base, set_temperature, provide_temperature, set_request_interval, provide_request_interval
-from mod import translate_from_jar
-from quests import translate_ftbquests, translate_betterquesting
-from patchouli import translate_patchouli
-from log import setup_logging
+from provider import set_api_key, set_chunk_size, provide_chunk_size, set_model, provide_model, set_prompt, provide_prompt, set_log_directory, set_api_base, provide_api_base, set_temperature, provide_temperature, set_request_interval, provide_request_interval, set_concurrency, provide_concurrency, set_translation_memory, provide_translation_memory, set_input_token_budget, provide_input_token_budget, set_output_token_budget, provide_output_token_budget, set_incremental, provide_incremental, set_scan_mode, provide_scan_mode, set_scan_workers, provide_scan_workers, set_patchouli_output, provide_patchouli_output, set_streaming, provide_streaming, set_translation_backend, provide_translation_backend, set_resume, provide_resume, set_deduplicate, provide_deduplicate
+from log import setup_logging, timestamped_log_directory
+# 翻訳対象のモジュール(OpenAI SDKを含む)は翻訳開始時に load_target で読み込む
+from cli import load_target
+from metrics import run_metrics
 
 
 if __name__ == '__main__':
+    # 実行ファイル化した環境でプロセス並列のJAR走査を行うために必要
+    multiprocessing.freeze_support()
+
     # APIエンドポイントの選択肢
     api_endpoints = [
         "",
@@ -45,6 +48,14 @@ if __name__ == '__main__':
         [sg.Text("Chunk Size")],
         [sg.Text("単体mod翻訳、クエスト、Patchouliの翻訳では1\nModPackで大量のModを一括で翻訳するときは100くらいまで上げることをお勧めします(1だと翻訳時間がすごいことになります)")],
         [sg.Slider(range=(1, 200), key='CHUNK_SIZE', default_value=provide_chunk_size(), expand_x=True)],
+        [sg.Checkbox("前回から変更のないModはスキップする(Mod翻訳のみ)", key='INCREMENTAL', default=provide_incremental())],
+        [sg.Checkbox("前回中断した翻訳を再開する(翻訳済みのチャンクは送信しません)", key='RESUME', default=provide_resume())],
+        [sg.Text("Patchouliの出力先: resourcepackはリソースパックに出力し、Modのjarは変更しません。jarはModのjarに直接追記します(古いPatchouli向け)")],
+        [sg.Combo(['resourcepack', 'jar'], default_value=provide_patchouli_output(), key='PATCHOULI_OUTPUT', readonly=True)],
+        [sg.Text("Token Budget (Input / Output)")],
+        [sg.Text("0以外を設定すると、行数ではなく推定トークン数でチャンクを詰めます(Chunk Sizeは無視されます)")],
+        [sg.Slider(range=(0, 16000), resolution=500, key='INPUT_TOKEN_BUDGET', default_value=provide_input_token_budget(), expand_x=True)],
+        [sg.Slider(range=(0, 16000), resolution=500, key='OUTPUT_TOKEN_BUDGET', default_value=provide_output_token_budget(), expand_x=True)],
     ]
     
     # 高度な設定タブのレイアウト
@@ -57,8 +68,23 @@ if __name__ == '__main__':
         [sg.Text("APIリクエストの温度を制御します。低い値は予測可能な結果に、高い値は多様な結果になります。(0.0〜2.0)")],
         [sg.Slider(range=(0.0, 2.0), resolution=0.1, key='TEMPERATURE', default_value=provide_temperature(), expand_x=True)],
         [sg.Text("Request Interval (seconds)")],
-        [sg.Text("APIリクエスト間の待機時間を設定します。レート制限対策や、リクエストの間隔を空けたい場合に使用します。(0.0〜10.0秒)")], 
+        [sg.Text("APIリクエスト間の最小待機時間を設定します。レート制限(429)を受けた場合は自動で間隔を広げます。(0.0〜10.0秒)")], 
         [sg.Slider(range=(0.0, 10.0), resolution=0.1, key='REQUEST_INTERVAL', default_value=provide_request_interval(), expand_x=True)],
+        [sg.Text("Concurrent Requests")],
+        [sg.Text("同時に送信するAPIリクエスト数を設定します。大きくすると翻訳が速くなりますが、レート制限に掛かりやすくなります。(1〜32)")],
+        [sg.Slider(range=(1, 32), key='CONCURRENCY', default_value=provide_concurrency(), expand_x=True)],
+        [sg.Checkbox("応答をストリーミングで受け取る(接続が切れても受信済みの行は再送しません)", key='STREAMING', default=provide_streaming())],
+        [sg.Text("Translation Backend")],
+        [sg.Text("batchはOpenAI Batch APIで全チャンクを一括で送信します。完了まで時間がかかります(最大24時間)が、費用が安くなります。")],
+        [sg.Combo(['chat', 'batch'], default_value=provide_translation_backend(), key='TRANSLATION_BACKEND', readonly=True)],
+        [sg.Text("JAR Scan")],
+        [sg.Text("Mod翻訳でJARを読み込む方式とワーカー数を設定します。processはCPUを多く使う大規模なModPack向けです。")],
+        [sg.Combo(['thread', 'process'], default_value=provide_scan_mode(), key='SCAN_MODE', readonly=True),
+         sg.Slider(range=(1, max(32, os.cpu_count() or 1)), key='SCAN_WORKERS', default_value=provide_scan_workers(), expand_x=True)],
+        [sg.Text("Deduplication")],
+        [sg.Checkbox("MODをまたいで同じ原文を一度だけ翻訳し、同じ訳文を使う", key='DEDUPLICATE', default=provide_deduplicate())],
+        [sg.Text("Translation Memory")],
+        [sg.Checkbox("過去の翻訳結果を再利用する(モデル・プロンプト・温度が同じ場合のみ)", key='TRANSLATION_MEMORY', default=provide_translation_memory())],
         [sg.Text("Prompt")],
         [sg.Multiline(key='PROMPT', default_text=provide_prompt(), expand_x=True, size=(80, 10))],
     ]
@@ -75,15 +101,8 @@ if __name__ == '__main__':
     # ウィンドウの作成
     window = sg.Window('MinecraftModLocalizer', layout, size=(900, 500), resizable=True)
 
-    # 現在の日時を取得
-    now = datetime.now()
-
-    # ファイル名として安全な形式に日時を整形
-    # 例：2023-10-15_17-30-29
-    current_time = now.strftime("%Y-%m-%d_%H-%M-%S")
-
     # ログを保存するディレクトリを指定
-    log_directory = Path(f"./logs/localizer/{current_time}")
+    log_directory = timestamped_log_directory()
 
     # ログの設定
     setup_logging(log_directory)
@@ -103,24 +122,39 @@ if __name__ == '__main__':
             set_api_key(values['OPENAI_API_KEY'])
             set_api_base(values['API_BASE'] if values['API_BASE'].strip() else None)
             set_chunk_size(int(values['CHUNK_SIZE']))
+            set_incremental(bool(values['INCREMENTAL']))
+            set_resume(bool(values['RESUME']))
+            set_patchouli_output(values['PATCHOULI_OUTPUT'])
+            set_input_token_budget(int(values['INPUT_TOKEN_BUDGET']))
+            set_output_token_budget(int(values['OUTPUT_TOKEN_BUDGET']))
             set_model(values['MODEL'])
             set_temperature(float(values['TEMPERATURE']))
             set_request_interval(float(values['REQUEST_INTERVAL']))
+            set_concurrency(int(values['CONCURRENCY']))
+            set_streaming(bool(values['STREAMING']))
+            set_translation_backend(values['TRANSLATION_BACKEND'])
+            set_deduplicate(bool(values['DEDUPLICATE']))
+            set_translation_memory(bool(values['TRANSLATION_MEMORY']))
+            set_scan_mode(values['SCAN_MODE'])
+            set_scan_workers(int(values['SCAN_WORKERS']))
             set_prompt(values['PROMPT'])
 
             try:
                 if values['target1']:
-                    translate_from_jar()
+                    load_target('mod')()
                 elif values['target2']:
-                    translate_ftbquests()
+                    load_target('ftbquests')()
                 elif values['target3']:
-                    translate_betterquesting()
+                    load_target('betterquesting')()
                 elif values['target4']:
-                    translate_patchouli()
+                    load_target('patchouli')()
             except Exception as e:
                 logging.error(e)
                 sg.popup('翻訳失敗')
                 break
+            finally:
+                # translate.log と同じディレクトリに計測結果を保存する
+                run_metrics.write_report(log_directory)
 
             sg.popup('翻訳成功！')
             break
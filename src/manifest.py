@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List
+
+# 2: keys をlangファイルのキーに変更(1では原文を記録していた)
+# 3: 翻訳設定のハッシュ(settings)を追加し、lang_sha256 をキーと原文の組から計算するように変更
+MANIFEST_VERSION = 3
+
+
+def file_sha256(file_path) -> str:
+    """
+    ファイル内容のSHA-256を返す
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def lang_sha256(keys: List[str], texts: List[str]) -> str:
+    """
+    langファイルから抽出したキーとテキストの組のSHA-256を返す
+    """
+    pairs = list(zip(keys, texts))
+    return hashlib.sha256(json.dumps(pairs, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def jar_fingerprint(jar_path) -> Dict[str, Any]:
+    """
+    JARのサイズ、更新日時、SHA-256を返す
+    """
+    stat = os.stat(jar_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(jar_path)
+    }
+
+
+def is_jar_unchanged(jar_path, entry: Dict[str, Any]) -> bool:
+    """
+    マニフェストのエントリと比べてJARが変更されていないかを判定する
+
+    サイズと更新日時が一致すればハッシュ計算を省略する。一致しない場合のみSHA-256で比較し、
+    内容が同じであればエントリの更新日時を書き換える。
+    """
+    try:
+        stat = os.stat(jar_path)
+    except OSError:
+        return False
+
+    if stat.st_size != entry.get("size"):
+        return False
+    if stat.st_mtime_ns == entry.get("mtime_ns"):
+        return True
+
+    if file_sha256(jar_path) == entry.get("sha256"):
+        entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+    return False
+
+
+def is_entry_reusable(entry: Dict[str, Any], settings: str, previous_output: Dict[str, str]) -> bool:
+    """
+    エントリの翻訳結果を再利用できるかを判定する
+
+    前回すべて翻訳済みで、同じ翻訳設定(モデル、プロンプト、温度)で翻訳され、
+    記録したキーの訳文がすべて前回の出力に残っている場合のみ再利用できる。
+    """
+    return bool(
+        entry.get("complete")
+        and entry.get("settings") == settings
+        and all(key in previous_output for key in entry.get("keys", []))
+    )
+
+
+def load_manifest(manifest_path) -> Dict[str, Dict[str, Any]]:
+    """
+    マニフェストを読み込み、{JARファイル名: エントリ} を返す。存在しないか壊れている場合は空
+
+    エントリ: {"size", "mtime_ns", "sha256", "lang_sha256", "settings", "mod_name", "keys", "complete"}
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Failed to load manifest {manifest_path}, translating all JARs: {str(e)}")
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        logging.info(f"Manifest version mismatch in {manifest_path}, translating all JARs")
+        return {}
+
+    return manifest.get("jars", {})
+
+
+def save_manifest(manifest_path, jars: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(str(manifest_path)) or '.', exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "jars": dict(sorted(jars.items()))}, f, ensure_ascii=False, indent=2)
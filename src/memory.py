@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional
+
+from init import TRANSLATION_MEMORY_PATH
+from provider import provide_model, provide_prompt, provide_temperature, provide_translation_memory, provide_translation_memory_max_entries
+
+# SQLiteのプレースホルダ数上限(古いSQLiteでは999)を超えないように分割して問い合わせる
+LOOKUP_BATCH_SIZE = 500
+
+
+def settings_hash() -> str:
+    """
+    翻訳結果に影響する設定(モデル、プロンプト、温度)からハッシュを作成する
+    """
+    source = '\0'.join([provide_model() or '', provide_prompt() or '', str(provide_temperature())])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+class TranslationMemory:
+    """
+    原文と設定ハッシュをキーに訳文を保存するSQLiteベースの翻訳メモリ
+
+    エントリ数が max_entries を超えた場合は最後に使われた日時が古いものから削除する
+    """
+
+    def __init__(self, db_path, max_entries: int = 0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(str(db_path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(str(db_path))
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source, settings)
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self.connection.commit()
+
+    def lookup(self, texts: Iterable[str], settings: str) -> Dict[str, str]:
+        """
+        翻訳メモリに存在する原文の訳文を {原文: 訳文} で返す
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        found: Dict[str, str] = {}
+
+        for i in range(0, len(unique_texts), LOOKUP_BATCH_SIZE):
+            batch = unique_texts[i:i + LOOKUP_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f"SELECT source, translated FROM translations WHERE settings = ? AND source IN ({placeholders})",
+                [settings, *batch]
+            ).fetchall()
+            found.update(rows)
+
+        # ヒットしたエントリの最終使用日時を更新する(LRU削除用)
+        if found:
+            now = time.time()
+            self.connection.executemany(
+                "UPDATE translations SET last_used = ? WHERE source = ? AND settings = ?",
+                [(now, source, settings) for source in found]
+            )
+            self.connection.commit()
+
+        return found
+
+    def store(self, translations: Dict[str, Optional[str]], settings: str) -> None:
+        """
+        訳文を翻訳メモリに保存する。訳文がNoneのものは保存しない
+        """
+        now = time.time()
+        rows = [(source, settings, translated, now) for source, translated in translations.items() if translated is not None]
+        if not rows:
+            return
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO translations (source, settings, translated, last_used) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self.connection.commit()
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        エントリ数の上限を超えた分を最終使用日時の古い順に削除し、削除件数を返す
+        """
+        if self.max_entries <= 0:
+            return 0
+
+        count = self.connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+
+        self.connection.execute(
+            "DELETE FROM translations WHERE rowid IN (SELECT rowid FROM translations ORDER BY last_used ASC LIMIT ?)",
+            (overflow,)
+        )
+        self.connection.commit()
+        logging.info(f"Evicted {overflow} entries from translation memory")
+        return overflow
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def open_translation_memory() -> Optional[TranslationMemory]:
+    """
+    設定で翻訳メモリが有効な場合に TranslationMemory を開く。無効な場合や開けない場合はNoneを返す
+    """
+    if not provide_translation_memory():
+        return None
+
+    try:
+        return TranslationMemory(TRANSLATION_MEMORY_PATH, provide_translation_memory_max_entries())
+    except sqlite3.Error as e:
+        logging.error(f"Failed to open translation memory {TRANSLATION_MEMORY_PATH}: {str(e)}")
+        return None
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+REPORT_FILE_NAME = 'run_report.json'
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    最近傍順位法でパーセンタイルを求める(q は 0〜100)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil(len * q / 100)
+    return ordered[int(rank) - 1]
+
+
+def peak_memory_bytes() -> Optional[int]:
+    """
+    プロセス開始からのピークメモリ使用量(最大RSS、Windowsではピークワーキングセット)を返す。取得できない場合はNone
+    """
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            if not kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return None
+            return counters.PeakWorkingSetSize
+
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linuxでは KiB、macOSでは bytes
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+    except (ImportError, OSError, AttributeError):
+        return None
+
+
+class RunMetrics:
+    """
+    1回の翻訳で計測した値を集める、スレッドセーフな集計器
+
+    - count: 件数やトークン数などの合計
+    - observe: リクエストの所要時間など分布を見たい値(p50/p95を出力)
+    - timed: 段階(JAR走査、チャンク作成、翻訳など)ごとの所要時間の合計
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.started_at = time.time()
+            self.counters: Dict[str, float] = {}
+            self.samples: Dict[str, List[float]] = {}
+            self.stages: Dict[str, float] = {}
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self.lock:
+            self.samples.setdefault(name, []).append(value)
+
+    def add_stage_time(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            counters = dict(self.counters)
+            stages = {stage: round(seconds, 4) for stage, seconds in self.stages.items()}
+            distributions = {
+                name: {
+                    "count": len(values),
+                    "mean": round(sum(values) / len(values), 4),
+                    "p50": round(percentile(values, 50), 4),
+                    "p95": round(percentile(values, 95), 4),
+                    "max": round(max(values), 4)
+                }
+                for name, values in self.samples.items() if values
+            }
+            started_at = self.started_at
+
+        translation_seconds = stages.get("translation", 0.0)
+        throughput = {}
+        if translation_seconds > 0:
+            throughput["strings_per_second"] = round(counters.get("strings_translated", 0) / translation_seconds, 2)
+        if stages.get("jar_scan", 0.0) > 0:
+            throughput["jars_per_second"] = round(counters.get("jars_scanned", 0) / stages["jar_scan"], 2)
+
+        peak_memory = peak_memory_bytes()
+        return {
+            "started_at": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started_at)),
+            "wall_seconds": round(time.time() - started_at, 3),
+            "stages": stages,
+            "counters": counters,
+            "distributions": distributions,
+            "throughput": throughput,
+            # プロセス全体のピークのため、同じプロセスで複数回翻訳した場合はそれまでの最大値になる
+            "peak_memory_mb": round(peak_memory / (1024 * 1024), 1) if peak_memory is not None else None
+        }
+
+    def write_report(self, directory) -> str:
+        """
+        計測結果を directory/run_report.json に書き出し、そのパスを返す
+        """
+        os.makedirs(str(directory), exist_ok=True)
+        report_path = os.path.join(str(directory), REPORT_FILE_NAME)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        logging.info(f"Saved run report to {report_path}")
+        return report_path
+
+
+# プロセス内で共有する集計器。各モジュールはこれに記録し、エントリポイントが最後にレポートを書き出す
+run_metrics = RunMetrics()
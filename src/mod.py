@@ -1,62 +1,68 @@
 import json
 import logging
 import os
+import time
 import zipfile
-from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from init import RESOURCE_DIR, MODS_DIR
-from prepare import extract_map_from_json, prepare_translation
-from provider import provide_log_directory
+from init import RESOURCE_DIR, MODS_DIR, MOD_MANIFEST_FILE_NAME
+from langwriter import SortedLangWriter
+from log import setup_logging
+from metrics import run_metrics
+from manifest import load_manifest, save_manifest, is_entry_reusable, is_jar_unchanged, jar_fingerprint, lang_sha256
+from memory import settings_hash
+from prepare import extract_map_from_json_bytes, prepare_translation
+from provider import provide_log_directory, provide_incremental, provide_scan_mode, provide_scan_workers
 
 
 def process_jar_file(jar_path):
+    """
+    JARを一度だけ開き、langファイルをメモリ上で読み込んで翻訳対象のキーとテキストを返す
+
+    キーとテキストは同じ順序の並列なリスト(keys[i] の原文が texts[i])で返す。
+    JARのI/O時間(展開を含む)と読み込んだバイト数も結果に含める
+    """
     try:
-        mod_name = get_mod_name_from_jar(jar_path)
-        if mod_name is None:
-            logging.warning(f"Mod name not found in: {jar_path}")
-            return None
-
-        lang_path_in_jar = Path(f'assets/{mod_name}/lang/')
-        ja_jp_path_in_jar = os.path.join(lang_path_in_jar, 'ja_jp.json')
-        en_us_path_in_jar = os.path.join(lang_path_in_jar, 'en_us.json')
-        ja_jp_path_in_jar_str = str(ja_jp_path_in_jar).replace('\\', '/')
-        en_us_path_in_jar_str = str(en_us_path_in_jar).replace('\\', '/')
-
-        logging.info(f"Processing mod: {mod_name} from {jar_path}")
-        
-        # 一時ディレクトリを作成
-        temp_dir = os.path.join(provide_log_directory(), "temp_extract")
-        os.makedirs(temp_dir, exist_ok=True)
-
-        extracted_files = []
+        io_start = time.perf_counter()
+        bytes_read = 0
+        lang_data = []
         try:
             with zipfile.ZipFile(jar_path, 'r') as zip_ref:
-                if en_us_path_in_jar_str in zip_ref.namelist():
-                    if extract_specific_file(jar_path, en_us_path_in_jar_str, temp_dir):
-                        extracted_files.append(en_us_path_in_jar)
-                if ja_jp_path_in_jar_str in zip_ref.namelist():
-                    if extract_specific_file(jar_path, ja_jp_path_in_jar_str, temp_dir):
-                        extracted_files.append(ja_jp_path_in_jar)
+                names = zip_ref.namelist()
+                mod_name = find_mod_name(names)
+                if mod_name is None:
+                    logging.warning(f"Mod name not found in: {jar_path}")
+                    return None
+
+                # en_us.json を優先し、無い場合や翻訳対象が無い場合は ja_jp.json を使う
+                name_set = set(names)
+                for lang_file in ('en_us.json', 'ja_jp.json'):
+                    member = f'assets/{mod_name}/lang/{lang_file}'
+                    if member in name_set:
+                        data = zip_ref.read(member)
+                        bytes_read += len(data)
+                        lang_data.append((member, data))
         except zipfile.BadZipFile as e:
             logging.error(f"Invalid JAR file: {jar_path} - {str(e)}")
-            return None
-
-        # 優先順位: ja_jp.json > en_us.json
-        for file in extracted_files:
-            file_path = os.path.join(temp_dir, file)
-            if os.path.exists(file_path):
-                try:
-                    result = extract_map_from_json(file_path)
-                    if result:
-                        return {
-                            "mod_name": mod_name,
-                            "jar_path": jar_path,
-                            "texts": list(result.values())
-                        }
-                except Exception as e:
-                    logging.error(f"Error processing {file}: {str(e)}")
+            return {}
+        io_time = time.perf_counter() - io_start
+
+        logging.info(f"Processing mod: {mod_name} from {jar_path} (read {bytes_read} bytes in {io_time * 1000:.1f} ms)")
+
+        for member, data in lang_data:
+            try:
+                result = extract_map_from_json_bytes(data, f"{jar_path}!/{member}")
+                if result:
+                    return {
+                        "mod_name": mod_name,
+                        "jar_path": jar_path,
+                        "keys": list(result),
+                        "texts": list(result.values()),
+                        "bytes_read": bytes_read,
+                        "io_time": io_time
+                    }
+            except Exception as e:
+                logging.error(f"Error processing {member}: {str(e)}")
 
         logging.warning(f"No valid lang files found in: {jar_path}")
         return None
@@ -64,7 +70,71 @@ def process_jar_file(jar_path):
         logging.error(f"Unexpected error processing {jar_path}: {str(e)}")
         return {}
 
+
+def scan_jar_record(jar_path):
+    """
+    process_jar_file の結果を、ワーカーから返しやすい (mod_name, keys, texts, bytes_read, io_time) のタプルにする
+    """
+    try:
+        result = process_jar_file(jar_path)
+    except Exception as e:
+        logging.error(f"Error processing {jar_path}: {str(e)}")
+        return None
+
+    if not result:
+        return None
+    return result["mod_name"], result["keys"], result["texts"], result["bytes_read"], result["io_time"]
+
+
+def create_scan_executor():
+    """
+    設定(provide_scan_mode, provide_scan_workers)に応じてJAR走査用のExecutorを作成する
+    """
+    workers = max(1, provide_scan_workers())
+    if provide_scan_mode() == 'process':
+        log_directory = provide_log_directory()
+        # ワーカーのログはファイルのみに出力する(CLIの標準出力はJSONの結果に使うため)
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=setup_logging if log_directory else None,
+            initargs=(log_directory, None) if log_directory else ()
+        )
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def scan_jars(jar_paths):
+    """
+    JARを並列に走査し、jar_pathsと同じ順序で scan_jar_record の結果を逐次返す
+    """
+    if not jar_paths:
+        return
+
+    workers = max(1, provide_scan_workers())
+    # プロセス間通信の回数を減らすため、ワーカーあたり数回に分けてまとめて渡す
+    chunksize = max(1, len(jar_paths) // (workers * 4))
+    with create_scan_executor() as executor:
+        yield from executor.map(scan_jar_record, jar_paths, chunksize=chunksize)
+
+
+def load_previous_output(output_file):
+    """
+    前回出力したja_jp.jsonを読み込む。存在しないか壊れている場合は空
+    """
+    if not os.path.exists(output_file):
+        return {}
+
+    try:
+        with open(output_file, 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Failed to load previous output {output_file}: {str(e)}")
+        return {}
+
+
 def translate_from_jar():
+    # 進捗表示は翻訳時のみ必要なため、ここで読み込む
+    from tqdm import tqdm
+
     # リソースディレクトリの準備
     os.makedirs(os.path.join(RESOURCE_DIR, 'assets', 'japanese', 'lang'), exist_ok=True)
     
@@ -76,100 +146,170 @@ def translate_from_jar():
         logging.warning(f"No JAR files found in {MODS_DIR}")
         return
 
-    # pack.mcmetaの処理 (最初の有効なJARから取得)
-    extracted_pack_mcmeta = False
+    output_file = os.path.join(RESOURCE_DIR, 'assets', 'japanese', 'lang', 'ja_jp.json')
+    manifest_file = os.path.join(RESOURCE_DIR, MOD_MANIFEST_FILE_NAME)
+
+    # 前回から変更のないJARは、同じ翻訳設定で翻訳済みであれば前回の出力を再利用する
+    # (マニフェストを保存しない場合はJARのハッシュも計算しない)
+    incremental = provide_incremental()
+    manifest = load_manifest(manifest_file) if incremental else {}
+    previous_output = load_previous_output(output_file) if manifest else {}
+    settings = settings_hash()
+    new_manifest = {}
+    reused_targets = []
+    jars_to_scan = []
     for jar in jar_files:
-        if not extracted_pack_mcmeta:
-            extracted_pack_mcmeta = extract_specific_file(
-                os.path.join(MODS_DIR, jar),
-                'pack.mcmeta',
-                RESOURCE_DIR
-            )
-            if extracted_pack_mcmeta:
-                update_resourcepack_description(
-                    os.path.join(RESOURCE_DIR, 'pack.mcmeta'),
-                    '日本語化パック'
-                )
-                break
-
-    # 並列処理でJARファイルを処理
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = {
-            executor.submit(
-                process_jar_file,
-                os.path.join(MODS_DIR, jar)
-            ): jar for jar in jar_files
-        }
-        
-        # 進捗表示
-        for future in tqdm(
-            as_completed(futures),
-            total=len(jar_files),
+        entry = manifest.get(jar)
+        if (
+            entry
+            and is_entry_reusable(entry, settings, previous_output)
+            and is_jar_unchanged(os.path.join(MODS_DIR, jar), entry)
+        ):
+            reused_targets.extend((key, previous_output[key]) for key in entry["keys"])
+            new_manifest[jar] = entry
+        else:
+            jars_to_scan.append(jar)
+
+    # JARが更新されてもlangファイルが変わっていないMODは、走査後にMOD名で前回のエントリを引いて再利用する
+    previous_entries = {
+        entry["mod_name"]: entry for entry in manifest.values()
+        if entry.get("mod_name") and is_entry_reusable(entry, settings, previous_output)
+    }
+
+    run_metrics.count("jars_total", len(jar_files))
+    run_metrics.count("jars_reused", len(jar_files) - len(jars_to_scan))
+    if manifest:
+        logging.info(f"Reusing {len(jar_files) - len(jars_to_scan)} unchanged JARs, scanning {len(jars_to_scan)} new or changed JARs")
+
+    prepare_pack_mcmeta([os.path.join(MODS_DIR, jar) for jar in jar_files], RESOURCE_DIR)
+
+    # 並列処理でJARファイルを処理 (結果はJARの順に逐次受け取る)
+    jar_paths = [os.path.join(MODS_DIR, jar) for jar in jars_to_scan]
+    with run_metrics.timed("jar_scan"):
+        for jar, record in tqdm(
+            zip(jars_to_scan, scan_jars(jar_paths)),
+            total=len(jars_to_scan),
             desc="Processing MODs",
             unit="MOD"
         ):
-            try:
-                result = future.result()
-                if result:
-                    mod_name = result["mod_name"]
-                    mod_data[mod_name] = {
-                        "jar_path": result["jar_path"],
-                        "texts": result["texts"],
-                        "original_keys": list(result["texts"])  # 元のキーを保持
-                    }
-            except Exception as e:
-                logging.error(f"Error processing {futures[future]}: {str(e)}")
+            run_metrics.count("jars_scanned")
+            if record:
+                mod_name, keys, texts, bytes_read, io_time = record
+                run_metrics.count("strings_extracted", len(texts))
+                run_metrics.count("jar_bytes_read", bytes_read)
+                run_metrics.count("jar_io_seconds", io_time)
+                lang_hash = lang_sha256(keys, texts)
+                entry = previous_entries.get(mod_name)
+                # previous_entries はマニフェストを読み込んだ場合(インクリメンタル翻訳)のみ空でない
+                if entry and entry.get("lang_sha256") == lang_hash:
+                    run_metrics.count("jars_lang_unchanged")
+                    reused_targets.extend((key, previous_output[key]) for key in entry["keys"])
+                    new_manifest[jar] = {**entry, **jar_fingerprint(os.path.join(MODS_DIR, jar))}
+                    continue
+                mod_data[mod_name] = {
+                    "jar_path": os.path.join(MODS_DIR, jar),
+                    "jar_file": jar,
+                    "keys": keys,
+                    "texts": texts,
+                    "lang_sha256": lang_hash
+                }
+    del previous_output, previous_entries
 
     try:
-        # 翻訳実行 (MODごとのテキストリストを渡す)
-        translated_map = prepare_translation(mod_data)
-        if not translated_map:
+        # 翻訳実行 (MODごとのキーとテキストのリストのみを渡す。訳文はlangファイルのキーから引く)
+        translated_map = prepare_translation(
+            {mod_name: {"keys": data["keys"], "texts": data["texts"]} for mod_name, data in mod_data.items()}
+        ) if mod_data else {}
+        if not translated_map and not reused_targets:
             logging.warning("No translations were generated")
             return
 
-        # 翻訳済みと未翻訳を分類
-        translated_targets = {}
-        untranslated_items = {}
-        
-        for mod_name, data in mod_data.items():
-            for i, text in enumerate(data["texts"]):
-                if text in translated_map:
-                    translated_targets[data["original_keys"][i]] = translated_map[text]
-                else:
-                    untranslated_items[data["original_keys"][i]] = text
-
-        # 翻訳結果の保存
-        output_file = os.path.join(RESOURCE_DIR, 'assets', 'japanese', 'lang', 'ja_jp.json')
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, 'w', encoding="utf-8") as f:
-            json.dump(
-                dict(sorted(translated_targets.items())),
-                f,
-                ensure_ascii=False,
-                indent=4
-            )
-        logging.info(f"Saved translations to {output_file}")
-
-        # 未翻訳アイテムの記録
-        if untranslated_items:
-            error_directory = os.path.join(provide_log_directory(), 'error')
-            os.makedirs(error_directory, exist_ok=True)
-            
-            error_file = os.path.join(error_directory, 'mod_ja_jp.json')
-            with open(error_file, 'w', encoding="utf-8") as f:
-                json.dump(
-                    dict(sorted(untranslated_items.items())),
-                    f,
-                    ensure_ascii=False,
-                    indent=4
-                )
-            logging.warning(f"Saved {len(untranslated_items)} untranslated items to {error_file}")
+        # 翻訳結果と未翻訳のテキストはMODごとにソート済みのランとして一時ファイルに書き出し、
+        # 最後にマージして出力する(全エントリの辞書やそのソート済みのコピーをメモリに持たない)
+        with run_metrics.timed("output_write"), SortedLangWriter() as translated_writer, \
+                SortedLangWriter() as untranslated_writer:
+            translated_writer.add_run(reused_targets)
+            del reused_targets
+
+            for mod_name, data in mod_data.items():
+                translated_entries = []
+                untranslated_entries = []
+                # 同じ原文でもキーごとに訳文が異なる場合があるため、訳文はキーから引く
+                for key, text in zip(data["keys"], data["texts"]):
+                    translation = translated_map.get(key)
+                    if translation is not None:
+                        translated_entries.append((key, translation))
+                    else:
+                        untranslated_entries.append((key, text))
+
+                if incremental:
+                    new_manifest[data["jar_file"]] = {
+                        **jar_fingerprint(data["jar_path"]),
+                        "mod_name": mod_name,
+                        "lang_sha256": data["lang_sha256"],
+                        "settings": settings,
+                        "keys": [key for key, _ in translated_entries],
+                        "complete": not untranslated_entries
+                    }
+                translated_writer.add_run(translated_entries)
+                untranslated_writer.add_run(untranslated_entries)
+
+            if incremental:
+                # 翻訳対象のなかったJARも記録し、次回の走査を省略する
+                scanned_jars = {data["jar_file"] for data in mod_data.values()}
+                for jar in jars_to_scan:
+                    if jar not in scanned_jars and jar not in new_manifest:
+                        new_manifest[jar] = {
+                            **jar_fingerprint(os.path.join(MODS_DIR, jar)),
+                            "mod_name": None,
+                            "lang_sha256": None,
+                            "settings": settings,
+                            "keys": [],
+                            "complete": True
+                        }
+
+            # 翻訳結果の保存
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            run_metrics.count("output_runs", len(translated_writer.runs))
+            written = translated_writer.write(output_file)
+            logging.info(f"Saved {written} translations to {output_file}")
+
+            if incremental:
+                save_manifest(manifest_file, new_manifest)
+
+            # 未翻訳アイテムの記録
+            if untranslated_writer.entries:
+                error_directory = os.path.join(provide_log_directory(), 'error')
+                os.makedirs(error_directory, exist_ok=True)
+
+                error_file = os.path.join(error_directory, 'mod_ja_jp.json')
+                untranslated = untranslated_writer.write(error_file)
+                logging.warning(f"Saved {untranslated} untranslated items to {error_file}")
 
     except Exception as e:
         logging.error(f"Error processing translations: {str(e)}")
         raise
 
 
+def prepare_pack_mcmeta(jar_paths, resource_dir):
+    """
+    最初に見つかったJARのpack.mcmetaをリソースパックに取り出し、説明文を日本語化パックにする
+    """
+    # pack.mcmetaの処理 (最初の有効なJARから取得)
+    for jar_path in jar_paths:
+        extracted_pack_mcmeta = extract_specific_file(
+            jar_path,
+            'pack.mcmeta',
+            resource_dir
+        )
+        if extracted_pack_mcmeta:
+            update_resourcepack_description(
+                os.path.join(resource_dir, 'pack.mcmeta'),
+                '日本語化パック'
+            )
+            break
+
+
 def update_resourcepack_description(file_path, new_description):
     # ファイルが存在するか確認
     if not os.path.exists(file_path):
@@ -200,13 +340,20 @@ def update_resourcepack_description(file_path, new_description):
 
 def get_mod_name_from_jar(jar_path):
     with zipfile.ZipFile(jar_path, 'r') as zip_ref:
-        asset_dirs_with_lang = set()
-        for name in zip_ref.namelist():
-            parts = name.split('/')
-            if len(parts) > 3 and parts[0] == 'assets' and parts[2] == 'lang' and parts[1] != 'minecraft':
-                asset_dirs_with_lang.add(parts[1])
-        if asset_dirs_with_lang:
-            return list(asset_dirs_with_lang)[0]
+        return find_mod_name(zip_ref.namelist())
+
+
+def find_mod_name(names):
+    """
+    JAR内のエントリ名一覧から、langディレクトリを持つassets配下のMOD名を返す
+    """
+    asset_dirs_with_lang = set()
+    for name in names:
+        parts = name.split('/')
+        if len(parts) > 3 and parts[0] == 'assets' and parts[2] == 'lang' and parts[1] != 'minecraft':
+            asset_dirs_with_lang.add(parts[1])
+    if asset_dirs_with_lang:
+        return list(asset_dirs_with_lang)[0]
     return None
 
 
@@ -1,71 +1,195 @@
+import json
 import logging
-import re
 import os
 import zipfile
 
-from init import MODS_DIR
+from init import MODS_DIR, RESOURCE_DIR
 from prepare import prepare_translation
-from mod import get_mod_name_from_jar
+from mod import find_mod_name, prepare_pack_mcmeta
+from provider import provide_patchouli_output
+from jsonscan import encode_json_string, scan_json_strings
+from spans import replace_spans
+
+# 翻訳対象とするページのキー
+PAGE_TEXT_KEYS = ('name', 'description', 'title', 'text')
 
 def translate_patchouli():
-    for filename in os.listdir(MODS_DIR):
-        if filename.endswith('.jar'):
-            process_jar_file(os.path.join(MODS_DIR, filename))
+    """
+    全JARのPatchouliブックからページを集め、まとめて一度だけ翻訳してから出力先に書き込む
+    """
+    jar_files = [f for f in os.listdir(MODS_DIR) if f.endswith('.jar')]
+    jar_pages = []
+    for filename in jar_files:
+        collected = collect_patchouli_pages(os.path.join(MODS_DIR, filename))
+        if collected:
+            jar_pages.append(collected)
+
+    if not jar_pages:
+        logging.info("No untranslated Patchouli books found")
+        return
 
+    # MODごとにページの文字列をまとめ、重複を除いて一度に翻訳する
+    mod_data = {}
+    for collected in jar_pages:
+        texts = mod_data.setdefault(collected["mod_name"], {"jar_path": collected["jar_path"], "texts": []})["texts"]
+        for page in collected["pages"]:
+            texts.extend(string.value for string in page["strings"])
 
-def process_jar_file(jar_path):
-    mod_name = get_mod_name_from_jar(jar_path)
-    if mod_name is None:
-        return
+    total_pages = sum(len(collected["pages"]) for collected in jar_pages)
+    logging.info(f"Translating {total_pages} Patchouli pages from {len(jar_pages)} JARs in one batch")
+    translated_map = prepare_translation(mod_data)
 
-    # Base path in the jar
-    base_path_in_jar = f'assets/{mod_name}/patchouli_books/'
+    if provide_patchouli_output() != 'jar' and not os.path.exists(os.path.join(RESOURCE_DIR, 'pack.mcmeta')):
+        os.makedirs(RESOURCE_DIR, exist_ok=True)
+        prepare_pack_mcmeta([os.path.join(MODS_DIR, jar) for jar in jar_files], RESOURCE_DIR)
+
+    for collected in jar_pages:
+        write_translated_pages(collected, translated_map)
+
+
+def index_patchouli_books(names, mod_name):
+    """
+    JAR内のエントリ名を一度だけ走査し、Patchouliのブックごとに存在する言語の集合を返す
 
+    Returns:
+        {ブック名: {"en_us", "ja_jp", ...}}
+    """
+    base_path_in_jar = f'assets/{mod_name}/patchouli_books/'
+    locales_by_book = {}
+    for name in names:
+        if not name.startswith(base_path_in_jar):
+            continue
+        # <ブック名>/<言語>/... の形式のエントリのみを数える(ディレクトリエントリの有無に依存しない)
+        parts = name[len(base_path_in_jar):].split('/')
+        if len(parts) >= 3 and parts[0] and parts[1]:
+            locales_by_book.setdefault(parts[0], set()).add(parts[1])
+    return locales_by_book
+
+
+def find_books_to_translate(names, mod_name):
+    """
+    en_usがあり、ja_jpがまだ無いブックの名前を返す
+    """
+    locales_by_book = index_patchouli_books(names, mod_name)
+    return sorted(book for book, locales in locales_by_book.items() if 'en_us' in locales and 'ja_jp' not in locales)
+
+
+def extract_page_strings(content):
+    """
+    Patchouliのページ(JSON文字列)から name/description/title/text の値を位置付きで抽出する
+
+    値はエスケープを解除した文字列で翻訳し、書き戻しは抽出した位置にJSONの表記で行う。
+
+    Raises:
+        json.JSONDecodeError: JSONとして読めない場合
+    """
+    return [
+        string for string in scan_json_strings(content)
+        if string.value and not string.in_list and string.key in PAGE_TEXT_KEYS
+    ]
+
+
+def apply_page_translations(content, strings, translated_map):
+    """
+    ページ内の抽出済み文字列を、抽出した位置で訳文に置き換えて一度に組み立て直す
+    """
+    replacements = []
+    for string in strings:
+        translated = translated_map.get(string.value)
+        if translated is not None:
+            # 訳文のダブルクォートは翻訳時に \" にエスケープされているため、戻してからJSONの表記にする
+            replacements.append((string.start, string.end, encode_json_string(translated.replace('\\"', '"'))))
+    return replace_spans(content, replacements)
+
+
+def collect_patchouli_pages(jar_path):
+    """
+    JARから翻訳が必要なPatchouliのページを集める
+
+    Returns:
+        {"mod_name": str, "jar_path": str, "pages": [{"source": str, "target": str, "content": str, "strings": List[JsonString]}]}
+        翻訳対象のブックが無い場合はNone
+    """
     try:
         with zipfile.ZipFile(jar_path, 'r') as jar:
-            # Get list of directories under patchouli_books
-            dirs_in_patchouli = {item.filename.split('/')[3] for item in jar.infolist()
-                                 if item.filename.startswith(base_path_in_jar) and item.is_dir()}
+            names = jar.namelist()
+
+            mod_name = find_mod_name(names)
+            if mod_name is None:
+                return None
+
+            base_path_in_jar = f'assets/{mod_name}/patchouli_books/'
+            books = find_books_to_translate(names, mod_name)
+            if provide_patchouli_output() != 'jar':
+                # リソースパックに翻訳済みのブックは除く
+                books = [book for book in books if not os.path.isdir(os.path.join(RESOURCE_DIR, base_path_in_jar, book, 'ja_jp'))]
+            if not books:
+                return None
+
+            en_us_paths = {f'{base_path_in_jar}{book}/en_us/': f'{base_path_in_jar}{book}/ja_jp/' for book in books}
+            en_us_prefixes = tuple(en_us_paths)
+            logging.info(f"Collecting Patchouli books {books} in {jar_path}")
+
+            pages = []
+            for name in names:
+                if name.endswith('/') or not name.startswith(en_us_prefixes) or not name.endswith('.json'):
+                    continue
+
+                en_us_path = next(prefix for prefix in en_us_prefixes if name.startswith(prefix))
+                content = jar.read(name).decode('utf-8')
+                try:
+                    strings = extract_page_strings(content)
+                except json.JSONDecodeError as e:
+                    logging.error(f"Failed to parse Patchouli page {name} in {jar_path}: {str(e)}")
+                    continue
+
+                pages.append({
+                    "source": name,
+                    "target": en_us_paths[en_us_path] + name[len(en_us_path):],
+                    "content": content,
+                    "strings": strings
+                })
 
-            modification_needed = False
+    except zipfile.BadZipFile:
+        logging.error(f"Failed to read the jar file: {jar_path}")
+        return None
 
-            with zipfile.ZipFile(jar_path + '.new', 'w') as new_jar:
-                for item in jar.infolist():
-                    data = jar.read(item.filename)
-                    new_jar.writestr(item, data)  # Copy all original files
+    return {"mod_name": mod_name, "jar_path": jar_path, "pages": pages}
 
-                    if item.filename.startswith(base_path_in_jar) and not item.is_dir():
-                        # Check for en_us and translate to ja_jp for each directory under patchouli_books
-                        for subdir in dirs_in_patchouli:
-                            en_us_path = f'{base_path_in_jar}{subdir}/en_us/'
-                            ja_jp_path = f'{base_path_in_jar}{subdir}/ja_jp/'
 
-                            en_us_exists = any(en_us_path in item.filename for item in jar.infolist())
-                            ja_jp_exists = any(ja_jp_path in item.filename for item in jar.infolist())
+def write_translated_pages(collected, translated_map):
+    """
+    翻訳したページを出力先(provide_patchouli_output)に書き込む
 
-                            if en_us_exists and not ja_jp_exists:
-                                modification_needed = True
+    - 'resourcepack': RESOURCE_DIR のリソースパックに書き込み、JARには触れない
+    - 'jar': JARの末尾にja_jpのページを追記する(既存のエントリは再圧縮もコピーもしない)
+    """
+    pages = [
+        (page["target"], apply_page_translations(page["content"], page["strings"], translated_map).encode('utf-8'))
+        for page in collected["pages"]
+    ]
 
-                                if item.filename.startswith(en_us_path):
-                                    new_filename = item.filename.replace(en_us_path, ja_jp_path)
+    if provide_patchouli_output() == 'jar':
+        append_pages_to_jar(collected["jar_path"], pages)
+    else:
+        write_pages_to_resourcepack(pages)
 
-                                    # Translation processing
-                                    if item.filename.endswith('.json'):
-                                        logging.info(f"Translating Patchouli for {item.filename} in {jar_path}")
 
-                                        content = data.decode('utf-8')
-                                        matches = re.findall(r'"(name|description|title|text)":\s*"(.*?)(?<!\\)"', content)
-                                        extracted_strings = [match[1] for match in matches]
-                                        translated_map = prepare_translation(extracted_strings)
-                                        for original, translated in translated_map.items():
-                                            content = content.replace(f'"{original}"', f'"{translated}"')
-                                        new_jar.writestr(new_filename, content.encode('utf-8'))
+def write_pages_to_resourcepack(pages):
+    for target, data in pages:
+        output_path = os.path.join(RESOURCE_DIR, *target.split('/'))
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(data)
+    logging.info(f"Saved {len(pages)} translated Patchouli pages to {RESOURCE_DIR}")
 
-    except zipfile.BadZipFile:
-        logging.error("Failed to read or write to the jar file.")
 
-    finally:
-        if modification_needed:
-            os.replace(jar_path + '.new', jar_path)
-        else:
-            os.remove(jar_path + '.new')
\ No newline at end of file
+def append_pages_to_jar(jar_path, pages):
+    try:
+        with zipfile.ZipFile(jar_path, 'a', compression=zipfile.ZIP_DEFLATED) as jar:
+            for target, data in pages:
+                jar.writestr(target, data)
+        logging.info(f"Appended {len(pages)} translated Patchouli pages to {jar_path}")
+
+    except zipfile.BadZipFile:
+        logging.error(f"Failed to append to the jar file: {jar_path}")
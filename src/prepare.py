@@ -3,11 +3,17 @@ import json
 import logging
 import os
 import re
-from typing import Dict, List, Any
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
 
 from init import MAX_ATTEMPTS
-from chatgpt import translate_with_chatgpt
-from provider import provide_chunk_size, provide_request_interval
+from batch import create_batch_backend, run_batch
+from chatgpt import translate_with_chatgpt, translate_with_chatgpt_stream, estimate_tokens, OUTPUT_TOKEN_RATIO, prepare_request, build_messages, parse_translated_text
+from journal import chunk_key, open_journal
+from memory import open_translation_memory, settings_hash
+from metrics import run_metrics
+from provider import provide_chunk_size, provide_request_interval, provide_concurrency, provide_input_token_budget, provide_output_token_budget, provide_streaming, provide_model, provide_temperature, provide_translation_backend, provide_batch_poll_interval, provide_log_directory, provide_resume, provide_prompt, provide_deduplicate
 
 
 def extract_map_from_lang(filepath):
@@ -30,10 +36,7 @@ def extract_map_from_json(file_path):
             with open(file_path, 'r', encoding="utf-8") as f:
                 content = json.load(f)
 
-            # 値が英語でコメント以外のキーのみを保存します。
-            for key, value in content.items():
-                if not key.startswith("_comment") and isinstance(value, str) and not re.search('[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]', value):
-                    collected_map[key] = value
+            collected_map = filter_untranslated_values(content)
 
         except json.JSONDecodeError:
             logging.info(
@@ -44,6 +47,33 @@ def extract_map_from_json(file_path):
     return collected_map
 
 
+def extract_map_from_json_bytes(data, source):
+    """
+    JARのエントリなど、メモリ上のJSONバイト列から翻訳対象のマップを抽出する
+    """
+    collected_map = {}
+
+    try:
+        content = json.loads(data.decode('utf-8-sig'))
+        collected_map = filter_untranslated_values(content)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        logging.info(
+            f"Failed to load or process JSON from {source}. Skipping this mod for translation. Please check the file for syntax errors.")
+
+    return collected_map
+
+
+def filter_untranslated_values(content):
+    collected_map = {}
+
+    # 値が英語でコメント以外のキーのみを保存します。
+    for key, value in content.items():
+        if not key.startswith("_comment") and isinstance(value, str) and not re.search('[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]', value):
+            collected_map[key] = value
+
+    return collected_map
+
+
 def split_list(big_list):
     # 分割されたリストを格納するリスト
     list_of_chunks = []
@@ -70,51 +100,115 @@ def create_map_with_none_filling(split_target, translated_split_target):
     return result_map
 
 
-from typing import Dict, List, Any, Union
+def format_mod_header(mod_name: str) -> str:
+    """
+    チャンク内でMODの区切りを示すヘッダー行を返す
+    """
+    return f"\n--- MOD: {mod_name} ---\n"
+
+
+def is_mod_header(text: str) -> bool:
+    return text.startswith("\n--- MOD: ") and text.endswith(" ---\n")
+
+
+def token_budget_enabled() -> bool:
+    return provide_input_token_budget() > 0 or provide_output_token_budget() > 0
+
+
+def chunk_cost_and_limit() -> Tuple[Callable[[str], int], int]:
+    """
+    チャンク分割に使うコスト関数と上限を返す
+
+    トークン予算(入力/出力)が設定されている場合は推定トークン数、
+    設定されていない場合は従来通り行数(provide_chunk_size)で分割する。
+    入力トークンの予算からは、毎回送信するシステムプロンプトの分を差し引く。
+    """
+    input_budget = provide_input_token_budget()
+    output_budget = provide_output_token_budget()
+
+    if not token_budget_enabled():
+        return (lambda text: 1), provide_chunk_size()
+
+    # 出力トークンの予算を入力トークン換算にして、厳しい方を上限にする
+    limits = []
+    if input_budget > 0:
+        prompt_tokens = estimate_tokens(provide_prompt())
+        if prompt_tokens >= input_budget:
+            logging.warning(f"The system prompt (~{prompt_tokens} tokens) exceeds the input token budget ({input_budget}), sending one line per request")
+        limits.append(input_budget - prompt_tokens)
+    if output_budget > 0:
+        limits.append(int(output_budget / OUTPUT_TOKEN_RATIO))
+    return estimate_tokens, max(1, min(limits))
+
 
 def create_mod_aware_chunks(mod_data: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     MODごとにテキストをチャンク分割し、MOD区切りマーカーを追加する
+
+    トークン予算が設定されている場合は推定トークン数、それ以外は行数を上限としてチャンクを詰める。
+    キーはテキストと同じ順序の並列なリストとしてチャンクに持たせ、訳文は位置でキーに対応付ける。
     
     Args:
         mod_data: {
             "mod_name": {
-                "jar_path": str,
-                "texts": List[str],
-                "original_keys": List[str]
+                "keys": List[str],  # 省略時はテキストをキーとする
+                "texts": List[str]
             }
         }
     
     Returns:
         List of chunks, each either:
-        - {"mod_name": str, "texts": List[str], "is_full_mod": bool} (単一MODチャンク)
-        - {"mod_names": List[str], "texts": List[str], "headers": List[str]} (複数MODチャンク)
+        - {"mod_name": str, "keys": List[str], "texts": List[str], "is_full_mod": bool} (単一MODチャンク)
+        - {"mod_names": List[str], "keys": List[List[str]], "texts": List[List[str]], "headers": List[str]}
+          (複数MODチャンク、keys/textsはMODごとのリスト)
     """
     chunks: List[Dict[str, Any]] = []
     current_chunk: Dict[str, Any] = {}  # 空の辞書で初期化
     current_chunk_size = 0
-    chunk_size_limit = provide_chunk_size()
-    has_current_chunk = False  # 有効なデータがあるか追跡
+    cost, chunk_size_limit = chunk_cost_and_limit()
+    # 分割したチャンクにもそれぞれMODヘッダーが付くため、トークン予算ではその分も数える
+    # (行数で分割する場合は従来通り、1チャンクあたりのテキスト数を CHUNK_SIZE とする)
+    split_header_counted = token_budget_enabled()
     
     for mod_name, data in mod_data.items():
         mod_texts = data["texts"]
-        mod_header = f"\n--- MOD: {mod_name} ---\n"
-        mod_header_size = 1  # ヘッダーは1行としてカウント
+        mod_keys = data.get("keys", mod_texts)
+        mod_header = format_mod_header(mod_name)
+        mod_header_size = cost(mod_header)  # 行数で分割する場合、ヘッダーは1行としてカウント
+        split_header_size = mod_header_size if split_header_counted else 0
+        text_sizes = [cost(text) for text in mod_texts]
+        mod_size = sum(text_sizes)
         
         # MODが大きい場合（単独でチャンクサイズを超える場合）
-        if len(mod_texts) > chunk_size_limit:
+        if mod_size + split_header_size > chunk_size_limit:
             # MODを複数チャンクに分割
-            for i in range(0, len(mod_texts), chunk_size_limit):
-                chunk = mod_texts[i:i + chunk_size_limit]
-                chunk_data = {
+            chunk: List[str] = []
+            chunk_keys: List[str] = []
+            chunk_size = split_header_size
+            for key, text, text_size in zip(mod_keys, mod_texts, text_sizes):
+                if chunk and chunk_size + text_size > chunk_size_limit:
+                    chunks.append({
+                        "mod_name": mod_name,
+                        "keys": chunk_keys,
+                        "texts": chunk,
+                        "is_full_mod": False
+                    })
+                    chunk = []
+                    chunk_keys = []
+                    chunk_size = split_header_size
+                chunk.append(text)
+                chunk_keys.append(key)
+                chunk_size += text_size
+            if chunk:
+                chunks.append({
                     "mod_name": mod_name,
+                    "keys": chunk_keys,
                     "texts": chunk,
                     "is_full_mod": False
-                }
-                chunks.append(chunk_data)
+                })
         else:
             # MODが小さい場合、現在のチャンクに追加可能かチェック
-            if current_chunk and current_chunk_size + len(mod_texts) + mod_header_size > chunk_size_limit:
+            if current_chunk and current_chunk_size + mod_size + mod_header_size > chunk_size_limit:
                 chunks.append(current_chunk)
                 current_chunk = None
                 current_chunk_size = 0
@@ -123,15 +217,17 @@ def create_mod_aware_chunks(mod_data: Dict[str, Dict[str, Any]]) -> List[Dict[st
             if not current_chunk:  # 新しいチャンクの場合
                 current_chunk = {
                     "mod_names": [mod_name],
-                    "texts": mod_texts,
+                    "keys": [list(mod_keys)],
+                    "texts": [list(mod_texts)],
                     "headers": [mod_header]
                 }
-                current_chunk_size = len(mod_texts) + mod_header_size
+                current_chunk_size = mod_size + mod_header_size
             else:  # 既存のチャンクに追加
                 current_chunk["mod_names"].append(mod_name)
-                current_chunk["texts"].extend(mod_texts)
+                current_chunk["keys"].append(list(mod_keys))
+                current_chunk["texts"].append(list(mod_texts))
                 current_chunk["headers"].append(mod_header)
-                current_chunk_size += len(mod_texts) + mod_header_size
+                current_chunk_size += mod_size + mod_header_size
     
     # 最後のチャンクを追加
     if current_chunk:
@@ -139,88 +235,453 @@ def create_mod_aware_chunks(mod_data: Dict[str, Dict[str, Any]]) -> List[Dict[st
     
     return chunks
 
-def prepare_translation(mod_data: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+
+def build_chunk_texts(chunk: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    チャンクからAPIに送るテキスト列(MODヘッダー込み)とMODセクション情報(キーとテキスト)を組み立てる
+    """
+    if isinstance(chunk.get("mod_names"), list):  # 複数MODがまとめられたチャンク
+        texts: List[str] = []
+        mod_sections: List[Dict[str, Any]] = []
+
+        for mod_name, mod_keys, mod_texts, header in zip(
+            chunk["mod_names"],
+            chunk["keys"],
+            chunk["texts"],
+            chunk["headers"]
+        ):
+            texts.append(header)
+            texts.extend(mod_texts)
+            mod_sections.append({
+                "mod_name": mod_name,
+                "keys": mod_keys,
+                "texts": mod_texts,
+                "header": header
+            })
+    else:  # 単一MODのチャンク
+        texts = [format_mod_header(chunk['mod_name'])] + chunk["texts"]
+        mod_sections = [{
+            "mod_name": chunk["mod_name"],
+            "keys": chunk["keys"],
+            "texts": chunk["texts"],
+            "header": format_mod_header(chunk['mod_name'])
+        }]
+
+    return texts, mod_sections
+
+
+def request_translation(texts: List[str], timeout: int) -> Tuple[List[str], bool]:
+    """
+    APIに一度リクエストし、(訳文の行, 応答を最後まで受け取れたか) を返す
+
+    ストリーミングが無効な場合、応答は常に最後まで受け取ったものとして扱う。
+    """
+    if provide_streaming():
+        return translate_with_chatgpt_stream(texts, timeout)
+    return translate_with_chatgpt(texts, timeout), True
+
+
+def request_budget(line_count: int) -> int:
+    """
+    1チャンクの翻訳に使ってよいリクエスト数の上限
+
+    行数のずれを二分探索で絞り込むと、ずれた行1つあたり約 2 * log2(行数) 回のリクエストが必要になる。
+    その分と MAX_ATTEMPTS 回の再試行までを許し、それを超えた行は翻訳失敗として扱う。
+    """
+    return MAX_ATTEMPTS + 2 * max(1, line_count - 1).bit_length()
+
+
+def with_header_context(texts: List[str], start: int, end: int) -> Tuple[List[str], int]:
+    """
+    texts[start:end] を送信する行リストにする。先頭がMODヘッダーでない場合は直前のMODヘッダーを補う
+
+    Returns:
+        (送信する行リスト, 補ったヘッダーの行数(0または1))
+    """
+    lines = texts[start:end]
+    if lines and not is_mod_header(lines[0]):
+        for position in range(start - 1, -1, -1):
+            if is_mod_header(texts[position]):
+                return [texts[position]] + lines, 1
+    return lines, 0
+
+
+def translate_lines(texts: List[str], timeout: int) -> Tuple[List[Optional[str]], int]:
+    """
+    行リストを翻訳し、入力と同じ長さの訳文リストと送信したリクエスト数を返す
+
+    行数がずれた場合はチャンク全体を再送せず、範囲を半分に分けてそれぞれ翻訳し直す。
+    揃った側の結果はそのまま使われ、ずれが残る側だけがさらに分割されて再送される。
+    ストリーミング中に接続が切れた場合は、確定した行を残して未完成の末尾だけを再送する。
+    分割した範囲や末尾を再送する際は、直前のMODヘッダーを先頭に付けて文脈を保つ(ヘッダーだけの範囲は送信しない)。
+    応答が得られなかった場合は同じ範囲を MAX_ATTEMPTS 回まで再試行する。
+    リクエスト数は1チャンクあたり request_budget までとし、それでも翻訳できなかった行はNoneになる。
+    """
+    budget = {"remaining": request_budget(len(texts))}
+    return translate_range(texts, 0, len(texts), timeout, budget)
+
+
+def translate_range(texts: List[str], start: int, end: int, timeout: int,
+                    budget: Dict[str, int]) -> Tuple[List[Optional[str]], int]:
+    """
+    texts[start:end] を翻訳する(translate_lines の本体)。budget はチャンク全体で共有するリクエスト数の残り
+    """
+    if all(is_mod_header(text) for text in texts[start:end]):
+        # ヘッダーの訳文は使われないため、ヘッダーだけの範囲は送信しない
+        return texts[start:end], 0
+
+    lines, context = with_header_context(texts, start, end)
+    requests = 0
+    attempts = 0
+    while attempts < MAX_ATTEMPTS and budget["remaining"] > 0:
+        budget["remaining"] -= 1
+        translated_texts, complete = request_translation(lines, timeout)
+        requests += 1
+
+        if not complete and context < len(translated_texts) < len(lines):
+            completed = translated_texts[context:]
+            run_metrics.count("stream_interruptions")
+            logging.warning(f"Response interrupted after {len(completed)}/{end - start} lines, retrying the remaining lines")
+            rest, rest_requests = translate_range(texts, start + len(completed), end, timeout, budget)
+            return completed + rest, requests + rest_requests
+
+        if len(lines) == len(translated_texts):
+            # 全行が届いた後に接続が切れた場合も、改行まで届いた行だけを確定させているためそのまま使う
+            return translated_texts[context:], requests
+
+        if translated_texts and end - start > 1:
+            # 行数のずれた範囲を二分して、ずれている部分だけを再送する
+            run_metrics.count("line_count_mismatches")
+            logging.warning(f"Line count mismatch ({len(lines)} -> {len(translated_texts)}), retrying as two halves")
+            middle = (start + end) // 2
+            first_half, first_requests = translate_range(texts, start, middle, timeout, budget)
+            second_half, second_requests = translate_range(texts, middle, end, timeout, budget)
+            return first_half + second_half, requests + first_requests + second_requests
+
+        attempts += 1
+
+    failed = sum(1 for text in texts[start:end] if not is_mod_header(text))
+    run_metrics.count("failed_lines", failed)
+    if budget["remaining"] <= 0:
+        logging.error(f"Failed to translate {failed} lines: request budget for the chunk is exhausted")
+    else:
+        logging.error(f"Failed to translate {failed} lines after {MAX_ATTEMPTS} attempts")
+    return [None] * (end - start), requests
+
+
+def translate_chunk(index: int, total_chunks: int, chunk: Dict[str, Any], timeout: int) -> Tuple[Dict[str, str], int]:
+    """
+    1チャンクを翻訳し、そのチャンク分の {キー: 訳文} と送信したリクエスト数を返す
+
+    行数が一致しない場合はずれた範囲のみを再送する(translate_lines)
+    """
+    logging.info(f"Processing chunk {index}/{total_chunks}...")
+
+    texts, mod_sections = build_chunk_texts(chunk)
+
+    start_time = time.perf_counter()
+    translated_texts, requests = translate_lines(texts, timeout)
+    elapsed = time.perf_counter() - start_time
+    run_metrics.observe("chunk_seconds", elapsed)
+    run_metrics.observe("retries_per_chunk", requests - 1)
+    logging.info(f"Chunk {index}/{total_chunks} finished in {elapsed:.2f}s ({len(texts)} lines, {requests} requests)")
+
+    chunk_result = map_chunk_results(mod_sections, translated_texts)
+
+    if None in translated_texts:
+        logging.error(f"Failed to translate {translated_texts.count(None)} lines in chunk {index}/{total_chunks}")
+
+    return chunk_result, requests
+
+
+def map_chunk_results(mod_sections: List[Dict[str, Any]], translated_texts: List[Optional[str]]) -> Dict[str, str]:
+    """
+    チャンクの訳文リストをMODセクションごとに位置でキーと対応付け、{キー: 訳文} を返す(翻訳に失敗した行は含めない)
+
+    原文では引かないため、同じ原文でもキーが異なればそれぞれの訳文になる。
+    """
+    chunk_result: Dict[str, str] = {}
+    current_pos = 0
+    for section in mod_sections:
+        # ヘッダー分をスキップ
+        current_pos += 1
+        # 翻訳結果を取得
+        section_translated = translated_texts[current_pos:current_pos + len(section["keys"])]
+        for key, trans in zip(section["keys"], section_translated):
+            if trans is not None:
+                chunk_result[key] = trans
+        current_pos += len(section["keys"])
+    return chunk_result
+
+
+def translate_chunks_with_batch(chunks: List[Dict[str, Any]], timeout: int) -> Tuple[List[Dict[str, str]], int]:
+    """
+    全チャンクを1つのBatch APIジョブとして投入し、チャンクごとの {キー: 訳文} と送信したリクエスト数を返す
+
+    結果が得られなかったチャンクや行数がずれたチャンクは、通常のAPIリクエストで翻訳し直す(translate_lines)。
+    """
+    requests = []
+    chunk_texts = []
+    for index, chunk in enumerate(chunks, 1):
+        texts, mod_sections = build_chunk_texts(chunk)
+        chunk_texts.append((texts, mod_sections))
+        split_target, system_prompt, _ = prepare_request(texts)
+        requests.append({
+            "custom_id": f"chunk-{index}",
+            "body": {
+                "model": provide_model(),
+                "temperature": provide_temperature(),
+                "messages": build_messages(system_prompt, split_target)
+            }
+        })
+
+    directory = os.path.join(str(provide_log_directory() or '.'), 'batch')
+    contents = run_batch(requests, create_batch_backend(), directory, provide_batch_poll_interval(), resume=provide_resume())
+
+    chunk_results: List[Dict[str, str]] = []
+    total_requests = len(requests)
+    fallback = 0
+    for index, (texts, mod_sections) in enumerate(chunk_texts, 1):
+        content = contents.get(f"chunk-{index}")
+        translated_texts = parse_translated_text(content, len(texts) > 1) if content is not None else []
+        if len(translated_texts) != len(texts):
+            fallback += 1
+            run_metrics.count("batch_fallback_chunks")
+            translated_texts, retry_requests = translate_lines(texts, timeout)
+            total_requests += retry_requests
+        chunk_results.append(map_chunk_results(mod_sections, translated_texts))
+
+    if fallback:
+        logging.warning(f"Re-translated {fallback}/{len(chunks)} chunks without the batch API")
+    return chunk_results, total_requests
+
+
+def log_chunk_statistics(chunks: List[Dict[str, Any]], requests: int) -> None:
+    """
+    チャンクあたりの行数・推定トークン数とリトライ率をログに出力する(行数分割とトークン分割の比較用)
+    """
+    if not chunks:
+        return
+
+    strings_per_chunk = []
+    tokens_per_chunk = []
+    for chunk in chunks:
+        texts, _ = build_chunk_texts(chunk)
+        strings_per_chunk.append(len(texts))
+        tokens_per_chunk.append(sum(estimate_tokens(text) for text in texts))
+
+    mode = "token budget" if token_budget_enabled() else "line count"
+    retries = requests - len(chunks)
+    logging.info(
+        f"Chunk statistics ({mode}): {len(chunks)} chunks, "
+        f"{sum(strings_per_chunk) / len(chunks):.1f} lines/chunk (max {max(strings_per_chunk)}), "
+        f"{sum(tokens_per_chunk) / len(chunks):.0f} est. input tokens/chunk (max {max(tokens_per_chunk)})"
+    )
+    logging.info(f"Requests sent: {requests}, retries: {retries} (retry rate {retries / requests:.1%})" if requests else "Requests sent: 0")
+
+
+def deduplicate_texts(mod_data: Dict[str, Dict[str, Any]], by_text: bool = False) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    重複するレコード(キーと原文の組)を取り除いたMODごとのデータと、{残したキー: 同じ訳文を使う他のキー} を返す
+
+    キーと原文が同じレコードは常に最初のものだけを残す(クエストやPatchouliはキーが原文そのもの)。
+    by_text の場合は、キーが異なっても原文が同じレコードを最初のものにまとめ、その訳文を他のキーにも使う。
+    同じ英文でも文脈によって訳し分けたい場合があるため、原文でまとめるのは設定で有効にした場合のみ。
+    """
+    seen: Dict[Any, str] = {}
+    duplicates: Dict[str, List[str]] = {}
+    deduplicated: Dict[str, Dict[str, Any]] = {}
+    total = 0
+    for mod_name, data in mod_data.items():
+        keys = []
+        texts = []
+        for key, text in zip(data["keys"], data["texts"]):
+            total += 1
+            identity = text if by_text else (key, text)
+            representative = seen.get(identity)
+            if representative is None:
+                seen[identity] = key
+                keys.append(key)
+                texts.append(text)
+            elif representative != key:
+                duplicates.setdefault(representative, []).append(key)
+        if texts:
+            deduplicated[mod_name] = {**data, "keys": keys, "texts": texts}
+
+    run_metrics.count("strings_input", total)
+    run_metrics.count("strings_unique", len(seen))
+    if total and by_text:
+        logging.info(
+            f"Deduplicated texts: {total} -> {len(seen)} unique "
+            f"({total - len(seen)} duplicates removed, {(total - len(seen)) / total:.1%})"
+        )
+    return deduplicated, duplicates
+
+
+def filter_cached_texts(mod_data: Dict[str, Dict[str, Any]], cached: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """
+    翻訳メモリにヒットした原文のレコードを除いたMODごとのデータを返す。全てヒットしたMODは含めない
+    """
+    pending: Dict[str, Dict[str, Any]] = {}
+    for mod_name, data in mod_data.items():
+        records = [(key, text) for key, text in zip(data["keys"], data["texts"]) if text not in cached]
+        if records:
+            pending[mod_name] = {**data, "keys": [key for key, _ in records], "texts": [text for _, text in records]}
+    return pending
+
+
+def prepare_translation(mod_data: Union[Dict[str, Dict[str, Any]], List[str]]) -> Dict[str, str]:
     """
     MODごとのデータを受け取り、翻訳を実行する
+
+    (MOD, キー, 原文) のレコードを並列なリストのままチャンクに分け、訳文は位置でキーに対応付ける。
+    同じ原文でもキーが異なればそれぞれ翻訳する。DEDUPLICATE が有効な場合のみ、MODをまたいで同じ原文を
+    一度だけ翻訳し、その訳文を同じ原文を持つすべてのキーに使う。
+    翻訳メモリが有効な場合は先に翻訳メモリ(原文をキーとするキャッシュ)を参照し、ヒットしなかったテキストのみAPIに送信する。
+    同時リクエスト数(provide_concurrency)が2以上の場合はチャンクを並列に送信する。
+    結果はチャンク順にマージするため、並列数に関わらず同じ結果になる。
+    チャンクの翻訳中に例外が発生した場合は、並列数に関わらず残りのチャンクを送信せずに例外を送出する
+    (完了したチャンクはジャーナルに記録済みのため、再開時に再送されない)。
     
     Args:
         mod_data: {
             "mod_name": {
-                "jar_path": str,
-                "texts": List[str],
-                "original_keys": List[str]
+                "keys": List[str],  # langファイルのキー(textsと同じ順序)。省略時はテキストをキーとする
+                "texts": List[str]
             }
         }
+        または翻訳対象テキストのリスト(クエスト、Patchouli。テキストをキーとする)
     
     Returns:
-        翻訳結果のマップ {原文: 訳文}
+        翻訳結果のマップ {キー: 訳文}
     """
-    chunks = create_mod_aware_chunks(mod_data)
-    result_map: Dict[str, str] = {}
-    timeout = 60 * 3  # 3分のタイムアウト
-    
-    # リクエスト間隔の情報をログに出力
-    request_interval = provide_request_interval()
-    if request_interval > 0:
-        logging.info(f"Using request interval: {request_interval} seconds between API requests")
+    if isinstance(mod_data, list):
+        mod_data = {"default": {"texts": mod_data}}
+    mod_data = {
+        mod_name: {"keys": data.get("keys", data["texts"]), "texts": data["texts"]}
+        for mod_name, data in mod_data.items()
+    }
 
-    total_chunks = len(chunks)
     total_mods = len(mod_data)
-    logging.info(f"Total MODs to translate: {total_mods}")
-    logging.info(f"Total chunks to process: {total_chunks}")
+    mod_data, duplicates = deduplicate_texts(mod_data, provide_deduplicate())
 
-    for index, chunk in enumerate(chunks, 1):
-        logging.info(f"Processing chunk {index}/{total_chunks}...")
-        
-        # チャンクのテキストを準備 (MODヘッダーを追加)
-        if isinstance(chunk.get("mod_names"), list):  # 複数MODがまとめられたチャンク
-            texts: List[str] = []
-            mod_sections: List[Dict[str, Any]] = []
-            
-            for mod_name, mod_texts, header in zip(
-                chunk["mod_names"],
-                chunk["texts"],
-                chunk["headers"]
-            ):
-                texts.append(header)
-                texts.extend(mod_texts)
-                mod_sections.append({
-                    "mod_name": mod_name,
-                    "texts": mod_texts,
-                    "header": header
-                })
-        else:  # 単一MODのチャンク
-            texts = [f"\n--- MOD: {chunk['mod_name']} ---\n"] + chunk["texts"]
-            mod_sections = [{
-                "mod_name": chunk["mod_name"],
-                "texts": chunk["texts"],
-                "header": f"\n--- MOD: {chunk['mod_name']} ---\n"
-            }]
-
-        attempts = 0
-        while attempts < MAX_ATTEMPTS:
-            # 翻訳実行
-            translated_texts = translate_with_chatgpt(texts, timeout)
-            
-            if len(texts) != len(translated_texts):
-                attempts += 1
-                if attempts == MAX_ATTEMPTS:
-                    logging.error(f"Failed to translate chunk {index}/{total_chunks} after {MAX_ATTEMPTS} attempts")
-                continue
-                
-            # MODセクションごとに結果を処理
-            current_pos = 0
-            for section in mod_sections:
-                # ヘッダー分をスキップ
-                current_pos += 1
-                # 翻訳結果を取得
-                section_translated = translated_texts[current_pos:current_pos + len(section["texts"])]
-                # 元のテキストと翻訳結果をマッピング
-                for orig, trans in zip(section["texts"], section_translated):
-                    result_map[orig] = trans
-                current_pos += len(section["texts"])
-            
-            break  # 成功したらループを抜ける
+    memory = open_translation_memory()
+    try:
+        result_map: Dict[str, str] = {}
+        settings = settings_hash()
+        if memory:
+            all_texts = list({text: None for data in mod_data.values() for text in data["texts"]})
+            cached = memory.lookup(all_texts, settings)
+            run_metrics.count("memory_hits", len(cached))
+            logging.info(f"Translation memory hits: {len(cached)}/{len(all_texts)} unique texts")
+            for data in mod_data.values():
+                for key, text in zip(data["keys"], data["texts"]):
+                    if text in cached:
+                        result_map[key] = cached[text]
+            mod_data = filter_cached_texts(mod_data, cached)
+
+        with run_metrics.timed("chunk_build"):
+            chunks = create_mod_aware_chunks(mod_data)
+        timeout = 60 * 3  # 3分のタイムアウト
+    
+        # リクエスト間隔の情報をログに出力
+        request_interval = provide_request_interval()
+        if request_interval > 0:
+            logging.info(f"Using minimum request interval: {request_interval} seconds between API requests")
+
+        total_chunks = len(chunks)
+        logging.info(f"Total MODs to translate: {total_mods}")
+        logging.info(f"Total chunks to process: {total_chunks}")
+
+        chunk_results: List[Dict[str, str]] = [{} for _ in chunks]
+        requests = 0
+
+        # 完了したチャンクはジャーナルに記録し、再開時は記録済みのチャンクを送信しない
+        journal, completed_chunks = open_journal(provide_log_directory(), settings, provide_resume())
+        chunk_keys = []
+        chunk_sizes = []
+        with run_metrics.timed("chunk_build"):
+            for chunk in chunks:
+                texts, mod_sections = build_chunk_texts(chunk)
+                keys = [key for section in mod_sections for key in section["keys"]]
+                chunk_keys.append(chunk_key(texts, keys))
+                chunk_sizes.append(len(set(keys)))
+        run_metrics.count("chunks", total_chunks)
+
+        pending = []
+        for index, chunk in enumerate(chunks, 1):
+            if chunk_keys[index - 1] in completed_chunks:
+                chunk_results[index - 1] = completed_chunks[chunk_keys[index - 1]]
+            else:
+                pending.append((index, chunk))
+        if len(pending) < total_chunks:
+            run_metrics.count("chunks_resumed", total_chunks - len(pending))
+            logging.info(f"Skipping {total_chunks - len(pending)} chunks restored from the translation journal")
+
+        def record_chunk(index: int, chunk_result: Dict[str, str]) -> None:
+            chunk_results[index - 1] = chunk_result
+            run_metrics.count("strings_translated", len(chunk_result))
+            if journal:
+                journal.append(chunk_keys[index - 1], settings, chunk_result, len(chunk_result) == chunk_sizes[index - 1])
+
+        concurrency = max(1, min(provide_concurrency(), len(pending) or 1))
+
+        with run_metrics.timed("translation"):
+            if provide_translation_backend() == 'batch' and pending:
+                batch_results, requests = translate_chunks_with_batch([chunk for _, chunk in pending], timeout)
+                for (index, _), chunk_result in zip(pending, batch_results):
+                    record_chunk(index, chunk_result)
+            elif concurrency == 1:
+                for index, chunk in pending:
+                    chunk_result, chunk_requests = translate_chunk(index, total_chunks, chunk, timeout)
+                    record_chunk(index, chunk_result)
+                    requests += chunk_requests
+            else:
+                logging.info(f"Dispatching chunks with {concurrency} concurrent requests")
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    futures = {
+                        executor.submit(translate_chunk, index, total_chunks, chunk, timeout): index
+                        for index, chunk in pending
+                    }
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        try:
+                            chunk_result, chunk_requests = future.result()
+                        except Exception as e:
+                            # 逐次実行と同じく例外を呼び出し元に伝える。未着手のチャンクは送信しない
+                            logging.error(f"Error processing chunk {index}/{total_chunks}: {str(e)}")
+                            for pending_future in futures:
+                                pending_future.cancel()
+                            raise
+                        record_chunk(index, chunk_result)
+                        requests += chunk_requests
+
+        log_chunk_statistics(chunks, requests)
+
+        # 完了順ではなくチャンク順にマージする
+        for chunk_result in chunk_results:
+            result_map.update(chunk_result)
+
+        if memory:
+            # 翻訳メモリは原文をキーとするため、チャンクのレコードから位置で原文を引いて保存する
+            for chunk, chunk_result in zip(chunks, chunk_results):
+                _, mod_sections = build_chunk_texts(chunk)
+                memory.store({
+                    text: chunk_result[key]
+                    for section in mod_sections
+                    for key, text in zip(section["keys"], section["texts"])
+                    if key in chunk_result
+                }, settings)
+    finally:
+        # チャンクの送信中に例外が発生した場合も翻訳メモリの接続を閉じる
+        if memory:
+            memory.close()
+
+    # 原文でまとめたレコードの訳文を、同じ原文を持つ他のキーにも使う
+    for representative, keys in duplicates.items():
+        if representative in result_map:
+            for key in keys:
+                result_map[key] = result_map[representative]
 
     logging.info("Translation completed!")
     return result_map
@@ -1,9 +1,29 @@
+import os
+
 API_KEY = None
 CHUNK_SIZE = 1
 MODEL = 'gpt-4o-mini-2024-07-18'
 API_BASE = None  # OpenAI互換APIのベースURL
 TEMPERATURE = 1.0  # デフォルト値として1.0を設定
-REQUEST_INTERVAL = 0.0  # APIリクエスト間隔（秒）- デフォルトは0秒（間隔なし）
+REQUEST_INTERVAL = 0.0  # APIリクエストの最小間隔（秒）- デフォルトは0秒（レート制御の調整に任せる）
+REQUESTS_PER_MINUTE = 0  # 1分あたりのリクエスト数上限（0で不明、応答ヘッダーから学習）
+TOKENS_PER_MINUTE = 0  # 1分あたりのトークン数上限（0で不明、応答ヘッダーから学習）
+CONCURRENCY = 1  # 同時に送信するAPIリクエスト数 - デフォルトは1（逐次処理）
+INPUT_TOKEN_BUDGET = 0  # 1リクエストあたりの入力トークン予算（0でCHUNK_SIZEの行数で分割）
+OUTPUT_TOKEN_BUDGET = 0  # 1リクエストあたりの出力トークン予算（0で制限なし）
+API_POOL_SIZE = 10  # APIクライアントが保持するHTTP接続数の上限
+API_TIMEOUT = 180.0  # APIリクエストのタイムアウト（秒）
+STREAMING = False  # 応答をストリーミングで受け取り、完成した行から順に処理するか
+TRANSLATION_BACKEND = 'chat'  # 翻訳の送信方式（'chat' は逐次のAPIリクエスト、'batch' はBatch API）
+RESUME = False  # 前回中断した翻訳のジャーナルを読み込み、完了済みのチャンクを飛ばすか
+BATCH_POLL_INTERVAL = 30.0  # Batch APIのジョブの状態を確認する間隔（秒）
+SCAN_MODE = 'thread'  # JAR走査の並列方式（'thread' または 'process'）
+SCAN_WORKERS = os.cpu_count() or 4  # JAR走査のワーカー数 - デフォルトはCPU数
+PATCHOULI_OUTPUT = 'resourcepack'  # Patchouliの翻訳の出力先（'resourcepack' または 'jar'）
+INCREMENTAL = False  # 前回から変更のないJARの翻訳結果を再利用するか（同じ翻訳設定の場合のみ）
+DEDUPLICATE = False  # MODをまたいで同じ原文を一度だけ翻訳し訳文を共有するか（既定ではキーごとに翻訳）
+TRANSLATION_MEMORY = False  # 翻訳メモリ（過去の翻訳結果のキャッシュ）を使用するか
+TRANSLATION_MEMORY_MAX_ENTRIES = 500000  # 翻訳メモリの最大エントリ数（0で無制限）
 PROMPT = """You are a professional translator. Please translate the following English text into Japanese.
 
 ## Important Translation Rules
@@ -154,4 +174,220 @@ def provide_request_interval():
 def set_request_interval(interval):
     global REQUEST_INTERVAL
 
-    REQUEST_INTERVAL = interval
\ No newline at end of file
+    REQUEST_INTERVAL = interval
+
+
+def provide_concurrency():
+    global CONCURRENCY
+
+    return CONCURRENCY
+
+
+def set_concurrency(concurrency):
+    global CONCURRENCY
+
+    CONCURRENCY = concurrency
+
+
+def provide_deduplicate():
+    global DEDUPLICATE
+
+    return DEDUPLICATE
+
+
+def set_deduplicate(enabled):
+    global DEDUPLICATE
+
+    DEDUPLICATE = enabled
+
+
+def provide_translation_memory():
+    global TRANSLATION_MEMORY
+
+    return TRANSLATION_MEMORY
+
+
+def set_translation_memory(enabled):
+    global TRANSLATION_MEMORY
+
+    TRANSLATION_MEMORY = enabled
+
+
+def provide_translation_memory_max_entries():
+    global TRANSLATION_MEMORY_MAX_ENTRIES
+
+    return TRANSLATION_MEMORY_MAX_ENTRIES
+
+
+def set_translation_memory_max_entries(max_entries):
+    global TRANSLATION_MEMORY_MAX_ENTRIES
+
+    TRANSLATION_MEMORY_MAX_ENTRIES = max_entries
+
+
+def provide_api_pool_size():
+    global API_POOL_SIZE
+
+    return API_POOL_SIZE
+
+
+def set_api_pool_size(pool_size):
+    global API_POOL_SIZE
+
+    API_POOL_SIZE = pool_size
+
+
+def provide_api_timeout():
+    global API_TIMEOUT
+
+    return API_TIMEOUT
+
+
+def set_api_timeout(timeout):
+    global API_TIMEOUT
+
+    API_TIMEOUT = timeout
+
+
+def provide_input_token_budget():
+    global INPUT_TOKEN_BUDGET
+
+    return INPUT_TOKEN_BUDGET
+
+
+def set_input_token_budget(budget):
+    global INPUT_TOKEN_BUDGET
+
+    INPUT_TOKEN_BUDGET = budget
+
+
+def provide_output_token_budget():
+    global OUTPUT_TOKEN_BUDGET
+
+    return OUTPUT_TOKEN_BUDGET
+
+
+def set_output_token_budget(budget):
+    global OUTPUT_TOKEN_BUDGET
+
+    OUTPUT_TOKEN_BUDGET = budget
+
+
+def provide_incremental():
+    global INCREMENTAL
+
+    return INCREMENTAL
+
+
+def set_incremental(incremental):
+    global INCREMENTAL
+
+    INCREMENTAL = incremental
+
+
+def provide_scan_mode():
+    global SCAN_MODE
+
+    return SCAN_MODE
+
+
+def set_scan_mode(scan_mode):
+    global SCAN_MODE
+
+    SCAN_MODE = scan_mode
+
+
+def provide_scan_workers():
+    global SCAN_WORKERS
+
+    return SCAN_WORKERS
+
+
+def set_scan_workers(scan_workers):
+    global SCAN_WORKERS
+
+    SCAN_WORKERS = scan_workers
+
+
+def provide_requests_per_minute():
+    global REQUESTS_PER_MINUTE
+
+    return REQUESTS_PER_MINUTE
+
+
+def set_requests_per_minute(requests_per_minute):
+    global REQUESTS_PER_MINUTE
+
+    REQUESTS_PER_MINUTE = requests_per_minute
+
+
+def provide_tokens_per_minute():
+    global TOKENS_PER_MINUTE
+
+    return TOKENS_PER_MINUTE
+
+
+def set_tokens_per_minute(tokens_per_minute):
+    global TOKENS_PER_MINUTE
+
+    TOKENS_PER_MINUTE = tokens_per_minute
+
+
+def provide_patchouli_output():
+    global PATCHOULI_OUTPUT
+
+    return PATCHOULI_OUTPUT
+
+
+def set_patchouli_output(patchouli_output):
+    global PATCHOULI_OUTPUT
+
+    PATCHOULI_OUTPUT = patchouli_output
+
+
+def provide_streaming():
+    global STREAMING
+
+    return STREAMING
+
+
+def set_streaming(streaming):
+    global STREAMING
+
+    STREAMING = streaming
+
+
+def provide_translation_backend():
+    global TRANSLATION_BACKEND
+
+    return TRANSLATION_BACKEND
+
+
+def set_translation_backend(translation_backend):
+    global TRANSLATION_BACKEND
+
+    TRANSLATION_BACKEND = translation_backend
+
+
+def provide_batch_poll_interval():
+    global BATCH_POLL_INTERVAL
+
+    return BATCH_POLL_INTERVAL
+
+
+def set_batch_poll_interval(poll_interval):
+    global BATCH_POLL_INTERVAL
+
+    BATCH_POLL_INTERVAL = poll_interval
+
+
+def provide_resume():
+    global RESUME
+
+    return RESUME
+
+
+def set_resume(resume):
+    global RESUME
+
+    RESUME = resume
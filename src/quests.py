@@ -3,10 +3,13 @@ import logging
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 from init import FTBQUESTS_DIR1, FTBQUESTS_DIR2, FTBQUESTS_DIR3, FTBQUESTS_DIR4, BETTERQUESTING_DIR
-from provider import provide_log_directory
+from provider import provide_log_directory, provide_scan_workers
 from prepare import extract_map_from_lang, extract_map_from_json, prepare_translation
+from snbt import SnbtSyntaxError, find_translatable_strings
+from spans import replace_spans
 
 
 def translate_betterquesting_from_json(file_path):
@@ -52,44 +55,73 @@ def translate_ftbquests_from_json(file_path):
         json.dump(dict(sorted(untranslated_items.items())), f, ensure_ascii=False, indent=4)
 
 
-def translate_ftbquests_from_snbt(file_path):
+def extract_snbt_strings(content):
+    """
+    クエストのタイトル、サブタイトル、説明文の文字列を出現順に返す
+    """
+    return [string.value for string in find_translatable_strings(content)]
+
+
+def apply_snbt_translations(content, strings, translated_map):
+    """
+    抽出した各文字列の位置に訳文を埋め込み、ファイル全体を一度の走査で組み立て直す
+    """
+    return replace_spans(content, [
+        (string.start, string.end, translated_map[string.value])
+        for string in strings
+        if translated_map.get(string.value) is not None
+    ])
+
+
+def read_snbt_file(file_path, backup_directory):
+    shutil.copy(file_path, backup_directory / file_path.name)
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
-    logging.info(f"Translating {file_path}...")
-
-    extracted_strings = []
-
-    # Extract description strings
-    description_pattern = r'description: \[\s*([\s\S]*?)\s*\]'
-    description_matches = re.findall(description_pattern, content)
-    for match in description_matches:
-        for inner_match in re.findall(r'(?<!\\)"(.*?)(?<!\\)"', match):
-            if inner_match:  # Non-empty strings
-                extracted_strings.append(inner_match)
-
-    # Extract title and subtitle strings
-    title_and_subtitle_pattern = r'(title|subtitle): "(.*?)"'
-    title_and_subtitle_matches = re.findall(title_and_subtitle_pattern, content)
-    for _, inner_match in title_and_subtitle_matches:
-        if inner_match:  # Non-empty strings
-            extracted_strings.append(inner_match)
-
-    if len(extracted_strings) == 0:
-        logging.info("No strings found. Skipping...")
-        return
+    try:
+        return content, find_translatable_strings(content)
+    except SnbtSyntaxError as e:
+        logging.error(f"Failed to parse {file_path}: {str(e)}")
+        return content, []
 
-    # Translate the content of tmp.txt and get the translated values
-    translated_map = prepare_translation(extracted_strings)
 
-    # Substitute back the translated content
-    for original, translated in translated_map.items():
-        content = content.replace(f'"{original}"', f'"{translated}"', 1)
-
-    # Save the content back
+def write_snbt_file(file_path, content):
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(content)
 
 
+def translate_ftbquests_from_snbt(file_paths, backup_directory):
+    """
+    チャプターのsnbtファイルを並列に読み込み、全ファイルの文字列をまとめて一度に翻訳してから並列に書き戻す
+    """
+    workers = max(1, provide_scan_workers())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        parsed = list(executor.map(lambda file_path: read_snbt_file(file_path, backup_directory), file_paths))
+
+    # ファイルごとにまとめて一度に翻訳する(重複はprepare_translationで除かれる)
+    mod_data = {
+        file_path.stem: {"texts": [string.value for string in strings]}
+        for file_path, (_, strings) in zip(file_paths, parsed)
+        if strings
+    }
+    if not mod_data:
+        logging.info("No strings found. Skipping...")
+        return
+
+    total_strings = sum(len(data["texts"]) for data in mod_data.values())
+    logging.info(f"Translating {total_strings} strings from {len(mod_data)} snbt files in one batch")
+    translated_map = prepare_translation(mod_data)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(write_snbt_file, file_path, apply_snbt_translations(content, strings, translated_map))
+            for file_path, (content, strings) in zip(file_paths, parsed)
+            if strings
+        ]
+        for future in futures:
+            future.result()
+
+
 def translate_ftbquests():
     # バックアップ用のディレクトリを作成
     backup_directory = provide_log_directory() / 'quests'
@@ -104,16 +136,11 @@ def translate_ftbquests():
         translate_ftbquests_from_json(json_path)
     else:
         logging.info(f"en_us.json not found in {FTBQUESTS_DIR1}, translating snbt files in directory...")
-        nbt_files = list(FTBQUESTS_DIR3.glob('*.snbt'))
-
-        backup_file = backup_directory / FTBQUESTS_DIR4.name
-        shutil.copy(FTBQUESTS_DIR4, backup_file)
-        translate_ftbquests_from_snbt(FTBQUESTS_DIR4)
+        nbt_files = sorted(FTBQUESTS_DIR3.glob('*.snbt'))
+        if FTBQUESTS_DIR4.exists():
+            nbt_files.insert(0, FTBQUESTS_DIR4)
 
-        for file in nbt_files:
-            backup_file = backup_directory / file.name
-            shutil.copy(file, backup_file)
-            translate_ftbquests_from_snbt(file)
+        translate_ftbquests_from_snbt(nbt_files, backup_directory)
 
     logging.info("Translate snbt files Done!")
 
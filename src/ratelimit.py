@@ -0,0 +1,224 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Mapping, Optional
+
+# 1分あたりの制限を数える窓(秒)
+WINDOW_SECONDS = 60.0
+# レート制限・サーバーエラー時に間隔を広げる倍率と、その際の最小間隔(秒)
+BACKOFF_FACTOR = 2.0
+MIN_BACKOFF_INTERVAL = 0.5
+MAX_INTERVAL = 60.0
+# 成功時に間隔を縮める量(秒)。余裕が大きい場合はさらに倍率で縮める
+RECOVERY_STEP = 0.05
+HEADROOM_RECOVERY_FACTOR = 0.5
+# 残りリクエスト/トークンがこの割合を上回っていれば余裕があるとみなす
+HEADROOM_RATIO = 0.5
+
+_DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    レート制限ヘッダーの時間表記("1s", "6m0s", "20ms", "1.5")を秒に変換する
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    matches = _DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+
+    units = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+    return sum(float(number) * units[unit] for number, unit in matches)
+
+
+def retry_after_from_headers(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    retry-after / retry-after-ms / x-ratelimit-reset-* ヘッダーから待機秒数を求める
+    """
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    for name in ('retry-after', 'x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens'):
+        seconds = parse_duration(headers.get(name))
+        if seconds:
+            return seconds
+    return None
+
+
+def parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Reservation:
+    """
+    acquire で確保した送信枠。応答のusageが分かったら record_usage に渡してトークン数を置き換える
+    """
+    __slots__ = ('sent_at', 'tokens', 'waited')
+
+    def __init__(self, sent_at: float, tokens: int, waited: float):
+        self.sent_at = sent_at
+        self.tokens = tokens
+        self.waited = waited
+
+
+class RateLimiter:
+    """
+    APIリクエストの送信間隔を応答に合わせて調整するレート制御
+
+    - 1分あたりのリクエスト数(RPM)とトークン数(TPM)を直近60秒の窓で数え、上限を超えないよう待機する
+    - 429やサーバーエラーではリクエスト間隔を倍に広げ(乗算的減少)、retry-afterの間は送信を止める
+    - 成功するたびに間隔を少しずつ縮め(加算的増加)、ヘッダーで余裕が分かる場合は早めに縮める
+    - 間隔は min_interval(REQUEST_INTERVAL)より短くならない
+
+    複数スレッドから同時に acquire を呼び出してよい。
+    """
+
+    def __init__(self, min_interval: float = 0.0, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.min_interval = min_interval
+        self.interval = min_interval
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.configured = (min_interval, requests_per_minute, tokens_per_minute)
+        self.clock = clock
+        self.sleep = sleep
+
+        self.lock = threading.Lock()
+        self.next_request_at = 0.0
+        self.paused_until = 0.0
+        self.window = deque()  # Reservation(送信時刻, トークン数)
+
+    def configure(self, min_interval: float, requests_per_minute: int, tokens_per_minute: int) -> None:
+        """
+        設定(REQUEST_INTERVAL, RPM, TPM)の変更を反映する。前回と同じ設定であれば何もしない
+
+        バックオフ中でなければ間隔を新しい最小間隔に合わせ、バックオフ中は最小間隔を下回らないようにする。
+        """
+        configured = (min_interval, requests_per_minute, tokens_per_minute)
+        with self.lock:
+            if configured == self.configured:
+                return
+            if self.interval <= self.min_interval:
+                self.interval = min_interval
+            else:
+                self.interval = max(min_interval, self.interval)
+            self.min_interval = min_interval
+            self.requests_per_minute = requests_per_minute
+            self.tokens_per_minute = tokens_per_minute
+            self.configured = configured
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        while self.window and self.window[0].sent_at <= now - WINDOW_SECONDS:
+            self.window.popleft()
+
+        wait = max(self.next_request_at - now, self.paused_until - now, 0.0)
+
+        if self.requests_per_minute > 0 and len(self.window) >= self.requests_per_minute:
+            wait = max(wait, self.window[0].sent_at + WINDOW_SECONDS - now)
+
+        if self.tokens_per_minute > 0 and self.window:
+            used = sum(reservation.tokens for reservation in self.window)
+            if used + tokens > self.tokens_per_minute:
+                # 古い送信から順に窓の外へ出たと仮定して、予算内に収まる時刻まで待つ
+                for reservation in self.window:
+                    used -= reservation.tokens
+                    if used + tokens <= self.tokens_per_minute:
+                        wait = max(wait, reservation.sent_at + WINDOW_SECONDS - now)
+                        break
+
+        return wait
+
+    def acquire(self, tokens: int = 0) -> Reservation:
+        """
+        送信可能になるまで待機し、送信枠を確保する。確保した枠(待機した秒数を含む)を返す
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    reservation = Reservation(now, tokens, waited)
+                    self.window.append(reservation)
+                    self.next_request_at = now + self.interval
+                    return reservation
+            self.sleep(wait)
+            waited += wait
+
+    def record_usage(self, reservation: Reservation, actual_tokens: int) -> None:
+        """
+        送信時に見積もったトークン数を、応答のusageの実際の値で置き換える
+
+        枠がすでに窓の外に出ている場合は、置き換えても待機時間には影響しない。
+        """
+        with self.lock:
+            reservation.tokens = actual_tokens
+
+    def on_success(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        """
+        成功した応答を受けて間隔を縮め、レート制限ヘッダーがあれば上限と残量を反映する
+        """
+        headers = headers or {}
+        with self.lock:
+            limit_requests = parse_int(headers.get('x-ratelimit-limit-requests'))
+            limit_tokens = parse_int(headers.get('x-ratelimit-limit-tokens'))
+            remaining_requests = parse_int(headers.get('x-ratelimit-remaining-requests'))
+            remaining_tokens = parse_int(headers.get('x-ratelimit-remaining-tokens'))
+
+            if limit_requests:
+                self.requests_per_minute = limit_requests
+            if limit_tokens:
+                self.tokens_per_minute = limit_tokens
+
+            now = self.clock()
+            if remaining_requests == 0:
+                reset = parse_duration(headers.get('x-ratelimit-reset-requests'))
+                if reset:
+                    self.paused_until = max(self.paused_until, now + reset)
+            if remaining_tokens == 0:
+                reset = parse_duration(headers.get('x-ratelimit-reset-tokens'))
+                if reset:
+                    self.paused_until = max(self.paused_until, now + reset)
+
+            has_headroom = (
+                (remaining_requests is not None and limit_requests and remaining_requests > limit_requests * HEADROOM_RATIO)
+                and (remaining_tokens is None or not limit_tokens or remaining_tokens > limit_tokens * HEADROOM_RATIO)
+            )
+            if has_headroom:
+                self.interval *= HEADROOM_RECOVERY_FACTOR
+            else:
+                self.interval -= RECOVERY_STEP
+            self.interval = max(self.min_interval, self.interval)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """
+        429やサーバーエラーを受けて間隔を広げ、retry-afterが分かればその間送信を止める
+        """
+        with self.lock:
+            self.interval = min(MAX_INTERVAL, max(self.interval * BACKOFF_FACTOR, MIN_BACKOFF_INTERVAL, self.min_interval))
+            if retry_after:
+                self.paused_until = max(self.paused_until, self.clock() + retry_after)
+            logging.warning(
+                f"Rate limited, request interval is now {self.interval:.2f}s"
+                + (f" (pausing for {retry_after:.1f}s)" if retry_after else "")
+            )
@@ -0,0 +1,106 @@
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+# 翻訳対象とするキー。title/subtitle は文字列の値、description は文字列のリスト
+TEXT_KEYS = ('title', 'subtitle')
+TEXT_LIST_KEYS = ('description',)
+
+# 空白と区切り文字を読み飛ばし、次のトークン(括弧、コロン、引用符付き文字列、裸の値)を一つ読む
+_TOKEN_PATTERN = re.compile(
+    r'''[\s,;]*(?:([{}\[\]:])|"([^"\\]*(?:\\.[^"\\]*)*)"|'([^'\\]*(?:\\.[^'\\]*)*)'|([^\s,;{}\[\]:"']+)|(["'])|$)''',
+    re.DOTALL
+)
+
+
+class SnbtString(NamedTuple):
+    """
+    SNBT内の引用符付き文字列
+
+    start/end は引用符を除いた中身の位置(content[start:end] == value)。
+    value はエスケープを解除しない生の文字列。
+    key はこの文字列(またはこの文字列を含むリスト)が割り当てられたキー。
+    """
+    start: int
+    end: int
+    value: str
+    key: Optional[str]
+    in_list: bool
+
+
+class SnbtSyntaxError(ValueError):
+    pass
+
+
+def scan_strings(content: str) -> Iterator[SnbtString]:
+    """
+    SNBTを先頭から一度だけ走査し、値として現れる引用符付き文字列を位置とキーと共に返す
+
+    コンパウンドのキーとして使われた引用符付き文字列は返さない。
+    """
+    # スタックの要素: [コンテナの種類('{' または '['), コンテナが割り当てられたキー]
+    stack: List[list] = []
+    current_key: Optional[str] = None
+    expecting_key = False
+    index = 0
+    match_token = _TOKEN_PATTERN.match
+
+    while True:
+        match = match_token(content, index)
+        bracket, double_quoted, single_quoted, bare, unterminated = match.groups()
+        index = match.end()
+
+        if match.lastindex is None:
+            # 入力の終わり
+            break
+
+        if unterminated is not None:
+            raise SnbtSyntaxError(f"Unterminated string starting at {index - 1}")
+
+        if bracket is not None:
+            if bracket == '{':
+                stack.append(['{', current_key])
+                expecting_key = True
+                current_key = None
+            elif bracket == '[':
+                stack.append(['[', current_key])
+                expecting_key = False
+            elif bracket == ':':
+                expecting_key = False
+            else:
+                if not stack or stack[-1][0] != ('{' if bracket == '}' else '['):
+                    raise SnbtSyntaxError(f"Unexpected '{bracket}' at {index - 1}")
+                stack.pop()
+                expecting_key = bool(stack) and stack[-1][0] == '{'
+                current_key = stack[-1][1] if stack and stack[-1][0] == '[' else None
+            continue
+
+        value = double_quoted if double_quoted is not None else single_quoted
+        in_list = bool(stack) and stack[-1][0] == '['
+        if expecting_key and not in_list:
+            current_key = value if value is not None else bare
+            expecting_key = False
+        else:
+            if value is not None:
+                key = stack[-1][1] if in_list else current_key
+                yield SnbtString(index - 1 - len(value), index - 1, value, key, in_list)
+            if not in_list:
+                # コンパウンド内の値を読み終えたので次はキー
+                expecting_key = True
+
+    if stack:
+        raise SnbtSyntaxError("Unexpected end of SNBT")
+
+
+def is_translatable(string: SnbtString) -> bool:
+    if not string.value:
+        return False
+    if string.in_list:
+        return string.key in TEXT_LIST_KEYS
+    return string.key in TEXT_KEYS
+
+
+def find_translatable_strings(content: str) -> List[SnbtString]:
+    """
+    クエストのタイトル、サブタイトル、説明文の文字列を出現順に返す
+    """
+    return [string for string in scan_strings(content) if is_translatable(string)]
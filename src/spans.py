@@ -0,0 +1,19 @@
+from typing import Iterable, Tuple
+
+
+def replace_spans(content: str, replacements: Iterable[Tuple[int, int, str]]) -> str:
+    """
+    (start, end, 置換後の文字列) の一覧に従って、元の文字列を一度の走査で組み立て直す
+
+    SNBT(snbt.py)とJSON(jsonscan.py)の走査結果の位置を使い、書式を保ったまま文字列だけを置き換える。
+    """
+    parts = []
+    position = 0
+    for start, end, text in sorted(replacements):
+        if start < position:
+            raise ValueError(f"Overlapping replacement at {start}")
+        parts.append(content[position:start])
+        parts.append(text)
+        position = end
+    parts.append(content[position:])
+    return ''.join(parts)
@@ -1,5 +1,12 @@
+import sys
+from pathlib import Path
+
 import pytest
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+
+from mock_openai_server import MockOpenAIServer  # noqa: E402
+
 def pytest_configure(config):
     config.addinivalue_line(
         "markers", "integration: mark as integration test"
@@ -8,4 +15,30 @@ def pytest_configure(config):
 @pytest.fixture(autouse=True)
 def setup_logging():
     import logging
-    logging.basicConfig(level=logging.DEBUG)
\ No newline at end of file
+    logging.basicConfig(level=logging.DEBUG)
+
+
+@pytest.fixture
+def fake_openai_server():
+    """
+    テスト用のOpenAI互換サーバー(benchmarks/mock_openai_server.py)
+
+    responder を差し替えて応答を変え、requests と client_ports で受け取ったリクエストを確認する。
+    ストリーミングは5文字ずつのイベントで返す。
+    """
+    with MockOpenAIServer(stream_chunk_size=5, record_requests=True) as server:
+        yield server
+
+
+@pytest.fixture
+def fake_prepare_translation():
+    """
+    prepare_translation の代わりに、各テキストの先頭に "JA:" を付けた訳文を {キー: 訳文} で返す関数
+    """
+    def prepare_translation(mod_data):
+        return {
+            key: f"JA:{text}"
+            for data in mod_data.values()
+            for key, text in zip(data.get("keys", data["texts"]), data["texts"])
+        }
+    return prepare_translation
@@ -0,0 +1,121 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.batch import LocalBatchBackend, parse_batch_results, run_batch
+from src.prepare import prepare_translation
+
+
+def respond_ja(body):
+    """ユーザーメッセージの各行の先頭に "JA:" を付けて返す"""
+    lines = body["messages"][-1]["content"][0]["text"].split('\n')
+    return '\n'.join(f"JA:{line}" for line in lines)
+
+
+@pytest.fixture(autouse=True)
+def no_translation_memory():
+    with patch('src.prepare.open_translation_memory', return_value=None):
+        yield
+
+
+def batch_requests(count, prefix="Line"):
+    return [{"custom_id": f"chunk-{i}", "body": {"messages": [{"content": [{"text": f"{prefix} {i}"}]}]}} for i in range(count)]
+
+
+def interrupt(_):
+    raise KeyboardInterrupt
+
+
+class TestRunBatch:
+    def test_polls_until_completed(self, tmp_path):
+        backend = LocalBatchBackend(tmp_path / "backend", respond_ja, polls_until_complete=2)
+        sleeps = []
+
+        contents = run_batch(batch_requests(3), backend, tmp_path / "batch", poll_interval=5, sleep=sleeps.append)
+
+        assert contents == {f"chunk-{i}": f"JA:Line {i}" for i in range(3)}
+        assert sleeps == [5, 5]
+        # 投入したリクエストはBatch APIの形式で書き出され、ジョブのIDと状態が記録される
+        [input_path] = (tmp_path / "batch").glob("batch_*_input.jsonl")
+        lines = input_path.read_text(encoding="utf-8").splitlines()
+        assert json.loads(lines[0])["url"] == "/v1/chat/completions"
+        [state_path] = (tmp_path / "batch").glob("batch_*.json")
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        assert state["input_file"] == input_path.name
+        assert state["status"] == "completed"
+        assert input_path.with_name(input_path.name.replace("_input", "_output")).exists()
+
+    def test_each_call_uses_its_own_files(self, tmp_path):
+        backend = LocalBatchBackend(tmp_path / "backend", respond_ja)
+        run_batch(batch_requests(2), backend, tmp_path / "batch", poll_interval=0)
+        run_batch(batch_requests(2, "Other"), backend, tmp_path / "batch", poll_interval=0)
+        assert len(list((tmp_path / "batch").glob("batch_*_input.jsonl"))) == 2
+
+    def test_interrupted_batch_is_polled_instead_of_resubmitted(self, tmp_path):
+        backend = LocalBatchBackend(tmp_path / "backend", respond_ja, polls_until_complete=1)
+        with pytest.raises(KeyboardInterrupt):
+            run_batch(batch_requests(3), backend, tmp_path / "batch", poll_interval=5, sleep=interrupt)
+
+        resumed = LocalBatchBackend(tmp_path / "backend", respond_ja)
+        with patch.object(resumed, 'submit', wraps=resumed.submit) as submit:
+            contents = run_batch(batch_requests(3), resumed, tmp_path / "batch", poll_interval=5)
+        submit.assert_not_called()
+        assert contents == {f"chunk-{i}": f"JA:Line {i}" for i in range(3)}
+
+    @pytest.mark.parametrize("resume, submitted", [(True, False), (False, True)])
+    def test_resume_finds_batch_of_previous_run(self, tmp_path, resume, submitted):
+        backend = LocalBatchBackend(tmp_path / "backend", respond_ja, polls_until_complete=1)
+        with pytest.raises(KeyboardInterrupt):
+            run_batch(batch_requests(3), backend, tmp_path / "logs" / "run1" / "batch", poll_interval=5, sleep=interrupt)
+
+        with patch.object(backend, 'submit', wraps=backend.submit) as submit:
+            run_batch(batch_requests(3), backend, tmp_path / "logs" / "run2" / "batch", poll_interval=0, resume=resume)
+        assert submit.called is submitted
+
+    def test_failed_requests_are_none(self):
+        lines = [
+            json.dumps({"custom_id": "chunk-1", "response": None, "error": {"code": "x", "message": "boom"}}),
+            json.dumps({"custom_id": "chunk-2", "response": {"status_code": 500, "body": {}}, "error": None}),
+            json.dumps({"custom_id": "chunk-3", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "OK"}}]}}, "error": None}),
+        ]
+        assert parse_batch_results(lines) == {"chunk-1": None, "chunk-2": None, "chunk-3": "OK"}
+
+
+class TestBatchBackend:
+    @patch('src.prepare.provide_chunk_size', return_value=3)
+    @patch('src.prepare.provide_translation_backend', return_value='batch')
+    def test_results_match_chat_backend(self, _backend, _chunk_size, tmp_path):
+        mod_data = {f"mod{i}": {"texts": [f"Mod {i} text {j}" for j in range(5)]} for i in range(3)}
+        backend = LocalBatchBackend(tmp_path, respond_ja)
+
+        with patch('src.prepare.create_batch_backend', return_value=backend), \
+                patch('src.prepare.provide_log_directory', return_value=tmp_path), \
+                patch('src.prepare.translate_with_chatgpt') as mock_translate:
+            result = prepare_translation(mod_data)
+
+        mock_translate.assert_not_called()
+        assert result == {text: f"JA:{text}" for data in mod_data.values() for text in data["texts"]}
+
+    @patch('src.prepare.provide_chunk_size', return_value=3)
+    @patch('src.prepare.provide_translation_backend', return_value='batch')
+    def test_failed_and_misaligned_chunks_fall_back_to_chat(self, _backend, _chunk_size, tmp_path):
+        texts = [f"Line {i}" for i in range(9)]
+
+        def flaky_respond(body):
+            user_text = body["messages"][-1]["content"][0]["text"]
+            if "Line 0" in user_text:
+                raise RuntimeError("server error")
+            if "Line 3" in user_text:
+                return "JA: merged line"
+            return respond_ja(body)
+
+        backend = LocalBatchBackend(tmp_path, flaky_respond)
+        with patch('src.prepare.create_batch_backend', return_value=backend), \
+                patch('src.prepare.provide_log_directory', return_value=tmp_path), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=lambda lines, timeout: [f"JA:{line}" for line in lines]) as mock_translate:
+            result = prepare_translation(texts)
+
+        assert result == {text: f"JA:{text}" for text in texts}
+        # 3行ずつの3チャンクのうち、失敗したチャンクと行数のずれたチャンクだけを通常のAPIで再送する
+        assert mock_translate.call_count == 2
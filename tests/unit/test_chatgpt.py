@@ -0,0 +1,110 @@
+import socket
+from unittest.mock import patch
+
+import pytest
+
+from src import chatgpt
+from src.chatgpt import get_client, close_clients, translate_with_chatgpt, translate_with_chatgpt_stream
+from src.ratelimit import MIN_BACKOFF_INTERVAL
+
+
+@pytest.fixture(autouse=True)
+def clear_clients():
+    close_clients()
+    yield
+    close_clients()
+
+
+class TestGetClient:
+    def test_client_is_reused_per_key_and_base(self):
+        with patch('src.chatgpt.provide_api_key', return_value='key-a'), \
+                patch('src.chatgpt.provide_api_base', return_value='http://127.0.0.1:1/v1'):
+            first = get_client()
+            assert get_client() is first
+
+        with patch('src.chatgpt.provide_api_key', return_value='key-b'), \
+                patch('src.chatgpt.provide_api_base', return_value='http://127.0.0.1:1/v1'):
+            assert get_client() is not first
+
+        assert len(chatgpt._clients) == 2
+
+    def test_pool_size_and_timeout_from_provider(self):
+        with patch('src.chatgpt.provide_api_key', return_value='key'), \
+                patch('src.chatgpt.provide_api_base', return_value=None), \
+                patch('src.chatgpt.provide_api_pool_size', return_value=3), \
+                patch('src.chatgpt.provide_concurrency', return_value=1), \
+                patch('src.chatgpt.provide_api_timeout', return_value=12.0):
+            client = get_client()
+        assert client.timeout == 12.0
+        assert client._client._transport._pool._max_connections == 3
+
+
+class TestTranslateWithChatgpt:
+    def test_connections_are_kept_alive(self, fake_openai_server):
+        with patch('src.chatgpt.provide_api_key', return_value='key'), \
+                patch('src.chatgpt.provide_api_base', return_value=fake_openai_server.base_url), \
+                patch('src.chatgpt.provide_request_interval', return_value=0):
+            for i in range(5):
+                result = translate_with_chatgpt([f"Line {i}a", f"Line {i}b"], 60)
+                assert result == [f"JA:Line {i}a", f"JA:Line {i}b"]
+
+        assert len(fake_openai_server.requests) == 5
+        # 逐次リクエストは同じkeep-alive接続を使い回す
+        assert len(fake_openai_server.client_ports) == 1
+
+    @pytest.mark.parametrize("translate", [translate_with_chatgpt, translate_with_chatgpt_stream])
+    def test_connection_error_backs_off(self, translate):
+        # 接続を拒否するポート
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+
+        with patch('src.chatgpt.provide_api_key', return_value='key'), \
+                patch('src.chatgpt.provide_api_base', return_value=f'http://127.0.0.1:{port}/v1'), \
+                patch('src.chatgpt.provide_request_interval', return_value=0):
+            translate(["Line"], 60)
+            rate_limiter = chatgpt.get_rate_limiter()
+
+        # SDK側では再送しないため、次の送信まではレート制御が間隔を空ける
+        assert rate_limiter.interval >= MIN_BACKOFF_INTERVAL
+
+
+@pytest.fixture
+def fake_api(fake_openai_server):
+    with patch('src.chatgpt.provide_api_key', return_value='key'), \
+            patch('src.chatgpt.provide_api_base', return_value=fake_openai_server.base_url), \
+            patch('src.chatgpt.provide_request_interval', return_value=0):
+        yield fake_openai_server
+
+
+class TestTranslateWithChatgptStream:
+    def test_streamed_lines_match_whole_response(self, fake_api):
+        lines = ["First line", 'Say "hi"', "Third line"]
+        streamed, complete = translate_with_chatgpt_stream(lines, 60)
+
+        assert complete
+        assert streamed == translate_with_chatgpt(lines, 60)
+        assert streamed == ["JA:First line", 'JA:Say \\"hi\\"', "JA:Third line"]
+        assert fake_api.requests[0]["stream"] is True
+
+    def test_line_breaks_follow_splitlines(self, fake_api):
+        # 5文字ずつ送るため、最初の "\r\n" はイベントの境目で分かれる
+        content = "JA:a\r\nJA:b\rJA:c\u2028JA:d\n"
+        fake_api.responder = lambda body: (200, {}, fake_api.completion(content))
+        lines = ["a", "b", "c", "d"]
+
+        streamed, complete = translate_with_chatgpt_stream(lines, 60)
+        assert complete
+        assert streamed == translate_with_chatgpt(lines, 60) == ["JA:a", "JA:b", "JA:c", "JA:d"]
+
+    def test_single_line_is_joined(self, fake_api):
+        fake_api.responder = lambda body: (200, {}, fake_api.completion("一行目\n二行目"))
+        assert translate_with_chatgpt_stream(["One line"], 60) == (["一行目二行目"], True)
+
+    def test_interrupted_stream_keeps_completed_lines(self, fake_api):
+        # "JA:Line 0\nJA:Line 1\nJA:Li" まで送って切断する
+        fake_api.stream_cutoffs.append(len("JA:Line 0\nJA:Line 1\nJA:Li"))
+        streamed, complete = translate_with_chatgpt_stream([f"Line {i}" for i in range(4)], 60)
+
+        assert not complete
+        assert streamed == ["JA:Line 0", "JA:Line 1"]
@@ -0,0 +1,122 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.cli import main, build_parser, apply_settings, EXIT_SUCCESS, EXIT_FAILURE, EXIT_USAGE
+
+SRC_DIR = Path(__file__).resolve().parents[2] / 'src'
+
+
+@pytest.fixture
+def instance_dir(tmp_path, monkeypatch):
+    # main() はカレントディレクトリを移動するので、テスト後に元に戻す
+    monkeypatch.chdir(tmp_path)
+    instance = tmp_path / "instance"
+    instance.mkdir()
+    # ログディレクトリの設定が他のテストに残らないようにする
+    with patch('src.cli.set_log_directory'):
+        yield instance
+
+
+def run_cli(capsys, *argv):
+    exit_code = main(list(argv))
+    return exit_code, json.loads(capsys.readouterr().out)
+
+
+class TestMain:
+    def test_runs_targets_in_order_and_prints_summary(self, instance_dir, capsys):
+        calls = []
+        with patch('src.cli.load_target', side_effect=lambda target: lambda: calls.append(target)):
+            exit_code, summary = run_cli(
+                capsys, 'patchouli', 'mod', 'patchouli',
+                '--instance-dir', str(instance_dir), '--log-dir', str(instance_dir / "logs")
+            )
+
+        assert exit_code == EXIT_SUCCESS
+        assert calls == ['patchouli', 'mod']
+        assert summary["status"] == "success"
+        assert [result["target"] for result in summary["targets"]] == ['patchouli', 'mod']
+        assert Path(summary["instance_dir"]) == instance_dir
+        assert Path(summary["run_report"]) == instance_dir / "logs" / "run_report.json"
+        assert "stages" in json.loads(Path(summary["run_report"]).read_text(encoding="utf-8"))
+
+    def test_relative_paths_are_resolved_before_changing_directory(self, instance_dir, capsys):
+        (instance_dir.parent / "prompt.txt").write_text("Custom prompt", encoding="utf-8")
+        with patch('src.cli.load_target', return_value=MagicMock()), \
+                patch('src.cli.set_prompt') as set_prompt:
+            exit_code, summary = run_cli(
+                capsys, 'mod', '--instance-dir', 'instance', '--log-dir', 'logs', '--prompt-file', 'prompt.txt'
+            )
+
+        assert exit_code == EXIT_SUCCESS
+        set_prompt.assert_called_once_with("Custom prompt")
+        assert Path(summary["log_directory"]) == instance_dir.parent / "logs"
+        assert (instance_dir.parent / "logs" / "run_report.json").exists()
+
+    def test_failed_target_sets_exit_code_and_others_still_run(self, instance_dir, capsys):
+        def load_target(target):
+            if target == 'ftbquests':
+                return MagicMock(side_effect=RuntimeError("boom"))
+            return MagicMock()
+
+        with patch('src.cli.load_target', side_effect=load_target):
+            exit_code, summary = run_cli(
+                capsys, 'ftbquests', 'betterquesting',
+                '--instance-dir', str(instance_dir), '--log-dir', str(instance_dir / "logs")
+            )
+
+        assert exit_code == EXIT_FAILURE
+        assert summary["status"] == "failure"
+        assert summary["targets"][0]["status"] == "failure"
+        assert summary["targets"][0]["error"] == "RuntimeError: boom"
+        assert summary["targets"][1]["status"] == "success"
+
+    def test_usage_errors(self, instance_dir, capsys):
+        assert main(['unknown']) == EXIT_USAGE
+        assert main(['mod', '--instance-dir', str(instance_dir / "missing")]) == EXIT_USAGE
+
+
+class TestApplySettings:
+    def test_only_given_options_are_applied(self, monkeypatch):
+        monkeypatch.setenv('OPENAI_API_KEY', 'env-key')
+        args = build_parser().parse_args(['mod', '--concurrency', '8', '--incremental', '--scan-mode', 'process'])
+
+        with patch('src.cli.set_api_key') as set_api_key, \
+                patch('src.cli.set_concurrency') as set_concurrency, \
+                patch('src.cli.set_incremental') as set_incremental, \
+                patch('src.cli.set_scan_mode') as set_scan_mode, \
+                patch('src.cli.set_model') as set_model, \
+                patch('src.cli.set_translation_memory') as set_translation_memory:
+            apply_settings(args)
+
+        set_api_key.assert_called_once_with('env-key')
+        set_concurrency.assert_called_once_with(8)
+        set_incremental.assert_called_once_with(True)
+        set_scan_mode.assert_called_once_with('process')
+        set_model.assert_not_called()
+        set_translation_memory.assert_not_called()
+
+
+@pytest.mark.parametrize("module, deferred", [
+    ("cli", ("TkEasyGUI", "tkinter", "openai", "tqdm", "mod", "quests", "patchouli")),
+    ("mod", ("openai", "httpx", "tqdm")),
+    ("quests", ("openai", "httpx")),
+])
+def test_import_defers_heavy_modules(module, deferred):
+    code = f"import sys; import {module}; print(sorted(name for name in {deferred!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_targets_are_reachable_by_static_imports():
+    # 実行ファイル化(Nuitka)は静的なimport文から依存関係をたどる
+    code = (
+        "import modulefinder; finder = modulefinder.ModuleFinder(path=['.']); finder.run_script('main.py'); "
+        "print(sorted(name for name in ('mod', 'quests', 'patchouli', 'chatgpt') if name in finder.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "['chatgpt', 'mod', 'patchouli', 'quests']"
@@ -0,0 +1,105 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.journal import TranslationJournal, find_latest_journal, open_journal
+from src.prepare import prepare_translation
+
+
+@pytest.fixture(autouse=True)
+def no_translation_memory():
+    with patch('src.prepare.open_translation_memory', return_value=None):
+        yield
+
+
+def crash_after(calls_before_crash, calls):
+    def translate(split_target, timeout):
+        if len(calls) == calls_before_crash:
+            raise ConnectionError("network is unreachable")
+        calls.append(list(split_target))
+        return [f"JA:{line}" for line in split_target]
+    return translate
+
+
+class TestResume:
+    @patch('src.prepare.provide_chunk_size', return_value=2)
+    def test_resumed_run_sends_only_remaining_chunks(self, _, tmp_path):
+        texts = [f"Line {i}" for i in range(10)]
+        first_run = tmp_path / "logs" / "2024-01-01_00-00-00"
+        second_run = tmp_path / "logs" / "2024-01-01_01-00-00"
+
+        first_calls = []
+        with patch('src.prepare.provide_log_directory', return_value=first_run), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=crash_after(2, first_calls)):
+            with pytest.raises(ConnectionError):
+                prepare_translation(texts)
+        assert len(first_calls) == 2
+
+        second_calls = []
+        with patch('src.prepare.provide_log_directory', return_value=second_run), \
+                patch('src.prepare.provide_resume', return_value=True), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=crash_after(None, second_calls)):
+            result = prepare_translation(texts)
+
+        assert result == {text: f"JA:{text}" for text in texts}
+        assert len(second_calls) == 3
+        assert not any(call in first_calls for call in second_calls)
+        # 再開した実行のジャーナルには前回の分も含めてすべてのチャンクが記録される
+        records = [json.loads(line) for line in (second_run / "translation_journal.jsonl").read_text(encoding="utf-8").splitlines()]
+        assert len({record["chunk"] for record in records if record["complete"]}) == 5
+
+    @patch('src.prepare.provide_chunk_size', return_value=2)
+    def test_without_resume_everything_is_sent(self, _, tmp_path):
+        texts = [f"Line {i}" for i in range(4)]
+        run = tmp_path / "logs" / "run"
+        calls = []
+        with patch('src.prepare.provide_log_directory', return_value=run), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=crash_after(None, calls)):
+            prepare_translation(texts)
+            prepare_translation(texts)
+        assert len(calls) == 4
+
+    @patch('src.prepare.provide_chunk_size', return_value=2)
+    def test_incomplete_chunks_are_retried(self, _, tmp_path):
+        texts = [f"Line {i}" for i in range(2)]
+        run = tmp_path / "logs" / "run"
+        with patch('src.prepare.provide_log_directory', return_value=run), \
+                patch('src.prepare.translate_with_chatgpt', return_value=[]):
+            assert prepare_translation(texts) == {}
+
+        calls = []
+        with patch('src.prepare.provide_log_directory', return_value=run), \
+                patch('src.prepare.provide_resume', return_value=True), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=crash_after(None, calls)):
+            assert prepare_translation(texts) == {text: f"JA:{text}" for text in texts}
+        assert len(calls) == 1
+
+
+class TestTranslationJournal:
+    def test_load_skips_other_settings_and_truncated_lines(self, tmp_path):
+        path = tmp_path / "journal.jsonl"
+        journal = TranslationJournal(path)
+        journal.append("a", "settings-1", {"A": "あ"}, True)
+        journal.append("b", "settings-2", {"B": "い"}, True)
+        journal.append("c", "settings-1", {"C": "う"}, False)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"chunk": "d", "settings": "settings-1", "comp')
+
+        assert TranslationJournal.load(path, "settings-1") == {"a": {"A": "あ"}}
+
+    def test_latest_journal_among_siblings(self, tmp_path):
+        older = tmp_path / "older"
+        newer = tmp_path / "newer"
+        current = tmp_path / "current"
+        for directory in (older, newer, current):
+            directory.mkdir()
+        (older / "translation_journal.jsonl").write_text("", encoding="utf-8")
+        (newer / "translation_journal.jsonl").write_text("", encoding="utf-8")
+        os.utime(older / "translation_journal.jsonl", ns=(1, 1))
+
+        assert find_latest_journal(current) == newer / "translation_journal.jsonl"
+
+    def test_no_log_directory_disables_journal(self):
+        assert open_journal(None, "settings", resume=True) == (None, {})
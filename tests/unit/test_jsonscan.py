@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from src.jsonscan import encode_json_string, scan_json_strings
+
+
+PAGE = '''{
+    "name": "Caf\\u00e9 \\"Guide\\"",
+    "icon": "minecraft:book",
+    "extra": {"name": "Nested", "tags": ["a", "b"]},
+    "pages": [
+        {"type": "patchouli:text", "text": "Line one\\nLine two", "count": 2, "flag": true},
+        "bare string"
+    ],
+    "title": "日本語 ✓"
+}
+'''
+
+
+class TestScanJsonStrings:
+    def test_keys_values_and_spans(self):
+        strings = list(scan_json_strings(PAGE))
+        for string in strings:
+            assert json.loads(f'"{PAGE[string.start:string.end]}"') == string.value
+
+        assert [(string.key, string.in_list, string.value) for string in strings] == [
+            ("name", False, 'Café "Guide"'),
+            ("icon", False, "minecraft:book"),
+            ("name", False, "Nested"),
+            ("tags", True, "a"),
+            ("tags", True, "b"),
+            ("type", False, "patchouli:text"),
+            ("text", False, "Line one\nLine two"),
+            ("pages", True, "bare string"),
+            ("title", False, "日本語 ✓"),
+        ]
+
+    @pytest.mark.parametrize("content", ['{"name": "Broken', '{"name" "x"}', "{'name': 'single'}"])
+    def test_invalid_json(self, content):
+        with pytest.raises(json.JSONDecodeError):
+            list(scan_json_strings(content))
+
+
+def test_encode_json_string_round_trips():
+    value = 'Say "hi"\n\\ café \u0001'
+    assert json.loads(f'"{encode_json_string(value)}"') == value
+    assert "café" in encode_json_string(value)
@@ -0,0 +1,62 @@
+import json
+import os
+import random
+from unittest.mock import patch
+
+from src.langwriter import SortedLangWriter, merge_entries
+
+
+class TestMergeEntries:
+    def test_later_iterable_wins_on_duplicate_keys(self):
+        merged = list(merge_entries([
+            iter([("a", "1"), ("c", "1")]),
+            iter([("b", "2"), ("c", "2")]),
+        ]))
+        assert merged == [("a", "1"), ("b", "2"), ("c", "2")]
+
+
+class TestSortedLangWriter:
+    def test_output_matches_json_dump(self, tmp_path):
+        rng = random.Random(0)
+        runs = [
+            [(f"key.{rng.randrange(300)}", f"値 \"{i}\"\n{j}") for j in range(rng.randrange(50))]
+            for i in range(20)
+        ]
+        expected = {}
+        for run in runs:
+            expected.update(run)
+
+        output_path = tmp_path / "ja_jp.json"
+        with SortedLangWriter() as writer:
+            for run in runs:
+                writer.add_run(run)
+            assert writer.write(output_path) == len(expected)
+
+        assert output_path.read_text(encoding="utf-8") == json.dumps(
+            dict(sorted(expected.items())), ensure_ascii=False, indent=4
+        )
+
+    def test_many_runs_are_merged_in_passes(self, tmp_path):
+        output_path = tmp_path / "ja_jp.json"
+        with patch('src.langwriter.MAX_OPEN_RUNS', 3), SortedLangWriter() as writer:
+            for i in range(10):
+                writer.add_run([("shared", f"run {i}"), (f"key.{i}", "x")])
+            writer.write(output_path)
+            assert len(writer.runs) <= 3
+
+        result = json.loads(output_path.read_text(encoding="utf-8"))
+        assert result["shared"] == "run 9"
+        assert len(result) == 11
+
+    def test_empty_output(self, tmp_path):
+        output_path = tmp_path / "ja_jp.json"
+        with SortedLangWriter() as writer:
+            writer.add_run([])
+            assert writer.write(output_path) == 0
+        assert output_path.read_text(encoding="utf-8") == json.dumps({}, indent=4)
+
+    def test_temporary_runs_are_removed(self):
+        with SortedLangWriter() as writer:
+            writer.add_run([("a", "b")])
+            directory = writer.directory
+        assert not os.path.exists(directory)
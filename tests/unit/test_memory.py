@@ -0,0 +1,54 @@
+import time
+from unittest.mock import patch
+
+from src.memory import TranslationMemory, settings_hash
+
+
+class TestTranslationMemory:
+    def test_store_and_lookup(self, tmp_path):
+        memory = TranslationMemory(tmp_path / "memory.sqlite3")
+        memory.store({"Iron Ingot": "鉄インゴット", "Empty": None}, "a")
+
+        assert memory.lookup(["Iron Ingot", "Empty", "Unknown"], "a") == {"Iron Ingot": "鉄インゴット"}
+        # 設定ハッシュが異なる場合はヒットしない
+        assert memory.lookup(["Iron Ingot"], "b") == {}
+        memory.close()
+
+    def test_lookup_many_texts(self, tmp_path):
+        memory = TranslationMemory(tmp_path / "memory.sqlite3")
+        memory.store({f"Text {i}": f"テキスト {i}" for i in range(1200)}, "a")
+
+        assert len(memory.lookup([f"Text {i}" for i in range(1200)], "a")) == 1200
+        memory.close()
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        memory = TranslationMemory(tmp_path / "memory.sqlite3", max_entries=2)
+        memory.store({"old": "古い"}, "a")
+        time.sleep(0.01)
+        memory.store({"used": "使用済み"}, "a")
+        time.sleep(0.01)
+        memory.lookup(["old"], "a")
+        time.sleep(0.01)
+        memory.store({"new": "新しい"}, "a")
+
+        assert memory.lookup(["old", "used", "new"], "a") == {"old": "古い", "new": "新しい"}
+        memory.close()
+
+
+class TestSettingsHash:
+    def test_depends_on_model_prompt_and_temperature(self):
+        with patch('src.memory.provide_model', return_value='model-a'), \
+                patch('src.memory.provide_prompt', return_value='prompt'), \
+                patch('src.memory.provide_temperature', return_value=1.0):
+            base = settings_hash()
+            assert settings_hash() == base
+
+        with patch('src.memory.provide_model', return_value='model-b'), \
+                patch('src.memory.provide_prompt', return_value='prompt'), \
+                patch('src.memory.provide_temperature', return_value=1.0):
+            assert settings_hash() != base
+
+        with patch('src.memory.provide_model', return_value='model-a'), \
+                patch('src.memory.provide_prompt', return_value='prompt'), \
+                patch('src.memory.provide_temperature', return_value=0.5):
+            assert settings_hash() != base
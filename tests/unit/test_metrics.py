@@ -0,0 +1,125 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.chatgpt import close_clients, get_rate_limiter, translate_with_chatgpt, translate_with_chatgpt_stream
+from src.metrics import RunMetrics, percentile
+from src.prepare import prepare_translation
+
+
+@pytest.fixture
+def metrics():
+    return RunMetrics()
+
+
+class TestRunMetrics:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile([3.0], 95) == 3.0
+        assert percentile([], 50) == 0.0
+
+    def test_snapshot(self, metrics):
+        with metrics.timed("translation"):
+            pass
+        metrics.add_stage_time("translation", 2.0)
+        metrics.count("strings_translated", 10)
+        for value in (0.1, 0.2, 0.3, 0.4):
+            metrics.observe("request_seconds", value)
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["strings_translated"] == 10
+        assert snapshot["distributions"]["request_seconds"] == {"count": 4, "mean": 0.25, "p50": 0.2, "p95": 0.4, "max": 0.4}
+        assert 2.0 <= snapshot["stages"]["translation"] < 2.1
+        assert 4.7 < snapshot["throughput"]["strings_per_second"] <= 5.0
+        assert snapshot["peak_memory_mb"] > 0
+
+    def test_concurrent_updates(self, metrics):
+        def work():
+            for _ in range(1000):
+                metrics.count("requests")
+                metrics.observe("request_seconds", 0.1)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["requests"] == 8000
+        assert snapshot["distributions"]["request_seconds"]["count"] == 8000
+
+    def test_write_report(self, metrics, tmp_path):
+        metrics.count("chunks", 3)
+        report_path = metrics.write_report(tmp_path / "logs")
+        assert json.loads(open(report_path, encoding="utf-8").read())["counters"] == {"chunks": 3}
+
+
+class TestInstrumentation:
+    @patch('src.prepare.provide_chunk_size', return_value=2)
+    def test_prepare_translation_records_chunks_and_retries(self, _, metrics):
+        texts = [f"Line {i}" for i in range(5)]
+        calls = []
+
+        def fail_first_request(split_target, timeout):
+            calls.append(split_target)
+            return [] if len(calls) == 1 else [f"JA:{line}" for line in split_target]
+
+        with patch('src.prepare.run_metrics', metrics), \
+                patch('src.prepare.open_translation_memory', return_value=None), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=fail_first_request):
+            prepare_translation(texts + ["Line 0"])
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["strings_input"] == 6
+        assert snapshot["counters"]["strings_unique"] == 5
+        assert snapshot["counters"]["chunks"] == 3
+        assert snapshot["counters"]["strings_translated"] == 5
+        assert snapshot["distributions"]["retries_per_chunk"]["max"] == 1
+        assert "chunk_build" in snapshot["stages"] and "translation" in snapshot["stages"]
+
+    def test_requests_and_usage_are_recorded(self, metrics, fake_openai_server):
+        fake_openai_server.responder = lambda body: (
+            200, {}, fake_openai_server.completion("JA", {"prompt_tokens": 30, "completion_tokens": 12, "total_tokens": 42})
+        )
+        close_clients()
+        try:
+            with patch('src.chatgpt.run_metrics', metrics), \
+                    patch('src.chatgpt.provide_api_key', return_value='key'), \
+                    patch('src.chatgpt.provide_api_base', return_value=fake_openai_server.base_url), \
+                    patch('src.chatgpt.provide_request_interval', return_value=0):
+                translate_with_chatgpt(["Hello"], 60)
+                translate_with_chatgpt(["Hello"], 60)
+        finally:
+            close_clients()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["requests"] == 2
+        assert snapshot["counters"]["prompt_tokens"] == 60
+        assert snapshot["counters"]["completion_tokens"] == 24
+        assert snapshot["distributions"]["request_seconds"]["count"] == 2
+
+    def test_streaming_usage_is_recorded(self, metrics, fake_openai_server):
+        fake_openai_server.responder = lambda body: (
+            200, {}, fake_openai_server.completion("JA:a\nJA:b", {"prompt_tokens": 30, "completion_tokens": 12, "total_tokens": 42})
+        )
+        close_clients()
+        try:
+            with patch('src.chatgpt.run_metrics', metrics), \
+                    patch('src.chatgpt.provide_api_key', return_value='key'), \
+                    patch('src.chatgpt.provide_api_base', return_value=fake_openai_server.base_url), \
+                    patch('src.chatgpt.provide_request_interval', return_value=0):
+                assert translate_with_chatgpt_stream(["a", "b"], 60) == (["JA:a", "JA:b"], True)
+                # レート制御の窓の見積もりも実際のusageに置き換わる
+                assert [reservation.tokens for reservation in get_rate_limiter().window] == [42]
+        finally:
+            close_clients()
+
+        assert fake_openai_server.requests[0]["stream_options"] == {"include_usage": True}
+        snapshot = metrics.snapshot()
+        assert snapshot["counters"]["prompt_tokens"] == 30
+        assert snapshot["counters"]["completion_tokens"] == 12
@@ -6,11 +6,14 @@ from pathlib import Path
 from unittest.mock import patch, MagicMock
 import logging
 
+from src.init import MOD_MANIFEST_FILE_NAME
 from src.mod import (
     process_jar_file,
     get_mod_name_from_jar,
     extract_specific_file,
-    translate_from_jar
+    translate_from_jar,
+    scan_jars,
+    create_scan_executor
 )
 
 # テスト用フィクスチャ
@@ -156,4 +159,162 @@ class TestTranslateFromJar:
         mock_listdir.return_value = []
         with patch('logging.warning') as mock_warning:
             translate_from_jar()
-            mock_warning.assert_called_once()
\ No newline at end of file
+            mock_warning.assert_called_once()
+
+def write_mod_jar(jar_path, mod_name, lang):
+    with zipfile.ZipFile(jar_path, 'w') as z:
+        z.writestr(f"assets/{mod_name}/lang/en_us.json", json.dumps(lang))
+
+
+class TestTranslateFromJarIncremental:
+    @pytest.fixture
+    def pack(self, tmp_path, fake_prepare_translation):
+        mods_dir = tmp_path / "mods"
+        resource_dir = tmp_path / "resourcepacks" / "japanese"
+        mods_dir.mkdir()
+        write_mod_jar(mods_dir / "alpha.jar", "alpha", {"item.alpha": "Alpha"})
+        write_mod_jar(mods_dir / "beta.jar", "beta", {"item.beta": "Beta"})
+        with patch('src.mod.MODS_DIR', mods_dir), \
+                patch('src.mod.RESOURCE_DIR', resource_dir), \
+                patch('src.mod.provide_log_directory', return_value=str(tmp_path / "logs")), \
+                patch('src.mod.provide_incremental', return_value=True), \
+                patch('src.mod.prepare_translation', side_effect=fake_prepare_translation):
+            yield mods_dir, resource_dir / "assets" / "japanese" / "lang" / "ja_jp.json"
+
+    def test_unchanged_jars_are_not_rescanned(self, pack):
+        mods_dir, output_file = pack
+        translate_from_jar()
+        first_output = json.loads(output_file.read_text(encoding="utf-8"))
+        assert first_output == {"item.alpha": "JA:Alpha", "item.beta": "JA:Beta"}
+
+        with patch('src.mod.process_jar_file') as mock_process:
+            translate_from_jar()
+            mock_process.assert_not_called()
+        assert json.loads(output_file.read_text(encoding="utf-8")) == first_output
+
+    def test_only_changed_jar_is_rescanned(self, pack):
+        mods_dir, output_file = pack
+        translate_from_jar()
+
+        write_mod_jar(mods_dir / "beta.jar", "beta", {"item.beta": "Beta", "item.beta2": "Beta Two"})
+        write_mod_jar(mods_dir / "gamma.jar", "gamma", {"item.gamma": "Gamma"})
+        with patch('src.mod.process_jar_file', wraps=process_jar_file) as mock_process:
+            translate_from_jar()
+        scanned = sorted(Path(call.args[0]).name for call in mock_process.call_args_list)
+        assert scanned == ["beta.jar", "gamma.jar"]
+        assert json.loads(output_file.read_text(encoding="utf-8")) == {
+            "item.alpha": "JA:Alpha", "item.beta": "JA:Beta", "item.beta2": "JA:Beta Two", "item.gamma": "JA:Gamma"
+        }
+
+    def test_settings_change_forces_retranslation(self, pack):
+        mods_dir, output_file = pack
+        translate_from_jar()
+
+        with patch('src.mod.settings_hash', return_value="other-settings"), \
+                patch('src.mod.process_jar_file', wraps=process_jar_file) as mock_process:
+            translate_from_jar()
+        scanned = sorted(Path(call.args[0]).name for call in mock_process.call_args_list)
+        assert scanned == ["alpha.jar", "beta.jar"]
+
+    def test_rebuilt_jar_with_same_lang_is_reused(self, pack):
+        mods_dir, output_file = pack
+        translate_from_jar()
+
+        # JARの内容(クラスファイルなど)だけが変わり、langファイルは同じ
+        write_mod_jar(mods_dir / "beta.jar", "beta", {"item.beta": "Beta"})
+        with zipfile.ZipFile(mods_dir / "beta.jar", 'a') as z:
+            z.writestr("beta/Beta.class", b"\xca\xfe\xba\xbe")
+        with patch('src.mod.prepare_translation') as mock_prepare:
+            translate_from_jar()
+        mock_prepare.assert_not_called()
+        assert json.loads(output_file.read_text(encoding="utf-8")) == {"item.alpha": "JA:Alpha", "item.beta": "JA:Beta"}
+
+    def test_output_is_keyed_by_lang_keys(self, pack):
+        mods_dir, output_file = pack
+        write_mod_jar(mods_dir / "alpha.jar", "alpha", {"item.alpha": "Iron", "block.alpha": "Iron"})
+        write_mod_jar(mods_dir / "beta.jar", "beta", {"item.beta": "Iron", "item.beta.untranslated": "Skipped"})
+
+        with patch('src.mod.prepare_translation', return_value={
+            "item.alpha": "鉄", "block.alpha": "鉄ブロック", "item.beta": "鉄インゴット"
+        }) as mock_prepare:
+            translate_from_jar()
+
+        # 同じ原文でもキーごとに訳文を引き、訳文のないキーは出力しない
+        assert mock_prepare.call_args.args[0] == {
+            "alpha": {"keys": ["item.alpha", "block.alpha"], "texts": ["Iron", "Iron"]},
+            "beta": {"keys": ["item.beta", "item.beta.untranslated"], "texts": ["Iron", "Skipped"]}
+        }
+        assert json.loads(output_file.read_text(encoding="utf-8")) == {
+            "block.alpha": "鉄ブロック", "item.alpha": "鉄", "item.beta": "鉄インゴット"
+        }
+        manifest = json.loads((output_file.parents[3] / MOD_MANIFEST_FILE_NAME).read_text(encoding="utf-8"))
+        assert manifest["jars"]["alpha.jar"]["keys"] == ["item.alpha", "block.alpha"]
+        assert manifest["jars"]["beta.jar"]["complete"] is False
+
+    def test_jars_are_not_hashed_without_incremental(self, pack):
+        mods_dir, output_file = pack
+        with patch('src.mod.provide_incremental', return_value=False), \
+                patch('src.mod.jar_fingerprint') as mock_fingerprint:
+            translate_from_jar()
+
+        mock_fingerprint.assert_not_called()
+        assert json.loads(output_file.read_text(encoding="utf-8")) == {"item.alpha": "JA:Alpha", "item.beta": "JA:Beta"}
+        assert not (output_file.parents[3] / MOD_MANIFEST_FILE_NAME).exists()
+
+
+class TestProcessJarFileInMemory:
+    def test_reads_lang_without_extracting(self, tmp_path):
+        jar_path = tmp_path / "memory_mod.jar"
+        write_mod_jar(jar_path, "memorymod", {"item.a": "Apple", "item.b": "りんご"})
+
+        with patch('src.mod.zipfile.ZipFile', wraps=zipfile.ZipFile) as mock_zip:
+            result = process_jar_file(str(jar_path))
+
+        assert mock_zip.call_count == 1
+        assert result["mod_name"] == "memorymod"
+        assert result["keys"] == ["item.a"]
+        assert result["texts"] == ["Apple"]
+        assert result["bytes_read"] > 0
+        assert result["io_time"] >= 0
+        assert not (tmp_path / "temp_extract").exists()
+
+    def test_falls_back_to_ja_jp(self, tmp_path):
+        jar_path = tmp_path / "ja_only.jar"
+        with zipfile.ZipFile(jar_path, 'w') as z:
+            z.writestr("assets/jamod/lang/ja_jp.json", json.dumps({"item.a": "Untranslated"}))
+
+        result = process_jar_file(str(jar_path))
+        assert result["texts"] == ["Untranslated"]
+
+
+class TestScanJars:
+    @pytest.mark.parametrize("scan_mode", ["thread", "process"])
+    def test_results_follow_input_order(self, tmp_path, scan_mode):
+        jar_paths = []
+        for i in range(6):
+            jar_path = tmp_path / f"mod{i}.jar"
+            write_mod_jar(jar_path, f"mod{i}", {f"item.{i}": f"Item {i}"})
+            jar_paths.append(str(jar_path))
+        broken = tmp_path / "broken.jar"
+        broken.write_text("not a zip file")
+        jar_paths.insert(3, str(broken))
+
+        with patch('src.mod.provide_scan_mode', return_value=scan_mode), \
+                patch('src.mod.provide_scan_workers', return_value=2), \
+                patch('src.mod.provide_log_directory', return_value=None):
+            records = list(scan_jars(jar_paths))
+
+        assert len(records) == 7
+        assert records[3] is None
+        assert [record[0] for record in records if record] == [f"mod{i}" for i in range(6)]
+        assert records[0][1:3] == (["item.0"], ["Item 0"])
+
+    def test_process_workers_log_to_file_only(self, tmp_path):
+        with patch('src.mod.provide_scan_mode', return_value='process'), \
+                patch('src.mod.provide_scan_workers', return_value=2), \
+                patch('src.mod.provide_log_directory', return_value=str(tmp_path)), \
+                patch('src.mod.ProcessPoolExecutor') as mock_executor:
+            create_scan_executor()
+
+        # ワーカーは標準出力にログを出さない(CLIのJSON出力を壊さない)
+        assert mock_executor.call_args.kwargs["initargs"] == (str(tmp_path), None)
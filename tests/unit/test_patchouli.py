@@ -0,0 +1,165 @@
+import json
+import os
+import zipfile
+from unittest.mock import patch
+
+from src.patchouli import (
+    index_patchouli_books, find_books_to_translate, collect_patchouli_pages, translate_patchouli,
+    extract_page_strings, apply_page_translations
+)
+
+
+def write_book_jar(jar_path, locales=("en_us",)):
+    with zipfile.ZipFile(jar_path, 'w') as z:
+        z.writestr("assets/bookmod/lang/en_us.json", json.dumps({"item.bookmod.book": "Guide"}))
+        z.writestr("assets/bookmod/textures/item/book.png", b"\x89PNG")
+        for locale in locales:
+            z.writestr(
+                f"assets/bookmod/patchouli_books/guide/{locale}/entries/intro.json",
+                json.dumps({"name": "Introduction", "pages": [{"type": "text", "text": "Welcome"}]})
+            )
+
+
+class TestIndexPatchouliBooks:
+    def test_index_without_directory_entries(self):
+        names = [
+            "assets/bookmod/patchouli_books/guide/book.json",
+            "assets/bookmod/patchouli_books/guide/en_us/entries/intro.json",
+            "assets/bookmod/patchouli_books/guide/en_us/categories/basics.json",
+            "assets/bookmod/patchouli_books/manual/en_us/entries/a.json",
+            "assets/bookmod/patchouli_books/manual/ja_jp/entries/a.json",
+            "assets/bookmod/lang/en_us.json",
+        ]
+        assert index_patchouli_books(names, "bookmod") == {"guide": {"en_us"}, "manual": {"en_us", "ja_jp"}}
+        assert find_books_to_translate(names, "bookmod") == ["guide"]
+
+
+class TestPageStrings:
+    def test_extracts_target_fields_with_spans(self):
+        content = json.dumps({
+            "name": "Intro",
+            "category": "patchouli:basics",
+            "pages": [
+                {"type": "patchouli:text", "title": "Say \"hi\"", "text": "Intro"},
+                {"type": "patchouli:spotlight", "item": "minecraft:stone", "text": ""}
+            ]
+        })
+        strings = extract_page_strings(content)
+        assert [(string.key, string.value) for string in strings] == [
+            ("name", "Intro"), ("title", 'Say "hi"'), ("text", "Intro")
+        ]
+        for string in strings:
+            assert json.loads(f'"{content[string.start:string.end]}"') == string.value
+
+    def test_escapes_are_decoded_and_reencoded(self):
+        content = '{"name": "Caf\\u00e9 \\u00bb Guide", "pages": [{"text": "Line\\nTwo \\"quoted\\" \\\\ path"}]}'
+        strings = extract_page_strings(content)
+        assert [string.value for string in strings] == ["Café » Guide", 'Line\nTwo "quoted" \\ path']
+
+        result = apply_page_translations(content, strings, {
+            "Café » Guide": "カフェ » ガイド",
+            'Line\nTwo "quoted" \\ path': '改行\n\\"引用\\" \\ パス'
+        })
+        assert json.loads(result) == {"name": "カフェ » ガイド", "pages": [{"text": '改行\n"引用" \\ パス'}]}
+
+    def test_only_target_fields_are_rewritten(self):
+        # 同じ文字列がキーや別のフィールドにあっても書き換えない
+        content = '{"Intro": "Intro", "name": "Intro", "anchor": "Intro", "pages": [{"text": "Intro"}]}'
+        result = apply_page_translations(content, extract_page_strings(content), {"Intro": "導入"})
+        assert json.loads(result) == {"Intro": "Intro", "name": "導入", "anchor": "Intro", "pages": [{"text": "導入"}]}
+
+    def test_untranslated_strings_are_kept(self):
+        content = '{"name": "A", "text": "B"}'
+        assert apply_page_translations(content, extract_page_strings(content), {"A": "あ", "B": None}) == '{"name": "あ", "text": "B"}'
+
+    def test_broken_page_is_skipped(self, tmp_path):
+        jar_path = tmp_path / "book.jar"
+        write_book_jar(jar_path)
+        with zipfile.ZipFile(jar_path, 'a') as z:
+            z.writestr("assets/bookmod/patchouli_books/guide/en_us/entries/broken.json", '{"name": "Broken')
+
+        with patch('src.patchouli.RESOURCE_DIR', tmp_path / "resourcepack"):
+            collected = collect_patchouli_pages(str(jar_path))
+        assert [page["source"] for page in collected["pages"]] == ["assets/bookmod/patchouli_books/guide/en_us/entries/intro.json"]
+
+
+class TestTranslatePatchouli:
+    def test_jar_without_books_is_not_rewritten(self, tmp_path):
+        jar_path = tmp_path / "plain.jar"
+        with zipfile.ZipFile(jar_path, 'w') as z:
+            z.writestr("assets/plain/lang/en_us.json", json.dumps({"a": "A"}))
+        mtime = os.stat(jar_path).st_mtime_ns
+
+        with patch('src.patchouli.MODS_DIR', tmp_path), \
+                patch('src.patchouli.prepare_translation') as mock_prepare:
+            translate_patchouli()
+
+        mock_prepare.assert_not_called()
+        assert os.stat(jar_path).st_mtime_ns == mtime
+        assert not (tmp_path / "plain.jar.new").exists()
+
+    def test_already_translated_book_is_skipped(self, tmp_path):
+        write_book_jar(tmp_path / "translated.jar", locales=("en_us", "ja_jp"))
+        assert collect_patchouli_pages(str(tmp_path / "translated.jar")) is None
+
+    def test_writes_pages_to_resourcepack(self, tmp_path, fake_prepare_translation):
+        mods_dir = tmp_path / "mods"
+        resource_dir = tmp_path / "resourcepacks" / "japanese"
+        mods_dir.mkdir()
+        jar_path = mods_dir / "book.jar"
+        write_book_jar(jar_path)
+        jar_bytes = jar_path.read_bytes()
+
+        with patch('src.patchouli.MODS_DIR', mods_dir), \
+                patch('src.patchouli.RESOURCE_DIR', resource_dir), \
+                patch('src.patchouli.provide_patchouli_output', return_value='resourcepack'), \
+                patch('src.patchouli.prepare_translation', side_effect=fake_prepare_translation) as mock_prepare:
+            translate_patchouli()
+            # 翻訳済みのブックは次回スキップされる
+            translate_patchouli()
+
+        mock_prepare.assert_called_once()
+        assert jar_path.read_bytes() == jar_bytes
+        page = json.loads((resource_dir / "assets/bookmod/patchouli_books/guide/ja_jp/entries/intro.json").read_text(encoding="utf-8"))
+        assert page == {"name": "JA:Introduction", "pages": [{"type": "text", "text": "JA:Welcome"}]}
+
+    def test_appends_pages_to_jar(self, tmp_path, fake_prepare_translation):
+        jar_path = tmp_path / "book.jar"
+        write_book_jar(jar_path)
+        with zipfile.ZipFile(jar_path) as z:
+            original_offsets = {info.filename: info.header_offset for info in z.infolist()}
+
+        with patch('src.patchouli.MODS_DIR', tmp_path), \
+                patch('src.patchouli.provide_patchouli_output', return_value='jar'), \
+                patch('src.patchouli.prepare_translation', side_effect=fake_prepare_translation):
+            translate_patchouli()
+
+        # 既存のエントリは書き直されず、位置も変わらない
+        with zipfile.ZipFile(jar_path) as z:
+            assert {name: z.getinfo(name).header_offset for name in original_offsets} == original_offsets
+
+        with zipfile.ZipFile(jar_path) as z:
+            page = json.loads(z.read("assets/bookmod/patchouli_books/guide/ja_jp/entries/intro.json"))
+            assert "assets/bookmod/textures/item/book.png" in z.namelist()
+        assert page == {"name": "JA:Introduction", "pages": [{"type": "text", "text": "JA:Welcome"}]}
+        assert not (tmp_path / "book.jar.new").exists()
+
+    def test_all_pages_are_translated_in_one_batch(self, tmp_path, fake_prepare_translation):
+        for i in range(3):
+            with zipfile.ZipFile(tmp_path / f"book{i}.jar", 'w') as z:
+                z.writestr(f"assets/book{i}/lang/en_us.json", json.dumps({"a": "A"}))
+                for page in range(4):
+                    z.writestr(
+                        f"assets/book{i}/patchouli_books/guide/en_us/entries/page{page}.json",
+                        json.dumps({"name": f"Page {page}", "text": "Shared text"})
+                    )
+
+        with patch('src.patchouli.MODS_DIR', tmp_path), \
+                patch('src.patchouli.RESOURCE_DIR', tmp_path / "resourcepack"), \
+                patch('src.patchouli.prepare_translation', side_effect=fake_prepare_translation) as mock_prepare:
+            translate_patchouli()
+
+        mock_prepare.assert_called_once()
+        mod_data = mock_prepare.call_args.args[0]
+        assert sorted(mod_data) == ["book0", "book1", "book2"]
+        assert len(mod_data["book0"]["texts"]) == 8
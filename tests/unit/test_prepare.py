@@ -0,0 +1,373 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.memory import TranslationMemory
+from src.prepare import prepare_translation, create_mod_aware_chunks, estimate_tokens, deduplicate_texts, build_chunk_texts, request_budget
+
+
+def fake_translate(split_target, timeout):
+    """各行の先頭に "JA:" を付けるだけの翻訳スタブ"""
+    return [f"JA:{line}" for line in split_target]
+
+
+@pytest.fixture(autouse=True)
+def no_translation_memory():
+    with patch('src.prepare.open_translation_memory', return_value=None):
+        yield
+
+
+@pytest.fixture
+def mod_data():
+    return {
+        f"mod{i}": {
+            "jar_path": f"mod{i}.jar",
+            "texts": [f"Text {i}-{j}" for j in range(5)]
+        }
+        for i in range(8)
+    }
+
+
+class TestPrepareTranslation:
+    @patch('src.prepare.provide_chunk_size', return_value=6)
+    def test_sequential(self, _, mod_data):
+        with patch('src.prepare.translate_with_chatgpt', side_effect=fake_translate):
+            result = prepare_translation(mod_data)
+        assert len(result) == 40
+        assert result["Text 3-2"] == "JA:Text 3-2"
+
+    @patch('src.prepare.provide_chunk_size', return_value=6)
+    def test_concurrent_matches_sequential(self, _, mod_data):
+        with patch('src.prepare.translate_with_chatgpt', side_effect=fake_translate):
+            sequential = prepare_translation(mod_data)
+
+        in_flight = 0
+        max_in_flight = 0
+        lock = threading.Lock()
+
+        def slow_translate(split_target, timeout):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return fake_translate(split_target, timeout)
+
+        with patch('src.prepare.translate_with_chatgpt', side_effect=slow_translate), \
+                patch('src.prepare.provide_concurrency', return_value=3):
+            concurrent = prepare_translation(mod_data)
+
+        assert list(concurrent.items()) == list(sequential.items())
+        assert 1 < max_in_flight <= 3
+
+    @pytest.mark.parametrize("concurrency", [1, 3])
+    @patch('src.prepare.provide_chunk_size', return_value=6)
+    def test_chunk_error_is_raised_regardless_of_concurrency(self, _, mod_data, concurrency):
+        def failing_translate(split_target, timeout):
+            if "Text 2-0" in split_target:
+                raise ConnectionError("network is unreachable")
+            return fake_translate(split_target, timeout)
+
+        with patch('src.prepare.translate_with_chatgpt', side_effect=failing_translate), \
+                patch('src.prepare.provide_concurrency', return_value=concurrency), \
+                pytest.raises(ConnectionError):
+            prepare_translation(mod_data)
+
+    @patch('src.prepare.provide_chunk_size', return_value=6)
+    @patch('src.prepare.provide_concurrency', return_value=4)
+    def test_retry_until_max_attempts(self, _concurrency, _chunk_size):
+        mod_data = {"broken": {"jar_path": "broken.jar", "texts": ["A", "B"]}}
+        with patch('src.prepare.translate_with_chatgpt', return_value=[]) as mock_translate:
+            result = prepare_translation(mod_data)
+        assert result == {}
+        assert mock_translate.call_count == 5
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    def test_only_misaligned_range_is_resent(self, _):
+        texts = [f"Line {i}" for i in range(16)]
+        mod_data = {"mod": {"texts": texts}}
+
+        def merging_translate(split_target, timeout):
+            # "Line 5" を含む範囲はヘッダーを除いて2行を超えると1行が前の行に結合されて返ってくる
+            translated = fake_translate(split_target, timeout)
+            if "Line 5" in split_target and len([line for line in split_target if not line.startswith("\n--- MOD")]) > 2:
+                position = split_target.index("Line 5")
+                translated[position - 1:position + 1] = [translated[position - 1] + translated[position]]
+            return translated
+
+        with patch('src.prepare.translate_with_chatgpt', side_effect=merging_translate) as mock_translate:
+            result = prepare_translation(mod_data)
+
+        assert result == {text: f"JA:{text}" for text in texts}
+        sent_lines = sum(len(call.args[0]) for call in mock_translate.call_args_list)
+        # 全体を5回再送する場合(17行 x 5)よりずっと少ない行数で済む
+        assert sent_lines < 17 * 3
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    def test_split_halves_keep_the_mod_header(self, _):
+        mod_data = {"a": {"texts": ["A1", "A2", "A3", "A4", "A5", "A6"]}}
+        calls = []
+
+        def first_call_mismatches(split_target, timeout):
+            calls.append(list(split_target))
+            translated = fake_translate(split_target, timeout)
+            return translated[:-1] if len(calls) == 1 else translated
+
+        with patch('src.prepare.translate_with_chatgpt', side_effect=first_call_mismatches):
+            result = prepare_translation(mod_data)
+
+        assert result == {text: f"JA:{text}" for text in mod_data["a"]["texts"]}
+        assert calls[1:] == [
+            ["\n--- MOD: a ---\n", "A1", "A2"],
+            ["\n--- MOD: a ---\n", "A3", "A4", "A5", "A6"],
+        ]
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    def test_header_only_slices_are_not_sent(self, _):
+        mod_data = {"a": {"texts": ["A1"]}, "b": {"texts": ["B1"]}, "c": {"texts": ["C1"]}}
+        calls = []
+
+        def mismatch_over_two_lines(split_target, timeout):
+            calls.append(list(split_target))
+            translated = fake_translate(split_target, timeout)
+            return translated[:-1] if len(split_target) > 2 else translated
+
+        with patch('src.prepare.translate_with_chatgpt', side_effect=mismatch_over_two_lines):
+            result = prepare_translation(mod_data)
+
+        assert result == {"A1": "JA:A1", "B1": "JA:B1", "C1": "JA:C1"}
+        assert all(call[0].startswith("\n--- MOD") for call in calls)
+        assert all(any(not line.startswith("\n--- MOD") for line in call) for call in calls)
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    def test_bisection_is_bounded_by_the_request_budget(self, _):
+        texts = [f"Line {i}" for i in range(64)]
+
+        def always_mismatched(split_target, timeout):
+            return fake_translate(split_target, timeout)[:-1]
+
+        with patch('src.prepare.translate_with_chatgpt', side_effect=always_mismatched) as mock_translate:
+            result = prepare_translation({"mod": {"texts": texts}})
+
+        assert result == {}
+        # 65行を1行ずつまで分割すると約130リクエストになるが、予算で打ち切る
+        assert mock_translate.call_count == request_budget(65)
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    @patch('src.prepare.provide_streaming', return_value=True)
+    def test_interrupted_stream_resends_only_the_tail(self, _streaming, _chunk_size):
+        texts = [f"Line {i}" for i in range(10)]
+        calls = []
+
+        def interrupted_stream(split_target, timeout):
+            calls.append(list(split_target))
+            translated = fake_translate(split_target, timeout)
+            if len(calls) == 1:
+                # 最初の応答はヘッダーと4行を受け取ったところで切断される
+                return translated[:5], False
+            return translated, True
+
+        with patch('src.prepare.translate_with_chatgpt_stream', side_effect=interrupted_stream), \
+                patch('src.prepare.translate_with_chatgpt') as mock_translate:
+            result = prepare_translation({"mod": {"texts": texts}})
+
+        assert result == {text: f"JA:{text}" for text in texts}
+        # 再送する末尾にもMODヘッダーを付ける
+        assert calls[1] == ["\n--- MOD: mod ---\n"] + texts[4:]
+        assert len(calls) == 2
+        mock_translate.assert_not_called()
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    @patch('src.prepare.provide_streaming', return_value=True)
+    def test_stream_interrupted_after_all_lines_is_used(self, _streaming, _chunk_size):
+        texts = [f"Line {i}" for i in range(8)]
+
+        # 全行が届いた後(usageの受信前など)に切断される
+        def interrupted_stream(split_target, timeout):
+            return fake_translate(split_target, timeout), False
+
+        with patch('src.prepare.translate_with_chatgpt_stream', side_effect=interrupted_stream) as mock_stream:
+            result = prepare_translation({"mod": {"texts": texts}})
+
+        assert result == {text: f"JA:{text}" for text in texts}
+        assert mock_stream.call_count == 1
+
+
+class TestCreateModAwareChunks:
+    @patch('src.prepare.provide_chunk_size', return_value=3)
+    def test_large_mod_is_split(self, _):
+        chunks = create_mod_aware_chunks({"big": {"texts": ["a", "b", "c", "d"]}})
+        assert [chunk["texts"] for chunk in chunks] == [["a", "b", "c"], ["d"]]
+
+    @patch('src.prepare.provide_chunk_size', return_value=10)
+    def test_small_mods_are_grouped(self, _):
+        chunks = create_mod_aware_chunks({
+            "a": {"texts": ["a1", "a2"]},
+            "b": {"texts": ["b1"]},
+        })
+        assert len(chunks) == 1
+        assert chunks[0]["mod_names"] == ["a", "b"]
+        assert chunks[0]["texts"] == [["a1", "a2"], ["b1"]]
+
+
+class TestPrepareTranslationWithMemory:
+    @patch('src.prepare.provide_chunk_size', return_value=10)
+    def test_only_misses_are_sent(self, _, tmp_path):
+        memory = TranslationMemory(tmp_path / "memory.sqlite3")
+        memory.store({"Iron Ingot": "鉄インゴット"}, "settings")
+        mod_data = {"mod": {"texts": ["Iron Ingot", "Gold Ingot"]}}
+
+        with patch('src.prepare.open_translation_memory', return_value=memory), \
+                patch('src.prepare.settings_hash', return_value="settings"), \
+                patch('src.prepare.translate_with_chatgpt', side_effect=fake_translate) as mock_translate:
+            result = prepare_translation(mod_data)
+
+        assert result == {"Iron Ingot": "鉄インゴット", "Gold Ingot": "JA:Gold Ingot"}
+        sent = mock_translate.call_args[0][0]
+        assert "Iron Ingot" not in sent
+        assert "Gold Ingot" in sent
+
+        reopened = TranslationMemory(tmp_path / "memory.sqlite3")
+        assert reopened.lookup(["Gold Ingot"], "settings") == {"Gold Ingot": "JA:Gold Ingot"}
+        reopened.close()
+
+    @patch('src.prepare.provide_chunk_size', return_value=10)
+    def test_memory_is_closed_when_translation_fails(self, _, tmp_path):
+        memory = TranslationMemory(tmp_path / "memory.sqlite3")
+        with patch('src.prepare.open_translation_memory', return_value=memory), \
+                patch.object(memory, 'close', wraps=memory.close) as mock_close, \
+                patch('src.prepare.translate_with_chatgpt', side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                prepare_translation(["Iron Ingot"])
+        mock_close.assert_called_once()
+
+    @patch('src.prepare.provide_chunk_size', return_value=10)
+    def test_accepts_plain_list(self, _):
+        with patch('src.prepare.translate_with_chatgpt', side_effect=fake_translate):
+            result = prepare_translation(["Quest Title", "Quest Description"])
+        assert result == {"Quest Title": "JA:Quest Title", "Quest Description": "JA:Quest Description"}
+
+
+@pytest.fixture
+def short_prompt():
+    with patch('src.prepare.provide_prompt', return_value="Translate {line_count} lines."):
+        yield
+
+
+class TestTokenAwareChunks:
+    def test_estimate_tokens(self):
+        assert estimate_tokens("Iron") == 2
+        assert estimate_tokens("鉄インゴット") == 7
+        assert estimate_tokens("a" * 400) > estimate_tokens("a" * 40)
+
+    @patch('src.prepare.provide_input_token_budget', return_value=40)
+    @patch('src.prepare.provide_output_token_budget', return_value=0)
+    def test_short_and_long_texts_are_packed_by_tokens(self, _output, _input, short_prompt):
+        short_texts = [f"Item {i}" for i in range(20)]
+        long_texts = ["word " * 40 for _ in range(4)]
+        chunks = create_mod_aware_chunks({
+            "short": {"texts": short_texts},
+            "long": {"texts": long_texts},
+        })
+
+        short_chunks = [chunk for chunk in chunks if chunk.get("mod_name") == "short"]
+        long_chunks = [chunk for chunk in chunks if chunk.get("mod_name") == "long"]
+        # 短いテキストは1チャンクに多く詰め、長いテキストは1行ずつになる
+        assert max(len(chunk["texts"]) for chunk in short_chunks) > 5
+        assert all(len(chunk["texts"]) == 1 for chunk in long_chunks)
+        assert sum(len(chunk["texts"]) for chunk in short_chunks) == 20
+        for chunk in short_chunks:
+            texts, _ = build_chunk_texts(chunk)
+            prompt_tokens = estimate_tokens("Translate {line_count} lines.")
+            assert prompt_tokens + sum(estimate_tokens(text) for text in texts) <= 40
+
+    @patch('src.prepare.provide_input_token_budget', return_value=0)
+    @patch('src.prepare.provide_output_token_budget', return_value=30)
+    def test_output_budget_limits_chunks(self, _output, _input, short_prompt):
+        chunks = create_mod_aware_chunks({"mod": {"texts": [f"Item {i}" for i in range(20)]}})
+        for chunk in chunks:
+            assert sum(estimate_tokens(text) for text in chunk["texts"]) * 1.5 <= 30
+
+    @patch('src.prepare.provide_input_token_budget', return_value=100)
+    @patch('src.prepare.provide_output_token_budget', return_value=0)
+    def test_system_prompt_is_counted(self, _output, _input):
+        texts = [f"Item {i}" for i in range(40)]
+        with patch('src.prepare.provide_prompt', return_value="Translate {line_count} lines."):
+            short_prompt_chunks = create_mod_aware_chunks({"mod": {"texts": texts}})
+        with patch('src.prepare.provide_prompt', return_value="word " * 200):
+            long_prompt_chunks = create_mod_aware_chunks({"mod": {"texts": texts}})
+        assert len(long_prompt_chunks) > len(short_prompt_chunks)
+
+    @patch('src.prepare.provide_input_token_budget', return_value=100)
+    @patch('src.prepare.provide_output_token_budget', return_value=0)
+    def test_mod_header_grouping_is_kept(self, _output, _input, short_prompt):
+        chunks = create_mod_aware_chunks({
+            "a": {"keys": ["a.1", "a.2"], "texts": ["A1", "A2"]},
+            "b": {"keys": ["b.1"], "texts": ["B1"]},
+        })
+        assert chunks == [{
+            "mod_names": ["a", "b"],
+            "keys": [["a.1", "a.2"], ["b.1"]],
+            "texts": [["A1", "A2"], ["B1"]],
+            "headers": ["\n--- MOD: a ---\n", "\n--- MOD: b ---\n"]
+        }]
+
+
+class TestDeduplication:
+    mod_data = {
+        "a": {"keys": ["a.on", "a.off", "a.energy", "a.name"], "texts": ["Enabled", "Disabled", "Energy: %s", "Alpha"]},
+        "b": {"keys": ["b.on", "b.off", "b.name"], "texts": ["Enabled", "Disabled", "Beta"]},
+        "c": {"keys": ["c.energy", "c.on"], "texts": ["Energy: %s", "Enabled"]},
+    }
+
+    @patch('src.prepare.provide_chunk_size', return_value=1)
+    def test_same_text_under_different_keys_is_translated_per_key(self, _):
+        calls = []
+
+        def translate_per_call(split_target, timeout):
+            calls.append(split_target)
+            return [f"JA{len(calls)}:{line}" for line in split_target]
+
+        mod_data = {"a": {"keys": ["a.open"], "texts": ["Open"]}, "b": {"keys": ["b.open"], "texts": ["Open"]}}
+        with patch('src.prepare.translate_with_chatgpt', side_effect=translate_per_call):
+            result = prepare_translation(mod_data)
+
+        assert len(calls) == 2
+        assert result == {"a.open": "JA1:Open", "b.open": "JA2:Open"}
+
+    @patch('src.prepare.provide_deduplicate', return_value=True)
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    def test_shared_texts_are_sent_once_when_enabled(self, _chunk_size, _deduplicate):
+        with patch('src.prepare.translate_with_chatgpt', side_effect=fake_translate) as mock_translate:
+            result = prepare_translation(self.mod_data)
+
+        sent = [line for call in mock_translate.call_args_list for line in call.args[0] if not line.startswith("\n--- MOD")]
+        assert sorted(sent) == sorted(["Enabled", "Disabled", "Energy: %s", "Alpha", "Beta"])
+        assert result == {
+            key: f"JA:{text}"
+            for data in self.mod_data.values()
+            for key, text in zip(data["keys"], data["texts"])
+        }
+
+    @patch('src.prepare.provide_chunk_size', return_value=100)
+    def test_shared_texts_are_sent_per_key_by_default(self, _):
+        with patch('src.prepare.translate_with_chatgpt', side_effect=fake_translate) as mock_translate:
+            result = prepare_translation(self.mod_data)
+
+        sent = [line for call in mock_translate.call_args_list for line in call.args[0] if not line.startswith("\n--- MOD")]
+        assert len(sent) == 9
+        assert len(result) == 9
+
+    def test_mod_data_is_not_mutated(self):
+        mod_data = {
+            "a": {"keys": ["x", "x", "y"], "texts": ["X", "X", "Y"]},
+            "b": {"keys": ["y2"], "texts": ["Y"]},
+        }
+        deduplicated, duplicates = deduplicate_texts(mod_data, by_text=True)
+        assert deduplicated == {"a": {"keys": ["x", "y"], "texts": ["X", "Y"]}}
+        assert duplicates == {"y": ["y2"]}
+        assert mod_data["a"]["texts"] == ["X", "X", "Y"]
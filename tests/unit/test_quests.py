@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.quests import translate_ftbquests, extract_snbt_strings
+
+
+CHAPTER = '''{
+	id: "0000000000000001"
+	title: "Chapter {n}"
+	quests: [
+		{
+			title: "Getting Started"
+			subtitle: "First steps {n}"
+			description: [
+				"Collect some wood."
+				""
+				"Then craft a table."
+			]
+		}
+	]
+}
+'''
+
+
+@pytest.fixture
+def quest_dirs(tmp_path):
+    chapters = tmp_path / "config/ftbquests/quests/chapters"
+    chapters.mkdir(parents=True)
+    for n in range(5):
+        (chapters / f"chapter{n}.snbt").write_text(CHAPTER.replace("{n}", str(n)), encoding="utf-8")
+    chapter_groups = tmp_path / "config/ftbquests/quests/chapter_groups.snbt"
+    chapter_groups.write_text('{ chapter_groups: [ { title: "Main" } ] }', encoding="utf-8")
+
+    with patch('src.quests.FTBQUESTS_DIR1', tmp_path / "kubejs/assets/kubejs/lang"), \
+            patch('src.quests.FTBQUESTS_DIR3', chapters), \
+            patch('src.quests.FTBQUESTS_DIR4', chapter_groups), \
+            patch('src.quests.provide_log_directory', return_value=tmp_path / "logs"):
+        yield chapters, chapter_groups, tmp_path / "logs" / "quests"
+
+
+class TestExtractSnbtStrings:
+    def test_extracts_titles_and_descriptions(self):
+        strings = extract_snbt_strings(CHAPTER.replace("{n}", "1"))
+        assert sorted(strings) == sorted([
+            "Collect some wood.", "Then craft a table.", "Chapter 1", "Getting Started", "First steps 1"
+        ])
+
+
+class TestTranslateFtbquests:
+    def test_all_chapters_are_translated_in_one_batch(self, quest_dirs, fake_prepare_translation):
+        chapters, chapter_groups, backup_directory = quest_dirs
+
+        with patch('src.quests.prepare_translation', side_effect=fake_prepare_translation) as mock_prepare:
+            translate_ftbquests()
+
+        mock_prepare.assert_called_once()
+        mod_data = mock_prepare.call_args.args[0]
+        assert sorted(mod_data) == ["chapter0", "chapter1", "chapter2", "chapter3", "chapter4", "chapter_groups"]
+
+        content = (chapters / "chapter3.snbt").read_text(encoding="utf-8")
+        assert 'title: "JA:Chapter 3"' in content
+        assert '"JA:Then craft a table."' in content
+        assert '""' in content
+        assert 'title: "JA:Main"' in chapter_groups.read_text(encoding="utf-8")
+
+        # 書き換え前のファイルがバックアップされている
+        assert (backup_directory / "chapter3.snbt").read_text(encoding="utf-8") == CHAPTER.replace("{n}", "3")
+        assert (backup_directory / "chapter_groups.snbt").exists()
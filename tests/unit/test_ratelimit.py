@@ -0,0 +1,148 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.chatgpt import close_clients, get_rate_limiter, translate_with_chatgpt
+from src.ratelimit import RateLimiter, parse_duration, retry_after_from_headers
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestParseDuration:
+    @pytest.mark.parametrize("value, expected", [
+        ("1s", 1.0), ("6m0s", 360.0), ("20ms", 0.02), ("1h2m3.5s", 3723.5), ("2", 2.0), ("", None), ("soon", None)
+    ])
+    def test_formats(self, value, expected):
+        assert parse_duration(value) == expected
+
+    def test_retry_after_headers(self):
+        assert retry_after_from_headers({"retry-after-ms": "1500"}) == 1.5
+        assert retry_after_from_headers({"retry-after": "3"}) == 3.0
+        assert retry_after_from_headers({"x-ratelimit-reset-requests": "2s"}) == 2.0
+        assert retry_after_from_headers({}) is None
+
+
+class TestRateLimiter:
+    def test_requests_per_minute(self, clock):
+        limiter = RateLimiter(requests_per_minute=3, clock=clock, sleep=clock.sleep)
+        waits = [limiter.acquire().waited for _ in range(4)]
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] == pytest.approx(60.0)
+
+    def test_tokens_per_minute(self, clock):
+        limiter = RateLimiter(tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+        assert limiter.acquire(600).waited == 0.0
+        clock.now += 10
+        assert limiter.acquire(600).waited == pytest.approx(50.0)
+
+    def test_backoff_and_recovery(self, clock):
+        limiter = RateLimiter(min_interval=0.0, clock=clock, sleep=clock.sleep)
+        limiter.on_rate_limited(retry_after=5.0)
+        assert limiter.interval == 0.5
+        limiter.on_rate_limited()
+        assert limiter.interval == 1.0
+        # retry-after の間は送信しない
+        assert limiter.acquire().waited == pytest.approx(5.0)
+
+        limiter.on_success({})
+        assert limiter.interval == pytest.approx(0.95)
+        # ヘッダーで余裕が分かる場合は早く間隔を縮める
+        limiter.on_success({"x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-requests": "90"})
+        assert limiter.interval == pytest.approx(0.475)
+        assert limiter.requests_per_minute == 100
+
+    def test_interval_never_below_minimum(self, clock):
+        limiter = RateLimiter(min_interval=2.0, clock=clock, sleep=clock.sleep)
+        limiter.on_success({"x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-requests": "90"})
+        assert limiter.interval == 2.0
+        limiter.acquire()
+        assert limiter.acquire().waited == pytest.approx(2.0)
+
+    def test_usage_replaces_the_reserved_estimate(self, clock):
+        limiter = RateLimiter(tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+        first = limiter.acquire(300)
+        limiter.acquire(300)
+        # 同じ見積もりの枠が複数あっても、確保した枠そのものを置き換える
+        limiter.record_usage(first, 50)
+        assert [reservation.tokens for reservation in limiter.window] == [50, 300]
+        assert limiter.acquire(600).waited == 0.0
+
+    def test_configure_applies_changed_settings(self, clock):
+        limiter = RateLimiter(min_interval=1.0, clock=clock, sleep=clock.sleep)
+        limiter.configure(3.0, 10, 5000)
+        assert (limiter.interval, limiter.requests_per_minute, limiter.tokens_per_minute) == (3.0, 10, 5000)
+
+        # ヘッダーから得た上限は、設定が変わらない限り上書きしない
+        limiter.on_success({"x-ratelimit-limit-requests": "100"})
+        limiter.configure(3.0, 10, 5000)
+        assert limiter.requests_per_minute == 100
+
+        limiter.configure(0.5, 10, 5000)
+        assert limiter.interval == 0.5
+
+    def test_pauses_when_remaining_is_zero(self, clock):
+        limiter = RateLimiter(clock=clock, sleep=clock.sleep)
+        limiter.on_success({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "7s"})
+        assert limiter.acquire().waited == pytest.approx(7.0)
+
+
+class TestRateLimitWithServer:
+    @pytest.fixture(autouse=True)
+    def clear_clients(self):
+        close_clients()
+        yield
+        close_clients()
+
+    def test_backs_off_on_429(self, fake_openai_server):
+        responses = iter([
+            (429, {"retry-after": "0.2"}, {"error": {"message": "Rate limit reached", "type": "requests"}}),
+        ])
+
+        def responder(body):
+            try:
+                return next(responses)
+            except StopIteration:
+                return fake_openai_server.default_responder(body)
+
+        fake_openai_server.responder = responder
+        with patch('src.chatgpt.provide_api_key', return_value='key'), \
+                patch('src.chatgpt.provide_api_base', return_value=fake_openai_server.base_url), \
+                patch('src.chatgpt.provide_request_interval', return_value=0):
+            assert translate_with_chatgpt(["Hello", "World"], 60) == []
+            limiter = get_rate_limiter()
+            assert limiter.interval == 0.5
+            assert limiter.paused_until > 0
+
+            assert translate_with_chatgpt(["Hello", "World"], 60) == ["JA:Hello", "JA:World"]
+            assert limiter.interval == pytest.approx(0.45)
+
+        # SDKの自動再送は行わない
+        assert len(fake_openai_server.requests) == 2
+
+    def test_shared_limiter_follows_setting_changes(self):
+        with patch('src.chatgpt.provide_api_key', return_value='key'), \
+                patch('src.chatgpt.provide_api_base', return_value='http://localhost/v1'), \
+                patch('src.chatgpt.provide_request_interval', return_value=1.0):
+            limiter = get_rate_limiter()
+        with patch('src.chatgpt.provide_api_key', return_value='key'), \
+                patch('src.chatgpt.provide_api_base', return_value='http://localhost/v1'), \
+                patch('src.chatgpt.provide_request_interval', return_value=4.0), \
+                patch('src.chatgpt.provide_requests_per_minute', return_value=30):
+            assert get_rate_limiter() is limiter
+        assert limiter.min_interval == 4.0
+        assert limiter.interval == 4.0
+        assert limiter.requests_per_minute == 30
@@ -0,0 +1,76 @@
+import pytest
+
+from src.snbt import SnbtSyntaxError, find_translatable_strings, scan_strings
+from src.spans import replace_spans
+
+
+CHAPTER = '''{
+	default_hide_dependency_lines: false
+	filename: "getting_started"
+	"title": "Getting Started"
+	quests: [
+		{
+			id: "1A2B3C4D5E6F7A8B"
+			title: "Getting Started"
+			subtitle: "Say \\"hello\\""
+			description: [
+				"Collect some wood."
+				""
+				"{@pagebreak}"
+				'Single quoted, with ] and : inside'
+			]
+			tasks: [{ id: "00", type: "item", item: "minecraft:oak_log", title: "Getting Started" }]
+			size: 1.5d
+			x: -2.0d
+			dependencies: ["0000000000000001"]
+		}
+	]
+	icons: [I; 1, 2, 3]
+}
+'''
+
+
+class TestScanStrings:
+    def test_keys_and_spans(self):
+        strings = list(scan_strings(CHAPTER))
+        for string in strings:
+            assert CHAPTER[string.start:string.end] == string.value
+
+        keyed = [(string.key, string.in_list, string.value) for string in strings]
+        assert ("filename", False, "getting_started") in keyed
+        assert ("title", False, "Getting Started") in keyed
+        assert ("subtitle", False, 'Say \\"hello\\"') in keyed
+        assert ("description", True, "Single quoted, with ] and : inside") in keyed
+        assert ("item", False, "minecraft:oak_log") in keyed
+        assert ("dependencies", True, "0000000000000001") in keyed
+        # キーとして使われた引用符付き文字列("title")は値として返さない
+        assert (None, False, "title") not in keyed
+
+    def test_translatable_strings(self):
+        values = [string.value for string in find_translatable_strings(CHAPTER)]
+        assert values == [
+            "Getting Started",
+            "Getting Started",
+            'Say \\"hello\\"',
+            "Collect some wood.",
+            "{@pagebreak}",
+            "Single quoted, with ] and : inside",
+            "Getting Started",
+        ]
+
+    def test_unterminated_string(self):
+        with pytest.raises(SnbtSyntaxError):
+            list(scan_strings('{ title: "broken }'))
+
+    def test_unbalanced_brackets(self):
+        with pytest.raises(SnbtSyntaxError):
+            list(scan_strings('{ description: ["a" }'))
+
+
+class TestReplaceSpans:
+    def test_each_occurrence_is_replaced_at_its_own_span(self):
+        content = '{ title: "Same" description: ["Same", "Other"] filename: "Same" }'
+        strings = find_translatable_strings(content)
+        translations = iter(["一", "二", "三"])
+        result = replace_spans(content, [(string.start, string.end, next(translations)) for string in strings])
+        assert result == '{ title: "一" description: ["二", "三"] filename: "Same" }'
@@ -0,0 +1,12 @@
+import pytest
+
+from src.spans import replace_spans
+
+
+class TestReplaceSpans:
+    def test_spans_are_replaced_in_position_order(self):
+        assert replace_spans("abcdef", [(4, 5, "E"), (0, 2, "AB")]) == "ABcdEf"
+
+    def test_overlapping_spans_are_rejected(self):
+        with pytest.raises(ValueError):
+            replace_spans("abcdef", [(0, 3, "x"), (2, 4, "y")])